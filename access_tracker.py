@@ -0,0 +1,115 @@
+"""Write-behind buffer for cognitive memory access tracking.
+
+Reads record hits in memory; a background thread folds them into batched
+UPDATEs every ``FRANKLIN_ACCESS_FLUSH_SECONDS`` or as soon as
+``FRANKLIN_ACCESS_FLUSH_MAX`` distinct rows are pending. Counts are eventually
+consistent: a crash loses at most one interval of hits.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+FLUSH_INTERVAL = float(os.getenv("FRANKLIN_ACCESS_FLUSH_SECONDS", "5"))
+FLUSH_MAX_PENDING = int(os.getenv("FRANKLIN_ACCESS_FLUSH_MAX", "1000"))
+
+# (row id, hits since last flush, most recent access)
+PendingAccess = Tuple[int, int, datetime]
+
+
+class AccessTracker:
+    """Buffers (row id -> hit count, last access) and flushes in batches."""
+
+    def __init__(self, flush_fn: Callable[[List[PendingAccess]], None],
+                 interval: float = FLUSH_INTERVAL, max_pending: int = FLUSH_MAX_PENDING):
+        self._flush_fn = flush_fn
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, Tuple[int, datetime]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushed_rows = 0
+        self.flushed_hits = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+
+    def record(self, row_id: int, when: Optional[datetime] = None):
+        when = when or datetime.now(timezone.utc)
+        with self._lock:
+            count, _ = self._pending.get(row_id, (0, when))
+            self._pending[row_id] = (count + 1, when)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def pending(self, row_id: int) -> Tuple[int, Optional[datetime]]:
+        """Hits not yet written for a row, and the latest of them."""
+        with self._lock:
+            count, last = self._pending.get(row_id, (0, None))
+        return count, last
+
+    def _drain(self) -> List[PendingAccess]:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        return [(row_id, count, last) for row_id, (count, last) in batch.items()]
+
+    def _restore(self, batch: List[PendingAccess]):
+        with self._lock:
+            for row_id, count, last in batch:
+                newer, newer_last = self._pending.get(row_id, (0, last))
+                self._pending[row_id] = (count + newer, max(last, newer_last))
+
+    def flush(self) -> int:
+        """Write all pending hits now; returns the number of rows updated."""
+        with self._flush_lock:
+            batch = self._drain()
+            if not batch:
+                return 0
+            try:
+                self._flush_fn(batch)
+            except Exception as ex:
+                self.flush_errors += 1
+                self._restore(batch)
+                print(f"Access tracking flush failed ({len(batch)} rows kept pending): {ex}")
+                return 0
+            self.flush_count += 1
+            self.flushed_rows += len(batch)
+            self.flushed_hits += sum(count for _, count, _ in batch)
+            return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="access-tracker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and write whatever is still buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending_rows = len(self._pending)
+            pending_hits = sum(count for count, _ in self._pending.values())
+        return {
+            "pending_rows": pending_rows,
+            "pending_hits": pending_hits,
+            "flushed_rows": self.flushed_rows,
+            "flushed_hits": self.flushed_hits,
+            "flushes": self.flush_count,
+            "flush_errors": self.flush_errors,
+        }
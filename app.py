@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import json
 import os
 import uuid
@@ -13,12 +14,39 @@ from typing import Any, Deque, Dict, List, Literal, Optional
 
 import httpx
 import jwt
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel, Field as PydanticField
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import BaseModel, Field as PydanticField, ValidationError
+from sqlalchemy import Index, bindparam, delete, insert, inspect as sa_inspect, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlmodel import Field, Session, SQLModel, create_engine, select
 
+import ndjson
+import pagination
+from access_tracker import AccessTracker, PendingAccess
+from audit_archive import AuditPartitions, create_partitioned_audit
+from audit_writer import AuditWriter
+from blob_store import BlobStore
+from change_feed import ChangeFeed, parse_keywords
+from chunked_upload import (UPLOAD_CHUNK_SIZE, UPLOAD_MAX_BYTES, ChunkError, ChunkedUploads, chunk_count,
+                            stream_to_file)
+from bulk_export import BULK_EXPORT_MAX_ENTRIES, stream_bulk_export
+from document_pipeline import DocumentPipeline, UnsupportedDocument, detect_kind
+from engine_registry import EngineRegistry
+from export_renderer import FORMATS as EXPORT_FORMATS, ExportBusy, ExportRenderer, response_hash
+from speech_export import SpeechError, SpeechSynthesizer, speech_text
+from file_serving import file_etag, list_artifacts, serve_file
+from hot_cache import TTLCache
+from maintenance import MaintenanceJob, SweepTarget
+from marketplace import (BID_STATS_RETRIES, RequestSearchIndex, backfill_bid_stats, fold_bid_stats, record_accept,
+                         record_bid, stats_summary)
+from memory_search import MemorySearchIndex, SearchUnavailable
+from pubsub import make_bus
+from timeutil import as_utc
+from vector_store import VectorStore
+
 # ---------------- CONFIG ----------------
 APP_NAME = "Franklin OS • BidNova • Trinity"
 
@@ -36,7 +64,7 @@ try:
     engine = create_engine(DB_URL, pool_pre_ping=True)
     with Session(engine) as session:
         # Force a simple query to verify connection
-        session.execute("SELECT 1")
+        session.execute(text("SELECT 1"))
     print("✅ Database Connection: SECURE")
 except Exception as e:
     print(f"❌ Database Connection FAILED: {e}")
@@ -88,10 +116,12 @@ class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str
     role: str  # client | contractor | admin
+    token_version: int = Field(default=0)  # bump to revoke every token issued so far
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class BidRequest(SQLModel, table=True):
+    __table_args__ = (Index("ix_bidrequest_open_created_id", "open", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     client_id: int
     title: str
@@ -100,6 +130,14 @@ class BidRequest(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class BidRequestEvent(SQLModel, table=True):
+    """Append-only change log behind the live request feed; the id is the client cursor"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    request_id: int = Field(index=True)
+    kind: str  # created | closed
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 class Bid(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     request_id: int
@@ -110,6 +148,25 @@ class Bid(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class BidStats(SQLModel, table=True):
+    """Per-request bid aggregates, updated alongside each bid instead of scanning Bid"""
+    request_id: int = Field(primary_key=True)
+    bid_count: int = 0
+    price_sum: float = 0.0
+    min_price: Optional[float] = None
+    median_price: Optional[float] = None
+    max_price: Optional[float] = None
+    prices: Optional[str] = None  # JSON, kept sorted for the median
+    first_bid_at: Optional[datetime] = None
+    last_bid_at: Optional[datetime] = None
+    seconds_to_first_bid: Optional[float] = None
+    accepted_bid_id: Optional[int] = None
+    accepted_price: Optional[float] = None
+    closed_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    version: int = 0  # compare-and-set counter, see marketplace.fold_bid_stats
+
+
 class Contract(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     bid_id: int
@@ -119,6 +176,7 @@ class Contract(SQLModel, table=True):
 
 
 class Audit(SQLModel, table=True):
+    __table_args__ = (Index("ix_audit_created_id", "created_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     event: str
     payload: str
@@ -127,12 +185,17 @@ class Audit(SQLModel, table=True):
 
 class CognitiveMemory(SQLModel, table=True):
     """Cognitive remembrance system with timestamps for PFS, Air Weaver, or Raspberry Pi"""
+    __table_args__ = (
+        Index("ix_cognitivememory_created_id", "created_at", "id"),
+        Index("ix_cognitivememory_type_created_id", "memory_type", "created_at", "id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     memory_key: str = Field(index=True)
     memory_value: str
     memory_type: str = Field(default="general")  # general | pfs | air_weaver | raspberry_pi
     context: Optional[str] = None
-    embedding_vector: Optional[str] = None  # JSON string of vector for semantic search
+    embedding_vector: Optional[str] = None  # Legacy JSON vector; see migrate_json_embeddings()
+    embedding_ref: Optional[str] = None  # "<segment>#<row>" pointer into VECTORS
     access_count: int = Field(default=0)
     last_accessed: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -157,6 +220,7 @@ class AIResponseCache(SQLModel, table=True):
 
 class WorkflowExecution(SQLModel, table=True):
     """Track workflow executions"""
+    __table_args__ = (Index("ix_workflowexecution_started_id", "started_at", "id"),)
     id: Optional[int] = Field(default=None, primary_key=True)
     workflow_id: str
     workflow_name: str
@@ -181,44 +245,207 @@ class UploadedFile(SQLModel, table=True):
     pipeline_id: Optional[str] = None
     processed: bool = Field(default=False)
     processing_result: Optional[str] = None
+    sha256: Optional[str] = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+class Blob(SQLModel, table=True):
+    """Stored upload content, shared by every UploadedFile with the same hash"""
+    sha256: str = Field(primary_key=True)
+    size: int
+    path: str
+    ref_count: int = 0
+    processing_result: Optional[str] = None  # cached so identical documents are processed once
+    processed_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_ref_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+
+
+class UploadSession(SQLModel, table=True):
+    """Chunked upload in progress; chunk bytes live in uploads/.partial/<upload_id>.part"""
+    upload_id: str = Field(primary_key=True)
+    filename: str
+    file_type: str
+    file_size: int
+    chunk_size: int
+    total_chunks: int
+    status: str = "uploading"  # uploading | completed
+    file_uuid: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), index=True)
+
+
+class UploadChunk(SQLModel, table=True):
+    """One received chunk; the (upload_id, chunk_index) key makes retried PUTs idempotent"""
+    upload_id: str = Field(primary_key=True)
+    chunk_index: int = Field(primary_key=True)
+    size: int
+    sha256: Optional[str] = None
+
+
+create_partitioned_audit(engine)
 SQLModel.metadata.create_all(engine)
 
+
+def _ensure_columns(model, columns: Dict[str, str]):
+    """Add columns introduced after a table was first created (create_all never alters)."""
+    table = model.__tablename__
+    existing = {c["name"] for c in sa_inspect(engine).get_columns(table)}
+    missing = {name: ddl for name, ddl in columns.items() if name not in existing}
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name, ddl in missing.items():
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+_ensure_columns(CognitiveMemory, {"embedding_ref": "VARCHAR"})
+_ensure_columns(User, {"token_version": "INTEGER NOT NULL DEFAULT 0"})
+_ensure_columns(UploadedFile, {"sha256": "VARCHAR"})
+_ensure_columns(BidStats, {"version": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def _ensure_indexes():
+    """create_all() skips indexes on tables that already exist; add any that are missing"""
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+_ensure_indexes()
+
+VECTORS = VectorStore()
+
+MEMORY_SEARCH = MemorySearchIndex(engine)
+MEMORY_SEARCH.ensure()
+
+REQUEST_SEARCH = RequestSearchIndex(engine, BidRequest.__tablename__, BidStats.__tablename__)
+REQUEST_SEARCH.ensure()
+backfill_bid_stats(engine, BidStats.__table__, BidRequest.__table__, Bid.__table__)
+
+# Hot (memory_key, memory_type) lookups; other workers are told to drop entries over BUS
+HOT_MEMORY = TTLCache(
+    max_entries=int(os.getenv("FRANKLIN_MEMORY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("FRANKLIN_MEMORY_CACHE_TTL", "60")),
+)
+BUS = make_bus()
+MEMORY_INVALIDATE_CHANNEL = "franklin:memory:invalidate"
+
+
+def _on_memory_invalidate(message: str):
+    key, memory_type = json.loads(message)
+    if key == "*":
+        HOT_MEMORY.clear()
+    else:
+        # A store under (key, type) changes what both typed and untyped lookups return
+        HOT_MEMORY.invalidate((key, memory_type), (key, None))
+
+
+BUS.subscribe(MEMORY_INVALIDATE_CHANNEL, _on_memory_invalidate)
+
+
+def invalidate_memory(key: str, memory_type: Optional[str] = None):
+    """Drop cached lookups for a key in this and every other worker (key="*" clears all)"""
+    BUS.publish(MEMORY_INVALIDATE_CHANNEL, json.dumps([key, memory_type]))
+
 # ---------------- HELPERS ----------------
 def _now_ms() -> int:
     return int(datetime.now(timezone.utc).timestamp() * 1000)
 
 
-def audit(event: str, payload: dict):
-    with Session(engine) as s:
-        s.add(Audit(event=event, payload=json.dumps(payload)))
-        s.commit()
+def _write_audit_rows(rows: List[Dict[str, Any]]):
+    with engine.begin() as conn:
+        conn.execute(insert(Audit.__table__), rows)
+
+
+AUDIT_WRITER = AuditWriter(_write_audit_rows)
+
+
+def audit(event: str, payload: dict, sync: bool = False):
+    """Queue an audit event; sync=True (or a FRANKLIN_AUDIT_SYNC_EVENTS event) commits before returning"""
+    AUDIT_WRITER.submit(event, json.dumps(payload), sync=sync)
+
+
+class Principal(BaseModel):
+    """Identity taken from verified JWT claims"""
+    id: int
+    role: str
+    token_version: int = 0
+
+
+# Small TTL cache of User rows; revocations drop entries in every worker via BUS
+USER_CACHE = TTLCache(
+    max_entries=int(os.getenv("FRANKLIN_USER_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("FRANKLIN_USER_CACHE_TTL", "30")),
+)
+USER_INVALIDATE_CHANNEL = "franklin:user:invalidate"
+BUS.subscribe(USER_INVALIDATE_CHANNEL, lambda message: USER_CACHE.invalidate(int(message)))
 
 
 def create_token(user: User):
     return jwt.encode(
-        {"sub": user.id, "role": user.role, "exp": datetime.now(timezone.utc) + timedelta(days=30)},
+        {
+            "sub": str(user.id),
+            "role": user.role,
+            "ver": user.token_version or 0,
+            "exp": datetime.now(timezone.utc) + timedelta(days=30),
+        },
         SECRET,
         algorithm=JWT_ALGO,
     )
 
 
-def get_user(req: Request) -> User:
+def _load_user(user_id: int) -> Optional[User]:
+    user = USER_CACHE.get(user_id)
+    if user is None:
+        with Session(engine) as s:
+            user = s.get(User, user_id)
+        if user:
+            USER_CACHE.set(user_id, user)
+    return user
+
+
+def get_principal(req: Request) -> Principal:
+    """Authorize from token claims; only the token version is checked (against USER_CACHE)"""
     token = req.query_params.get("token")
     if not token:
         raise HTTPException(401, "Token required")
     try:
         data = jwt.decode(token, SECRET, algorithms=[JWT_ALGO])
+        user_id = int(data["sub"])
     except Exception:
         raise HTTPException(401, "Invalid token") from None
 
+    user = _load_user(user_id)
+    if not user:
+        raise HTTPException(401, "User not found")
+    token_version = int(data.get("ver", 0))
+    if token_version != (user.token_version or 0):
+        raise HTTPException(401, "Token revoked")
+    return Principal(id=user_id, role=data.get("role") or user.role, token_version=token_version)
+
+
+def get_user(req: Request) -> User:
+    """Full User row for the caller (served from USER_CACHE when warm)"""
+    principal = get_principal(req)
+    user = _load_user(principal.id)
+    if not user:
+        raise HTTPException(401, "User not found")
+    return user
+
+
+def revoke_tokens(user_id: int) -> int:
+    """Invalidate every token issued to a user; returns the new token version"""
     with Session(engine) as s:
-        user = s.get(User, data["sub"])
+        user = s.get(User, user_id)
         if not user:
-            raise HTTPException(401, "User not found")
-        return user
+            raise HTTPException(404, "User not found")
+        user.token_version = (user.token_version or 0) + 1
+        s.add(user)
+        s.commit()
+        version = user.token_version
+    BUS.publish(USER_INVALIDATE_CHANNEL, str(user_id))
+    return version
 
 
 def generate_cache_key(prompt: str, provider: str, model: str) -> str:
@@ -274,7 +501,8 @@ def cache_response(prompt: str, provider: str, model: str, response: str, ttl_ho
 
 
 def store_memory(key: str, value: str, memory_type: str = "general", context: Optional[str] = None, 
-                 metadata: Optional[dict] = None, ttl_days: Optional[int] = None):
+                 metadata: Optional[dict] = None, ttl_days: Optional[int] = None,
+                 embedding: Optional[List[float]] = None):
     """Store cognitive memory with timestamp"""
     with Session(engine) as s:
         expires_at = datetime.now(timezone.utc) + timedelta(days=ttl_days) if ttl_days else None
@@ -287,13 +515,184 @@ def store_memory(key: str, value: str, memory_type: str = "general", context: Op
             expires_at=expires_at
         )
         s.add(memory)
+        if embedding:
+            # Flush first so the segment record carries the row id
+            s.flush()
+            memory.embedding_ref = VECTORS.append(memory.id, embedding)
         s.commit()
         s.refresh(memory)
-        return memory
+    invalidate_memory(key, memory_type)
+    return memory
+
+
+def _flush_memory_access(batch: List[PendingAccess]):
+    """Apply buffered access hits as one executemany UPDATE"""
+    table = CognitiveMemory.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(access_count=table.c.access_count + bindparam("hits"), last_accessed=bindparam("seen"))
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt, [{"row_id": row_id, "hits": hits, "seen": seen} for row_id, hits, seen in batch])
+
+
+MEMORY_ACCESS = AccessTracker(_flush_memory_access)
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def _env_mb(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(float(value) * 1024 * 1024) if value else None
+
+
+AUDIT_PARTITIONS = AuditPartitions(engine, Audit.__table__)
+
+REQUEST_FEED = ChangeFeed(engine, BidRequestEvent.__table__, BidRequest.__table__, BUS)
+
+UPLOADS_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+UPLOADS = ChunkedUploads(UPLOADS_DIR)
+UPLOAD_SESSION_TTL = timedelta(hours=float(os.getenv("FRANKLIN_UPLOAD_TTL_HOURS", "24")))
+
+
+def _expire_upload_sessions() -> int:
+    """Drop chunked uploads that have been idle past FRANKLIN_UPLOAD_TTL_HOURS"""
+    cutoff = datetime.now(timezone.utc) - UPLOAD_SESSION_TTL
+    with Session(engine) as s:
+        stale = s.exec(select(UploadSession).where(
+            UploadSession.status == "uploading", UploadSession.updated_at < cutoff
+        )).all()
+        for session in stale:
+            UPLOADS.discard(session.upload_id)
+            s.exec(delete(UploadChunk).where(UploadChunk.upload_id == session.upload_id))
+            s.delete(session)
+        s.commit()
+    return len(stale)
+
+
+BLOBS = BlobStore(os.path.join(UPLOADS_DIR, "blobs"), Blob.__table__)
+
+
+def _register_upload(filename: str, file_type: str, sha256: str, size: int,
+                     src_path: Optional[str] = None) -> Dict[str, Any]:
+    """Point a new UploadedFile at the blob for sha256, storing src_path only if the content is new"""
+    if src_path:
+        BLOBS.adopt(src_path, sha256)
+    pipeline_id = None
+    with Session(engine) as s:
+        blob = BLOBS.link(s.connection(), sha256, size)
+        uploaded_file = UploadedFile(
+            file_uuid=str(uuid.uuid4()),
+            filename=filename,
+            file_path=blob["path"],
+            file_size=size,
+            file_type=file_type,
+            sha256=sha256,
+            # A blob processed before hands its result to every new copy
+            processed=blob["processing_result"] is not None,
+            processing_result=blob["processing_result"],
+        )
+        s.add(uploaded_file)
+        s.commit()
+        s.refresh(uploaded_file)
+    if not uploaded_file.processed and DOCUMENT_AUTO_PROCESS:
+        pipeline_id = _queue_processing(uploaded_file)
+    return {
+        "fileId": uploaded_file.file_uuid,
+        "filename": filename,
+        "size": size,
+        "type": file_type,
+        "sha256": sha256,
+        "deduplicated": blob["ref_count"] > 1,
+        "processed": uploaded_file.processed,
+        "pipelineId": pipeline_id,
+    }
+
+
+def _store_document_result(sha256: str, result: Dict[str, Any], done: bool):
+    """DocumentPipeline callback: partial/failed results go on the files, finished ones on the blob too"""
+    if done:
+        store_processing_result(sha256, json.dumps(result))
+        return
+    with Session(engine) as s:
+        s.exec(update(UploadedFile).where(UploadedFile.sha256 == sha256, UploadedFile.processed == False)
+               .values(processing_result=json.dumps(result)))
+        s.commit()
+
+
+DOCUMENTS = DocumentPipeline(os.path.join(UPLOADS_DIR, "artifacts"), _store_document_result)
+DOCUMENT_AUTO_PROCESS = os.getenv("FRANKLIN_AUTO_PROCESS", "1") == "1"
+EXPORTS = ExportRenderer(os.path.join(UPLOADS_DIR, "exports"))
+SPEECH = SpeechSynthesizer(os.path.join(UPLOADS_DIR, "speech"), GOOGLE_API_KEY)
+
+
+def _queue_processing(file: UploadedFile) -> Optional[str]:
+    """Hand an upload to the document pipeline; None if its type is not processable"""
+    if not file.sha256 or not DOCUMENTS.running or not detect_kind(file.filename, file.file_type):
+        return None
+    pipeline_id = DOCUMENTS.submit(file.sha256, file.file_path, file.filename, file.file_type)
+    with Session(engine) as s:
+        s.exec(update(UploadedFile).where(UploadedFile.sha256 == file.sha256, UploadedFile.processed == False)
+               .values(pipeline_id=pipeline_id))
+        s.commit()
+    return pipeline_id
+
+
+def cached_processing_result(sha256: str) -> Optional[str]:
+    """Processing output already stored for this content, if any"""
+    with Session(engine) as s:
+        blob = s.get(Blob, sha256)
+        return blob.processing_result if blob else None
+
+
+def store_processing_result(sha256: str, result: str):
+    """Cache a processing result on the blob and every UploadedFile sharing it"""
+    with Session(engine) as s:
+        s.exec(update(Blob).where(Blob.sha256 == sha256)
+               .values(processing_result=result, processed_at=datetime.now(timezone.utc)))
+        s.exec(update(UploadedFile).where(UploadedFile.sha256 == sha256)
+               .values(processed=True, processing_result=result))
+        s.commit()
+
+
+MAINTENANCE = MaintenanceJob(engine, [
+    SweepTarget(
+        AIResponseCache.__table__, "hit_count", "last_hit",
+        size_columns=["response_content", "response_metadata"],
+        max_rows=_env_int("FRANKLIN_CACHE_MAX_ROWS"),
+        max_bytes=_env_mb("FRANKLIN_CACHE_MAX_MB"),
+    ),
+    SweepTarget(
+        CognitiveMemory.__table__, "access_count", "last_accessed",
+        size_columns=["memory_value", "context", "meta_data", "embedding_vector"],
+        max_rows=_env_int("FRANKLIN_MEMORY_MAX_ROWS"),
+        max_bytes=_env_mb("FRANKLIN_MEMORY_MAX_MB"),
+        notify_columns=["memory_key", "memory_type"],
+        on_delete=lambda rows: [invalidate_memory(key, memory_type) for key, memory_type in set(rows)],
+    ),
+], hooks={
+    "audit_partitions": AUDIT_PARTITIONS.run,
+    "request_feed": REQUEST_FEED.prune,
+    "uploads": _expire_upload_sessions,
+    "blobs": lambda: BLOBS.collect(engine),
+    "vectors": lambda: VECTORS.compact(_live_vector_pointers, _relink_vectors),
+    "exports": EXPORTS.prune,
+    "speech": SPEECH.prune,
+})
 
 
 def retrieve_memory(key: str, memory_type: Optional[str] = None) -> Optional[str]:
-    """Retrieve cognitive memory and update access tracking"""
+    """Retrieve cognitive memory; access tracking is buffered in MEMORY_ACCESS"""
+    cached = HOT_MEMORY.get((key, memory_type))
+    if cached:
+        memory_id, value = cached
+        MEMORY_ACCESS.record(memory_id)
+        return value
+
     with Session(engine) as s:
         query = select(CognitiveMemory).where(CognitiveMemory.memory_key == key)
         if memory_type:
@@ -302,17 +701,97 @@ def retrieve_memory(key: str, memory_type: Optional[str] = None) -> Optional[str
         memory = s.exec(query).first()
         if memory:
             # Check if expired
-            if memory.expires_at and memory.expires_at < datetime.now(timezone.utc):
+            expires_at = as_utc(memory.expires_at)
+            if expires_at and expires_at < datetime.now(timezone.utc):
                 return None
-            # Update access tracking
-            memory.access_count += 1
-            memory.last_accessed = datetime.now(timezone.utc)
-            s.add(memory)
-            s.commit()
+            HOT_MEMORY.set(
+                (key, memory_type),
+                (memory.id, memory.memory_value),
+                expires_at=expires_at.timestamp() if expires_at else None,
+            )
+            MEMORY_ACCESS.record(memory.id)
             return memory.memory_value
     return None
 
 
+def search_similar_memories(vector: List[float], top_k: int = 10,
+                            memory_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rank live memories by cosine similarity against the vector segments"""
+    # Over-fetch: stale pointers (rolled-back or migrated rows), other memory
+    # types and expired rows are dropped below; widen until top_k survive
+    fetch = top_k * 2
+    while True:
+        hits = VECTORS.search(vector, top_k=fetch)
+        if not hits:
+            return []
+        now = datetime.now(timezone.utc)
+        with Session(engine) as s:
+            rows = s.exec(select(CognitiveMemory).where(CognitiveMemory.id.in_([h[0] for h in hits]))).all()
+            by_id = {m.id: m for m in rows}
+        results = []
+        for memory_id, pointer, score in hits:
+            m = by_id.get(memory_id)
+            if not m or m.embedding_ref != pointer:
+                continue
+            if memory_type and m.memory_type != memory_type:
+                continue
+            if m.expires_at and as_utc(m.expires_at) < now:
+                continue
+            results.append({"id": m.id, "key": m.memory_key, "type": m.memory_type, "score": round(score, 6)})
+            if len(results) >= top_k:
+                return results
+        if len(hits) < fetch:  # every stored vector has been considered
+            return results
+        fetch *= 4
+
+
+def _live_vector_pointers():
+    with engine.connect() as conn:
+        yield from conn.execute(
+            select(CognitiveMemory.embedding_ref).where(CognitiveMemory.embedding_ref.is_not(None))
+        ).scalars()
+
+
+def _relink_vectors(moves: Dict[str, str]):
+    """Repoint memories at vector records moved by VECTORS.compact()"""
+    table = CognitiveMemory.__table__
+    with engine.begin() as conn:
+        conn.execute(
+            update(table).where(table.c.embedding_ref == bindparam("old")).values(embedding_ref=bindparam("new")),
+            [{"old": old, "new": new} for old, new in moves.items()],
+        )
+
+
+def migrate_json_embeddings(batch_size: int = 500) -> Dict[str, int]:
+    """Move legacy JSON embedding_vector values into binary vector segments"""
+    migrated = failed = 0
+    last_id = 0
+    while True:
+        with Session(engine) as s:
+            rows = s.exec(
+                select(CognitiveMemory)
+                .where(CognitiveMemory.id > last_id)
+                .where(CognitiveMemory.embedding_vector.is_not(None))
+                .where(CognitiveMemory.embedding_ref.is_(None))
+                .order_by(CognitiveMemory.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for m in rows:
+                last_id = m.id
+                try:
+                    m.embedding_ref = VECTORS.append(m.id, json.loads(m.embedding_vector))
+                except (ValueError, TypeError):
+                    failed += 1
+                    continue
+                m.embedding_vector = None
+                s.add(m)
+                migrated += 1
+            s.commit()
+    return {"migrated": migrated, "failed": failed}
+
+
 # ---------------- AI MODELS ----------------
 AIType = Literal["text", "image", "audio", "code", "analysis", "vision"]
 
@@ -778,6 +1257,20 @@ async def _worker():
 @app.on_event("startup")
 async def _startup():
     asyncio.create_task(_worker())
+    MEMORY_ACCESS.start()
+    MAINTENANCE.start()
+    AUDIT_WRITER.start()
+    DOCUMENTS.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    DOCUMENTS.stop()
+    EXPORTS.stop()
+    await SPEECH.aclose()
+    MAINTENANCE.stop()
+    MEMORY_ACCESS.stop()
+    AUDIT_WRITER.stop()
 
 
 if __name__ == "__main__":
@@ -820,73 +1313,217 @@ def register(email: str, role: str):
         return {"token": create_token(user), "user_id": user.id}
 
 
+@app.get("/auth/me")
+def whoami(req: Request):
+    principal = get_principal(req)
+    return principal.model_dump()
+
+
+@app.post("/auth/revoke")
+def revoke(req: Request, user_id: Optional[int] = None):
+    """Revoke all tokens for the caller (or, for admins, any user)"""
+    principal = get_principal(req)
+    target = user_id or principal.id
+    if target != principal.id and principal.role != "admin":
+        raise HTTPException(403, "Only admins can revoke other users' tokens")
+    version = revoke_tokens(target)
+    audit("user.revoke_tokens", {"user_id": target, "by": principal.id})
+    return {"user_id": target, "token_version": version, "status": "revoked"}
+
+
 # ---------------- BID REQUESTS ----------------
 @app.post("/requests")
 def create_request(title: str, description: str, req: Request):
-    user = get_user(req)
+    user = get_principal(req)
     if user.role != "client":
         raise HTTPException(403, "Only clients can create requests")
     with Session(engine) as s:
         br = BidRequest(client_id=user.id, title=title, description=description)
         s.add(br)
+        s.flush()
+        event = BidRequestEvent(request_id=br.id, kind="created")
+        s.add(event)
+        s.add(BidStats(request_id=br.id))
         s.commit()
         s.refresh(br)
+        REQUEST_FEED.publish(event.id)
         audit("request.create", {"request_id": br.id})
         return br
 
 
 @app.get("/requests")
-def list_requests():
+def list_requests(request: Request, response: Response, limit: int = pagination.DEFAULT_PAGE_SIZE,
+                  cursor: Optional[str] = None, stream: bool = False):
+    query = select(BidRequest).where(BidRequest.open == True)
+    if pagination.wants_stream(request, stream):
+        return StreamingResponse(
+            pagination.stream_rows(engine, query, BidRequest.created_at, BidRequest.id,
+                                   lambda r: r.model_dump(), cursor=cursor),
+            media_type=ndjson.NDJSON_MEDIA_TYPE,
+        )
+    with Session(engine) as s:
+        rows, next_cursor = pagination.fetch_page(s, query, BidRequest.created_at, BidRequest.id, limit, cursor)
+    pagination.set_page_headers(request, response, next_cursor)
+    return rows
+
+
+@app.get("/requests/search")
+def search_requests(q: str, open: bool = True, client_id: Optional[int] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    min_bids: Optional[int] = None, max_price: Optional[float] = None,
+                    limit: int = 20, offset: int = 0):
+    """Ranked full-text search over request titles and descriptions, with bid stats"""
+    limit = max(1, min(limit, 200))
+    try:
+        results = REQUEST_SEARCH.search(
+            q, open_only=open, client_id=client_id, since=since, until=until,
+            min_bids=min_bids, max_price=max_price, limit=limit, offset=max(0, offset),
+        )
+    except SearchUnavailable as ex:
+        raise HTTPException(501, str(ex)) from None
+    return {
+        "query": q,
+        "results": results,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(results) == limit else None,
+    }
+
+
+@app.get("/requests/{request_id}/stats")
+def request_stats(request_id: int):
+    """Bid count, min/median/max price and time to first bid for one request"""
     with Session(engine) as s:
-        return s.exec(select(BidRequest).where(BidRequest.open == True)).all()
+        stats = s.get(BidStats, request_id)
+        if not stats:
+            raise HTTPException(404, "Request not found")
+        return stats_summary(stats)
+
+
+@app.get("/requests/changes")
+def request_changes(since: int = 0, keywords: Optional[str] = None, limit: int = pagination.DEFAULT_PAGE_SIZE):
+    """Created/closed request events after a cursor (polling alternative to /requests/feed).
+
+    Events from the last few seconds are returned again on the next poll; skip ids already seen.
+    """
+    events, cursor = REQUEST_FEED.fetch(since, parse_keywords(keywords), pagination.clamp_limit(limit))
+    return {"events": events, "cursor": cursor}
+
+
+@app.get("/requests/feed")
+async def request_feed(request: Request, since: Optional[int] = None, keywords: Optional[str] = None):
+    """Server-sent events for new and closed requests; resume with ?since= or Last-Event-ID"""
+    cursor = await run_in_threadpool(REQUEST_FEED.resolve_cursor, since, request.headers.get("last-event-id"))
+    return StreamingResponse(
+        REQUEST_FEED.stream(request, cursor, parse_keywords(keywords)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ---------------- BIDS ----------------
 @app.post("/bids")
 def submit_bid(request_id: int, price: float, message: str, req: Request):
-    user = get_user(req)
+    user = get_principal(req)
     if user.role != "contractor":
         raise HTTPException(403, "Only contractors can bid")
-    with Session(engine) as s:
-        req_obj = s.get(BidRequest, request_id)
-        if not req_obj or not req_obj.open:
-            raise HTTPException(404, "Request closed or missing")
-        bid = Bid(request_id=request_id, contractor_id=user.id, price=price, message=message)
-        s.add(bid)
-        s.commit()
-        s.refresh(bid)
-        audit("bid.submit", {"bid_id": bid.id})
-        return bid
+    for _ in range(BID_STATS_RETRIES):
+        with Session(engine) as s:
+            req_obj = s.get(BidRequest, request_id)
+            if not req_obj or not req_obj.open:
+                raise HTTPException(404, "Request closed or missing")
+            bid = Bid(request_id=request_id, contractor_id=user.id, price=price, message=message)
+            s.add(bid)
+            try:
+                # Write the bid first so SQLite takes its write lock before the stats row is read
+                s.flush()
+                folded = fold_bid_stats(s.connection(), BidStats.__table__, request_id,
+                                        lambda stats: record_bid(stats, price, bid.created_at, req_obj.created_at))
+            except OperationalError:  # SQLite busy or stale snapshot
+                folded = False
+            if not folded:
+                s.rollback()
+                continue
+            s.commit()
+            s.refresh(bid)
+            audit("bid.submit", {"bid_id": bid.id})
+            return bid
+    raise HTTPException(503, "Bid statistics are busy, try again", headers={"Retry-After": "1"})
 
 
 # ---------------- CONTRACTS ----------------
 @app.post("/bids/{bid_id}/accept")
 def accept_bid(bid_id: int, req: Request):
-    user = get_user(req)
-    with Session(engine) as s:
-        bid = s.get(Bid, bid_id)
-        if not bid:
-            raise HTTPException(404, "Bid not found")
-        br = s.get(BidRequest, bid.request_id)
-        if br.client_id != user.id:
-            raise HTTPException(403, "Not your request")
-        bid.accepted = True
-        br.open = False
-        contract = Contract(bid_id=bid.id, contract_uuid=str(uuid.uuid4()))
-        s.add(bid)
-        s.add(br)
-        s.add(contract)
-        s.commit()
-        s.refresh(contract)
-        audit("contract.create", {"contract_uuid": contract.contract_uuid})
-        return contract
+    user = get_principal(req)
+    for _ in range(BID_STATS_RETRIES):
+        with Session(engine) as s:
+            bid = s.get(Bid, bid_id)
+            if not bid:
+                raise HTTPException(404, "Bid not found")
+            br = s.get(BidRequest, bid.request_id)
+            if br.client_id != user.id:
+                raise HTTPException(403, "Not your request")
+            bid.accepted = True
+            br.open = False
+            contract = Contract(bid_id=bid.id, contract_uuid=str(uuid.uuid4()))
+            event = BidRequestEvent(request_id=br.id, kind="closed")
+            s.add(bid)
+            s.add(br)
+            s.add(contract)
+            s.add(event)
+            try:
+                s.flush()
+                folded = fold_bid_stats(s.connection(), BidStats.__table__, br.id,
+                                        lambda stats: record_accept(stats, bid.id, bid.price,
+                                                                    datetime.now(timezone.utc)))
+            except OperationalError:
+                folded = False
+            if not folded:
+                s.rollback()
+                continue
+            s.commit()
+            s.refresh(contract)
+            REQUEST_FEED.publish(event.id)
+            audit("contract.create", {"contract_uuid": contract.contract_uuid})
+            return contract
+    raise HTTPException(503, "Bid statistics are busy, try again", headers={"Retry-After": "1"})
 
 
 # ---------------- ADMIN ----------------
 @app.get("/admin/audit")
-def read_audit():
+def read_audit(request: Request, response: Response, limit: int = pagination.DEFAULT_PAGE_SIZE,
+               cursor: Optional[str] = None, event: Optional[str] = None, stream: bool = False):
+    query = select(Audit)
+    if event:
+        query = query.where(Audit.event == event)
+    if pagination.wants_stream(request, stream):
+        return StreamingResponse(
+            pagination.stream_rows(engine, query, Audit.created_at, Audit.id, lambda r: r.model_dump(), cursor=cursor),
+            media_type=ndjson.NDJSON_MEDIA_TYPE,
+        )
     with Session(engine) as s:
-        return s.exec(select(Audit).order_by(Audit.created_at.desc())).all()
+        rows, next_cursor = pagination.fetch_page(s, query, Audit.created_at, Audit.id, limit, cursor)
+    pagination.set_page_headers(request, response, next_cursor)
+    return rows
+
+
+@app.get("/admin/audit/history")
+def read_audit_history(since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       event: Optional[str] = None, limit: int = 100):
+    """Audit events across hot, rolled-over and archived partitions (newest first)"""
+    return AUDIT_PARTITIONS.history(since=since, until=until, event=event, limit=pagination.clamp_limit(limit))
+
+
+@app.get("/admin/audit/partitions")
+def audit_partitions():
+    return AUDIT_PARTITIONS.stats()
+
+
+@app.post("/admin/audit/rollover")
+def audit_rollover():
+    """Roll old months out of the hot table and archive partitions past retention now"""
+    AUDIT_WRITER.flush()
+    return AUDIT_PARTITIONS.run()
 
 
 # ---------------- HEALTH ----------------
@@ -895,6 +1532,69 @@ def health():
     return {"status": "ok", "system": APP_NAME, "time": datetime.now(timezone.utc).isoformat()}
 
 
+@app.get("/admin/metrics")
+def storage_metrics():
+    """Counters for the background storage components"""
+    return {
+        "memory_access": MEMORY_ACCESS.stats(),
+        "vectors": VECTORS.stats(),
+        "maintenance": MAINTENANCE.stats(),
+        "memory_cache": {**HOT_MEMORY.stats(), "invalidation_bus": BUS.backend},
+        "audit": AUDIT_WRITER.stats(),
+        "request_feed": REQUEST_FEED.stats(),
+        "uploads": {**UPLOADS.stats(), "blobs": BLOBS.stats()},
+        "documents": DOCUMENTS.stats(),
+        "exports": EXPORTS.stats(),
+        "speech": SPEECH.stats(),
+    }
+
+
+ENGINE_REGISTRY = EngineRegistry(engine)
+
+
+class EngineOverrideModel(BaseModel):
+    disabled: Optional[bool] = None
+    pinned: Optional[bool] = None
+    weight_bias: Optional[float] = None
+    cost_per_1k_tokens: Optional[float] = None
+
+
+@app.get("/admin/engines")
+def list_engines(prompt: Optional[str] = None):
+    """Trinity engine registry: rolling latency/pass-rate stats, scores and overrides.
+
+    With ``prompt`` the scores include its keyword route and the resulting order is shown.
+    """
+    from trinity_orchestrator_unified import classify_prompt
+
+    ENGINE_REGISTRY.load()  # stats are written by the orchestrator processes
+    classified = classify_prompt(prompt) if prompt else None
+    body: Dict[str, Any] = {"engines": ENGINE_REGISTRY.snapshot(classified), "weights": ENGINE_REGISTRY.weights}
+    if prompt:
+        body["classified"] = classified
+        body["order"] = ENGINE_REGISTRY.route(classified, explore=False)
+    return body
+
+
+@app.patch("/admin/engines/{engine_id}")
+def override_engine(engine_id: str, req: EngineOverrideModel):
+    """Freeze/unfreeze (disabled), pin, bias or re-cost an engine; orchestrators pick it up on refresh"""
+    if engine_id not in ENGINE_REGISTRY.snapshot():
+        raise HTTPException(404, "Engine not found")
+    changes = req.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(400, "No overrides given")
+    entry = ENGINE_REGISTRY.set_override(engine_id, **changes)
+    audit("engine_override", {"engine": engine_id, **changes})
+    return entry
+
+
+@app.post("/admin/maintenance/run")
+def run_maintenance(vacuum: bool = False):
+    """Run the TTL sweep / cap eviction now instead of waiting for the next interval"""
+    return MAINTENANCE.run_once(force_vacuum=vacuum)
+
+
 # ---------------- AI ROUTES ----------------
 @app.post("/api/ai/execute", response_model=AIResponseModel)
 async def ai_execute(request: AIRequestModel):
@@ -936,46 +1636,187 @@ def get_task(task_id: str):
 # ---------------- FILE UPLOAD FOR PIPELINES ----------------
 from fastapi import UploadFile, File as FastAPIFile
 
+async def _upload_body(file: UploadFile):
+    while True:
+        data = await file.read(1024 * 1024)
+        if not data:
+            return
+        yield data
+
+
 @app.post("/api/files/upload")
 async def upload_file(file: UploadFile = FastAPIFile(...)):
-    """Upload file for pipeline processing"""
-    import shutil
-    
-    # Create uploads directory if it doesn't exist
-    uploads_dir = os.path.join(os.path.dirname(__file__), "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
-    
-    # Generate unique file ID
-    file_uuid = str(uuid.uuid4())
-    file_ext = os.path.splitext(file.filename)[1]
-    file_path = os.path.join(uploads_dir, f"{file_uuid}{file_ext}")
-    
-    # Save file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    file_size = os.path.getsize(file_path)
-    
+    """Upload file for pipeline processing; identical content is stored once"""
+    # Save file off the event loop, hashing as it streams
+    tmp_path = os.path.join(UPLOADS.partial_dir, f"{uuid.uuid4()}.upload")
+    try:
+        sha256, file_size = await stream_to_file(tmp_path, _upload_body(file))
+    except ChunkError as ex:
+        raise HTTPException(413, str(ex)) from None
+
     # Store in database
+    result = await run_in_threadpool(
+        _register_upload, file.filename, file.content_type or "application/octet-stream", sha256, file_size, tmp_path
+    )
+    audit("file.upload", {"file_uuid": result["fileId"], "filename": file.filename, "sha256": sha256})
+    return result
+
+
+def _upload_session(upload_id: str) -> UploadSession:
     with Session(engine) as s:
-        uploaded_file = UploadedFile(
-            file_uuid=file_uuid,
-            filename=file.filename,
-            file_path=file_path,
-            file_size=file_size,
-            file_type=file.content_type or "application/octet-stream"
+        session = s.get(UploadSession, upload_id)
+    if not session:
+        raise HTTPException(404, "Upload not found")
+    return session
+
+
+def _received_chunks(upload_id: str) -> List[int]:
+    with Session(engine) as s:
+        return list(s.exec(
+            select(UploadChunk.chunk_index).where(UploadChunk.upload_id == upload_id).order_by(UploadChunk.chunk_index)
+        ).all())
+
+
+def _received_chunk(upload_id: str, index: int) -> Optional[UploadChunk]:
+    with Session(engine) as s:
+        return s.get(UploadChunk, (upload_id, index))
+
+
+def _upload_status(session: UploadSession, received: List[int]) -> Dict[str, Any]:
+    have = set(received)
+    return {
+        "uploadId": session.upload_id,
+        "filename": session.filename,
+        "size": session.file_size,
+        "chunkSize": session.chunk_size,
+        "totalChunks": session.total_chunks,
+        "chunkUrl": f"/api/uploads/{session.upload_id}/chunks/{{index}}",
+        "status": session.status,
+        "received": received,
+        "missing": [i for i in range(session.total_chunks) if i not in have],
+        "fileId": session.file_uuid,
+    }
+
+
+@app.post("/api/uploads/init")
+def init_chunked_upload(filename: str, size: int, content_type: Optional[str] = None,
+                        chunk_size: int = UPLOAD_CHUNK_SIZE, sha256: Optional[str] = None):
+    """Start a resumable upload; PUT each chunk (in any order, in parallel) then POST complete.
+
+    Clients that know the SHA-256 up front skip the transfer entirely when it is already stored.
+    """
+    if size <= 0 or size > UPLOAD_MAX_BYTES:
+        raise HTTPException(413, f"Upload size must be between 1 and {UPLOAD_MAX_BYTES} bytes")
+    if sha256:
+        with engine.connect() as conn:
+            blob = BLOBS.lookup(conn, sha256.lower())
+        if blob and blob["size"] == size:
+            result = _register_upload(filename, content_type or "application/octet-stream", blob["sha256"], size)
+            audit("file.upload", {"file_uuid": result["fileId"], "filename": filename, "sha256": blob["sha256"]})
+            return {**result, "status": "completed"}
+    chunk_size = max(256 * 1024, min(chunk_size, 64 * 1024 * 1024))
+    session = UploadSession(
+        upload_id=str(uuid.uuid4()),
+        filename=filename,
+        file_type=content_type or "application/octet-stream",
+        file_size=size,
+        chunk_size=chunk_size,
+        total_chunks=chunk_count(size, chunk_size),
+    )
+    UPLOADS.create(session.upload_id, size)
+    with Session(engine) as s:
+        s.add(session)
+        s.commit()
+        s.refresh(session)
+    return _upload_status(session, [])
+
+
+@app.get("/api/uploads/{upload_id}")
+def chunked_upload_status(upload_id: str):
+    """Which chunks have arrived; clients resume by sending only the missing ones"""
+    session = _upload_session(upload_id)
+    return _upload_status(session, _received_chunks(upload_id))
+
+
+@app.put("/api/uploads/{upload_id}/chunks/{index}")
+async def put_upload_chunk(upload_id: str, index: int, request: Request):
+    """Stream one chunk into place; optional X-Chunk-SHA256 is verified before it is recorded"""
+    session = await run_in_threadpool(_upload_session, upload_id)
+    if session.status != "uploading" or not UPLOADS.exists(upload_id):
+        raise HTTPException(409, f"Upload is {session.status}")
+    existing = await run_in_threadpool(_received_chunk, upload_id, index)
+    if existing:
+        return {"index": index, "size": existing.size, "duplicate": True}
+
+    checksum = request.headers.get("x-chunk-sha256")
+    try:
+        size = await UPLOADS.write_chunk(upload_id, index, session.file_size, session.chunk_size,
+                                         request.stream(), expected_sha256=checksum)
+    except ChunkError as ex:
+        raise HTTPException(400, str(ex)) from None
+
+    def record() -> List[int]:
+        with Session(engine) as s:
+            s.add(UploadChunk(upload_id=upload_id, chunk_index=index, size=size, sha256=checksum))
+            s.exec(update(UploadSession).where(UploadSession.upload_id == upload_id)
+                   .values(updated_at=datetime.now(timezone.utc)))
+            try:
+                s.commit()
+            except IntegrityError:
+                s.rollback()  # a retry of this chunk raced us; same bytes, same range
+        return _received_chunks(upload_id)
+
+    received = await run_in_threadpool(record)
+    # Pull the whole-file hash forward over chunks that arrived ahead of it
+    await run_in_threadpool(UPLOADS.advance, upload_id, session.file_size, session.chunk_size, received)
+    return {"index": index, "size": size, "received": len(received), "totalChunks": session.total_chunks}
+
+
+@app.post("/api/uploads/{upload_id}/complete")
+async def complete_chunked_upload(upload_id: str, sha256: Optional[str] = None):
+    """Finalize: the chunks were written in place, so this only finishes the hash and renames"""
+    session = await run_in_threadpool(_upload_session, upload_id)
+    if session.status == "completed":
+        return {"fileId": session.file_uuid, "status": "completed"}
+    received = await run_in_threadpool(_received_chunks, upload_id)
+    if len(received) != session.total_chunks:
+        raise HTTPException(409, {"detail": "Upload incomplete", **_upload_status(session, received)})
+
+    try:
+        digest, file_size = await run_in_threadpool(
+            UPLOADS.finish, upload_id, session.file_size, session.chunk_size, None
         )
-        s.add(uploaded_file)
+    except ChunkError as ex:
+        raise HTTPException(409, str(ex)) from None
+    if sha256 and sha256.lower() != digest:
+        raise HTTPException(422, f"SHA-256 mismatch: expected {sha256}, received {digest}")
+    # Renamed into the blob store, or dropped if that content is already there
+    result = await run_in_threadpool(
+        _register_upload, session.filename, session.file_type, digest, file_size, UPLOADS.part_path(upload_id)
+    )
+
+    with Session(engine) as s:
+        s.exec(delete(UploadChunk).where(UploadChunk.upload_id == upload_id))
+        s.exec(update(UploadSession).where(UploadSession.upload_id == upload_id)
+               .values(status="completed", file_uuid=result["fileId"], updated_at=datetime.now(timezone.utc)))
         s.commit()
-        s.refresh(uploaded_file)
-        audit("file.upload", {"file_uuid": file_uuid, "filename": file.filename})
-        
-        return {
-            "fileId": file_uuid,
-            "filename": file.filename,
-            "size": file_size,
-            "type": file.content_type
-        }
+    audit("file.upload", {"file_uuid": result["fileId"], "filename": session.filename, "sha256": digest,
+                          "chunks": session.total_chunks})
+    return {**result, "status": "completed"}
+
+
+@app.delete("/api/uploads/{upload_id}")
+def abort_chunked_upload(upload_id: str):
+    """Abandon an in-progress upload and free its partial file"""
+    session = _upload_session(upload_id)
+    if session.status == "completed":
+        raise HTTPException(409, "Upload already completed")
+    UPLOADS.discard(upload_id)
+    with Session(engine) as s:
+        s.exec(delete(UploadChunk).where(UploadChunk.upload_id == upload_id))
+        s.exec(delete(UploadSession).where(UploadSession.upload_id == upload_id))
+        s.commit()
+    return {"uploadId": upload_id, "status": "aborted"}
 
 
 @app.get("/api/files/{file_id}")
@@ -988,6 +1829,144 @@ def get_file_info(file_id: str):
         return file
 
 
+def _uploaded_file(file_id: str) -> UploadedFile:
+    with Session(engine) as s:
+        file = s.exec(select(UploadedFile).where(UploadedFile.file_uuid == file_id)).first()
+    if not file:
+        raise HTTPException(404, "File not found")
+    return file
+
+
+@app.api_route("/api/files/{file_id}/download", methods=["GET", "HEAD"])
+def download_file(file_id: str, request: Request, inline: bool = False):
+    """File content with Range/If-Range, ETag (the SHA-256) and If-None-Match; never buffered in memory"""
+    file = _uploaded_file(file_id)
+    if file.sha256:
+        etag = f'"{file.sha256}"'
+    else:
+        st = os.stat(file.file_path) if os.path.exists(file.file_path) else None
+        etag = file_etag(file.file_path, st.st_size if st else 0, st.st_mtime_ns if st else 0)
+    return serve_file(request, file.file_path, etag, media_type=file.file_type, filename=file.filename,
+                      inline=inline, last_modified=file.created_at)
+
+
+@app.get("/api/files/{file_id}/artifacts")
+def list_file_artifacts(file_id: str):
+    """Generated page images / previews for a processed file"""
+    file = _uploaded_file(file_id)
+    names = list_artifacts(os.path.join(DOCUMENTS.artifact_root, file.sha256)) if file.sha256 else []
+    return [{"name": n, "url": f"/api/files/{file_id}/artifacts/{n}"} for n in names]
+
+
+@app.api_route("/api/files/{file_id}/artifacts/{name}", methods=["GET", "HEAD"])
+def download_artifact(file_id: str, name: str, request: Request):
+    """One generated artifact, served like /download"""
+    file = _uploaded_file(file_id)
+    if not file.sha256 or name != os.path.basename(name) or name.startswith("."):
+        raise HTTPException(404, "Artifact not found")
+    path = os.path.join(DOCUMENTS.artifact_root, file.sha256, name)
+    if not os.path.isfile(path):
+        raise HTTPException(404, "Artifact not found")
+    st = os.stat(path)
+    media_type = "image/png" if name.endswith(".png") else "application/octet-stream"
+    return serve_file(request, path, file_etag(file.sha256, name, st.st_size, st.st_mtime_ns),
+                      media_type=media_type, filename=name, inline=True,
+                      last_modified=datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+
+@app.post("/api/files/{file_id}/process")
+def process_file(file_id: str, force: bool = False):
+    """Extract text, page images and metadata in the background (cached per blob unless force=true)"""
+    with Session(engine) as s:
+        file = s.exec(select(UploadedFile).where(UploadedFile.file_uuid == file_id)).first()
+    if not file:
+        raise HTTPException(404, "File not found")
+    if not force:
+        cached = cached_processing_result(file.sha256) if file.sha256 else None
+        if cached:
+            if not file.processed:
+                store_processing_result(file.sha256, cached)
+            return {"fileId": file_id, "status": "completed", "cached": True}
+    try:
+        pipeline_id = _queue_processing(file)
+    except UnsupportedDocument as ex:
+        raise HTTPException(415, str(ex)) from None
+    if not pipeline_id:
+        raise HTTPException(415 if DOCUMENTS.running else 503, "File cannot be processed")
+    return {"fileId": file_id, "pipelineId": pipeline_id, "status": "queued"}
+
+
+@app.get("/api/files/{file_id}/processing")
+def file_processing_status(file_id: str, include_pages: bool = False):
+    """Progress (pages done / total, pages per second) and, once finished, the extracted result"""
+    with Session(engine) as s:
+        file = s.exec(select(UploadedFile).where(UploadedFile.file_uuid == file_id)).first()
+    if not file:
+        raise HTTPException(404, "File not found")
+    result = json.loads(file.processing_result) if file.processing_result else {}
+    if not include_pages:
+        result.pop("pages", None)
+    live = DOCUMENTS.job(file.pipeline_id) if file.pipeline_id else None
+    return {"fileId": file_id, "processed": file.processed, "pipelineId": file.pipeline_id,
+            "job": live, "result": result}
+
+
+@app.delete("/api/files/{file_id}")
+def delete_file(file_id: str):
+    """Remove an upload; its blob is garbage-collected once nothing else references it"""
+    with Session(engine) as s:
+        file = s.exec(select(UploadedFile).where(UploadedFile.file_uuid == file_id)).first()
+        if not file:
+            raise HTTPException(404, "File not found")
+        blob = s.get(Blob, file.sha256) if file.sha256 else None
+        own_copy = None if blob else file.file_path  # pre-dedup upload with its own file
+        if blob:
+            BLOBS.unlink(s.connection(), blob.sha256)
+        s.delete(file)
+        s.commit()
+    if own_copy and os.path.exists(own_copy):
+        os.remove(own_copy)
+    audit("file.delete", {"file_uuid": file_id})
+    return {"fileId": file_id, "status": "deleted"}
+
+
+@app.post("/admin/files/dedupe")
+def dedupe_files(batch_size: int = 100, after_id: int = 0):
+    """Move uploads stored before content addressing into the blob store.
+
+    Pages by id; call again with ``after_id=next_after_id`` until it is null.
+    Rows whose file is gone stay behind, so they are skipped rather than refetched.
+    """
+    moved = missing = 0
+    with Session(engine) as s:
+        legacy = s.exec(
+            select(UploadedFile)
+            .where(~UploadedFile.file_path.startswith(BLOBS.root), UploadedFile.id > after_id)
+            .order_by(UploadedFile.id)
+            .limit(batch_size)
+        ).all()
+        for file in legacy:
+            if not os.path.exists(file.file_path):
+                missing += 1
+                continue
+            if not file.sha256:
+                sha = hashlib.sha256()
+                with open(file.file_path, "rb") as f:
+                    for block in iter(lambda: f.read(4 * 1024 * 1024), b""):
+                        sha.update(block)
+                file.sha256 = sha.hexdigest()
+            file.file_path, _ = BLOBS.adopt(file.file_path, file.sha256)
+            blob = BLOBS.link(s.connection(), file.sha256, file.file_size)
+            if blob["processing_result"] is None and file.processing_result is not None:
+                s.exec(update(Blob).where(Blob.sha256 == file.sha256)
+                       .values(processing_result=file.processing_result, processed_at=datetime.now(timezone.utc)))
+            s.add(file)
+            moved += 1
+        next_after_id = legacy[-1].id if len(legacy) == batch_size else None
+        s.commit()
+    return {"moved": moved, "missing": missing, "next_after_id": next_after_id, "blobs": BLOBS.stats()}
+
+
 # ---------------- COGNITIVE MEMORY ENDPOINTS ----------------
 class MemoryStoreRequest(BaseModel):
     key: str
@@ -996,6 +1975,13 @@ class MemoryStoreRequest(BaseModel):
     context: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
     ttl_days: Optional[int] = None
+    embedding: Optional[List[float]] = None
+
+
+class MemorySimilarRequest(BaseModel):
+    vector: List[float]
+    top_k: int = PydanticField(default=10, ge=1, le=1000)
+    memory_type: Optional[str] = None
 
 
 @app.post("/api/memory/store")
@@ -1007,12 +1993,210 @@ def api_store_memory(req: MemoryStoreRequest):
         memory_type=req.memory_type,
         context=req.context,
         metadata=req.metadata,
-        ttl_days=req.ttl_days
+        ttl_days=req.ttl_days,
+        embedding=req.embedding
     )
     audit("memory.store", {"key": req.key, "type": req.memory_type})
     return {"id": memory.id, "key": memory.memory_key, "status": "stored"}
 
 
+@app.post("/api/memory/similar")
+def api_similar_memories(req: MemorySimilarRequest):
+    """Semantic search over stored memory embeddings"""
+    return search_similar_memories(req.vector, top_k=req.top_k, memory_type=req.memory_type)
+
+
+@app.post("/admin/memory/migrate-embeddings")
+def api_migrate_embeddings(batch_size: int = 500):
+    """Convert legacy JSON embeddings to binary vector segments"""
+    result = migrate_json_embeddings(batch_size=batch_size)
+    audit("memory.migrate_embeddings", result)
+    return {**result, **VECTORS.stats()}
+
+
+MEMORY_IMPORT_BATCH = int(os.getenv("FRANKLIN_MEMORY_IMPORT_BATCH", "5000"))
+MEMORY_EXPORT_FETCH = int(os.getenv("FRANKLIN_MEMORY_EXPORT_FETCH", "1000"))
+
+
+class MemoryImportRecord(MemoryStoreRequest):
+    expires_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+
+def _import_memory_batch(records: List[MemoryImportRecord]) -> int:
+    """Insert one batch of memories as a multi-row INSERT in a single transaction"""
+    table = CognitiveMemory.__table__
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "memory_key": r.key,
+            "memory_value": r.value,
+            "memory_type": r.memory_type,
+            "context": r.context,
+            "meta_data": json.dumps(r.metadata) if r.metadata else None,
+            "access_count": 0,
+            "last_accessed": now,
+            "created_at": r.created_at or now,
+            "expires_at": r.expires_at or (now + timedelta(days=r.ttl_days) if r.ttl_days else None),
+        }
+        for r in records
+    ]
+    with_vectors = [i for i, r in enumerate(records) if r.embedding]
+    with engine.begin() as conn:
+        if not with_vectors:
+            conn.execute(insert(table), rows)
+            return len(rows)
+        ids = conn.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows).scalars().all()
+        refs = [{"row_id": ids[i], "ref": VECTORS.append(ids[i], records[i].embedding)} for i in with_vectors]
+        conn.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(embedding_ref=bindparam("ref")),
+            refs,
+        )
+    return len(rows)
+
+
+def _memory_export_record(row, include_embeddings: bool) -> Dict[str, Any]:
+    record = {
+        "key": row["memory_key"],
+        "value": row["memory_value"],
+        "memory_type": row["memory_type"],
+        "context": row["context"],
+        "metadata": json.loads(row["meta_data"]) if row["meta_data"] else None,
+        "access_count": row["access_count"],
+        "created_at": as_utc(row["created_at"]),
+        "expires_at": as_utc(row["expires_at"]),
+    }
+    if include_embeddings:
+        if row["embedding_ref"]:
+            record["embedding"] = VECTORS.get(row["embedding_ref"]).tolist()
+        elif row["embedding_vector"]:
+            record["embedding"] = json.loads(row["embedding_vector"])
+    return record
+
+
+@app.post("/api/memory/import")
+async def api_import_memories(request: Request):
+    """Bulk-load memories from an NDJSON body (one MemoryStoreRequest per line)"""
+    stored = rejected = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[MemoryImportRecord] = []
+    try:
+        async for line_no, record, error in ndjson.aiter_records(request.stream()):
+            if not error:
+                try:
+                    batch.append(MemoryImportRecord.model_validate(record))
+                except ValidationError as ex:
+                    error = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in ex.errors())
+            if error:
+                rejected += 1
+                if len(errors) < 20:
+                    errors.append({"line": line_no, "error": error})
+                continue
+            if len(batch) >= MEMORY_IMPORT_BATCH:
+                stored += await run_in_threadpool(_import_memory_batch, batch)
+                batch = []
+        if batch:
+            stored += await run_in_threadpool(_import_memory_batch, batch)
+    except ndjson.LineTooLong as ex:
+        if stored:
+            invalidate_memory("*")
+        audit("memory.import", {"stored": stored, "rejected": rejected, "error": str(ex)})
+        raise HTTPException(413, f"{ex}; {stored} memories were stored before it") from None
+    except Exception as ex:
+        invalidate_memory("*")
+        audit("memory.import", {"stored": stored, "rejected": rejected, "error": str(ex)})
+        raise HTTPException(500, f"Memory import failed after {stored} memories: {ex}") from None
+
+    if stored:
+        invalidate_memory("*")
+    summary = {"stored": stored, "rejected": rejected}
+    audit("memory.import", summary)
+    return {**summary, "errors": errors}
+
+
+@app.get("/api/memory/export")
+def api_export_memories(memory_type: Optional[str] = None, since: Optional[datetime] = None,
+                        include_embeddings: bool = False):
+    """Stream memories as NDJSON using a server-side cursor"""
+    table = CognitiveMemory.__table__
+    query = select(table).order_by(table.c.id)
+    if memory_type:
+        query = query.where(table.c.memory_type == memory_type)
+    if since:
+        query = query.where(table.c.created_at >= since)
+
+    def rows():
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=MEMORY_EXPORT_FETCH).execute(query)
+            yield from ndjson.iter_lines(_memory_export_record(row, include_embeddings) for row in result.mappings())
+
+    return StreamingResponse(
+        rows(),
+        media_type=ndjson.NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": "attachment; filename=memories.ndjson"},
+    )
+
+
+@app.get("/api/memory/search")
+def api_search_memories(q: str, memory_type: Optional[str] = None, since: Optional[datetime] = None,
+                        until: Optional[datetime] = None, limit: int = 20, offset: int = 0):
+    """Ranked keyword search over memory values, context and metadata"""
+    limit = max(1, min(limit, 200))
+    try:
+        results = MEMORY_SEARCH.search(
+            q, memory_type=memory_type, since=since, until=until,
+            now=datetime.now(timezone.utc), limit=limit, offset=max(0, offset),
+        )
+    except SearchUnavailable as ex:
+        raise HTTPException(501, str(ex)) from None
+    return {
+        "query": q,
+        "results": results,
+        "limit": limit,
+        "offset": offset,
+        "next_offset": offset + limit if len(results) == limit else None,
+    }
+
+
+def _memory_summary(m: CognitiveMemory, include_pending: bool) -> Dict[str, Any]:
+    access_count, last_accessed = m.access_count, as_utc(m.last_accessed)
+    if include_pending:
+        hits, seen = MEMORY_ACCESS.pending(m.id)
+        access_count += hits
+        if seen and seen > last_accessed:
+            last_accessed = seen
+    return {
+        "id": m.id,
+        "key": m.memory_key,
+        "type": m.memory_type,
+        "access_count": access_count,
+        "created_at": as_utc(m.created_at).isoformat(),
+        "last_accessed": last_accessed.isoformat()
+    }
+
+
+# Declared before /api/memory/{key} so "list" is not captured as a key
+@app.get("/api/memory/list")
+def list_memories(request: Request, response: Response, memory_type: Optional[str] = None,
+                  limit: int = pagination.DEFAULT_PAGE_SIZE, cursor: Optional[str] = None,
+                  include_pending: bool = True, stream: bool = False):
+    """List stored memories (optionally folding in not-yet-flushed access counts)"""
+    query = select(CognitiveMemory)
+    if memory_type:
+        query = query.where(CognitiveMemory.memory_type == memory_type)
+    sort_col, id_col = CognitiveMemory.created_at, CognitiveMemory.id
+    if pagination.wants_stream(request, stream):
+        return StreamingResponse(
+            pagination.stream_rows(engine, query, sort_col, id_col,
+                                   lambda m: _memory_summary(m, include_pending), cursor=cursor),
+            media_type=ndjson.NDJSON_MEDIA_TYPE,
+        )
+    with Session(engine) as s:
+        memories, next_cursor = pagination.fetch_page(s, query, sort_col, id_col, limit, cursor)
+    pagination.set_page_headers(request, response, next_cursor)
+    return [_memory_summary(m, include_pending) for m in memories]
+
+
 @app.get("/api/memory/{key}")
 def api_retrieve_memory(key: str, memory_type: Optional[str] = None):
     """Retrieve cognitive memory"""
@@ -1022,40 +2206,19 @@ def api_retrieve_memory(key: str, memory_type: Optional[str] = None):
     return {"key": key, "value": value}
 
 
-@app.get("/api/memory/list")
-def list_memories(memory_type: Optional[str] = None, limit: int = 100):
-    """List stored memories"""
-    with Session(engine) as s:
-        query = select(CognitiveMemory)
-        if memory_type:
-            query = query.where(CognitiveMemory.memory_type == memory_type)
-        query = query.order_by(CognitiveMemory.created_at.desc()).limit(limit)
-        memories = s.exec(query).all()
-        return [
-            {
-                "id": m.id,
-                "key": m.memory_key,
-                "type": m.memory_type,
-                "access_count": m.access_count,
-                "created_at": m.created_at.isoformat(),
-                "last_accessed": m.last_accessed.isoformat()
-            }
-            for m in memories
-        ]
-
-
 # ---------------- EXPORT ENDPOINTS ----------------
-from fastapi.responses import StreamingResponse, FileResponse
-import io
-
 class ExportRequest(BaseModel):
     task_id: str
     format: Literal["excel", "word", "project", "audio", "jpeg"]
 
 
 @app.post("/api/export")
-async def export_data(req: ExportRequest):
-    """Export task results to various formats"""
+async def export_data(req: ExportRequest, request: Request):
+    """Export task results to various formats.
+
+    Files are rendered in the export worker pool and cached on disk per task,
+    format and response, so repeating an export serves the cached file.
+    """
     task = TASKS.get(req.task_id)
     if not task:
         raise HTTPException(404, "Task not found")
@@ -1065,171 +2228,103 @@ async def export_data(req: ExportRequest):
     
     export_format = req.format
     
-    # Excel Export
-    if export_format == "excel":
-        try:
-            from openpyxl import Workbook
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "AI Results"
-            
-            # Add headers
-            ws['A1'] = "Task ID"
-            ws['A2'] = task.id
-            ws['B1'] = "Type"
-            ws['B2'] = task.type
-            ws['C1'] = "Status"
-            ws['C2'] = task.status
-            
-            # Add response data
-            if task.response:
-                ws['A4'] = "Results"
-                ws['A5'] = json.dumps(task.response, indent=2)
-            
-            # Save to bytes
-            output = io.BytesIO()
-            wb.save(output)
-            output.seek(0)
-            
-            return StreamingResponse(
-                output,
-                media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                headers={"Content-Disposition": f"attachment; filename=task_{task.id}.xlsx"}
-            )
-        except Exception as e:
-            raise HTTPException(500, f"Excel export failed: {str(e)}")
-    
-    # Word Export
-    elif export_format == "word":
+    # Audio Export (Text-to-Speech): chunked, synthesized in parallel, streamed in order
+    if export_format == "audio":
+        if not is_key_valid(GOOGLE_API_KEY):
+            raise HTTPException(501, "Audio export requires Google API key")
         try:
-            from docx import Document
-            doc = Document()
-            doc.add_heading(f"Task Results: {task.id}", 0)
-            doc.add_paragraph(f"Type: {task.type}")
-            doc.add_paragraph(f"Status: {task.status}")
-            doc.add_paragraph("")
-            doc.add_heading("Results", level=1)
-            doc.add_paragraph(json.dumps(task.response, indent=2))
-            
-            output = io.BytesIO()
-            doc.save(output)
-            output.seek(0)
-            
-            return StreamingResponse(
-                output,
-                media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-                headers={"Content-Disposition": f"attachment; filename=task_{task.id}.docx"}
-            )
-        except Exception as e:
-            raise HTTPException(500, f"Word export failed: {str(e)}")
-    
-    # Project Export (JSON format for project management tools)
-    elif export_format == "project":
-        project_data = {
-            "project_id": task.id,
-            "task_type": task.type,
-            "status": task.status,
-            "created_at": task.request.get("timestamp", _now_ms()),
-            "completed": task.endTime,
-            "duration_ms": (task.endTime - task.startTime) if task.endTime and task.startTime else 0,
-            "results": task.response
-        }
-        
-        output = io.BytesIO(json.dumps(project_data, indent=2).encode())
+            audio = await SPEECH.open_stream(speech_text(task.model_dump()))
+        except SpeechError as e:
+            raise HTTPException(e.status_code, f"Audio export failed: {str(e)}")
         return StreamingResponse(
-            output,
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename=project_{task.id}.json"}
+            audio,
+            media_type="audio/mpeg",
+            headers={"Content-Disposition": f"attachment; filename=task_{task.id}.mp3"}
         )
     
-    # Audio Export (Text-to-Speech)
-    elif export_format == "audio":
+    if export_format in EXPORT_FORMATS:
+        snapshot = task.model_dump()
         try:
-            # Extract text content from task response
-            text_content = ""
-            if task.response:
-                if isinstance(task.response, dict):
-                    text_content = task.response.get("content", str(task.response))
-                else:
-                    text_content = str(task.response)
-            
-            # Use Google TTS if available
-            if is_key_valid(GOOGLE_API_KEY):
-                endpoint = "https://texttospeech.googleapis.com/v1/text:synthesize"
-                body = {
-                    "input": {"text": text_content[:5000]},  # Limit to 5000 chars
-                    "voice": {"languageCode": "en-US", "name": "en-US-Neural2-C"},
-                    "audioConfig": {"audioEncoding": "MP3"}
-                }
-                
-                async with httpx.AsyncClient(timeout=60) as client:
-                    resp = await client.post(
-                        f"{endpoint}?key={GOOGLE_API_KEY}",
-                        headers={"Content-Type": "application/json"},
-                        json=body
-                    )
-                    
-                if resp.status_code == 200:
-                    import base64
-                    audio_b64 = resp.json().get("audioContent")
-                    audio_bytes = base64.b64decode(audio_b64)
-                    
-                    return StreamingResponse(
-                        io.BytesIO(audio_bytes),
-                        media_type="audio/mpeg",
-                        headers={"Content-Disposition": f"attachment; filename=task_{task.id}.mp3"}
-                    )
-            
-            # Fallback: return empty audio or error
-            raise HTTPException(501, "Audio export requires Google API key")
+            path, cached, seconds = await EXPORTS.render(snapshot, export_format)
+        except ExportBusy as e:
+            raise HTTPException(503, str(e), headers={"Retry-After": "5"})
         except Exception as e:
-            raise HTTPException(500, f"Audio export failed: {str(e)}")
-    
-    # JPEG Export (for image results or visualization)
-    elif export_format == "jpeg":
-        try:
-            from PIL import Image, ImageDraw, ImageFont
-            
-            # Create image with task info
-            img = Image.new('RGB', (800, 600), color=(255, 255, 255))
-            draw = ImageDraw.Draw(img)
-            
-            # Draw text
-            text = f"Task: {task.id}\nType: {task.type}\nStatus: {task.status}"
-            draw.text((20, 20), text, fill=(0, 0, 0))
-            
-            # If response contains image data, use that
-            if task.response and isinstance(task.response, dict):
-                if "content" in task.response and task.response.get("content", "").startswith("data:image"):
-                    # Handle base64 image
-                    import base64
-                    img_data = task.response["content"].split(",")[1]
-                    img_bytes = base64.b64decode(img_data)
-                    img = Image.open(io.BytesIO(img_bytes))
-            
-            # Save to bytes
-            output = io.BytesIO()
-            img.save(output, format="JPEG", quality=95)
-            output.seek(0)
-            
-            return StreamingResponse(
-                output,
-                media_type="image/jpeg",
-                headers={"Content-Disposition": f"attachment; filename=task_{task.id}.jpg"}
-            )
-        except Exception as e:
-            raise HTTPException(500, f"JPEG export failed: {str(e)}")
-    
+            raise HTTPException(500, f"{export_format.title()} export failed: {str(e)}")
+        ext, media_type = EXPORT_FORMATS[export_format]
+        prefix = "project" if export_format == "project" else "task"
+        response = serve_file(
+            request, path, file_etag(task.id, export_format, response_hash(snapshot)),
+            media_type=media_type, filename=f"{prefix}_{task.id}{ext}", inline=False,
+        )
+        response.headers["X-Export-Cache"] = "hit" if cached else "miss"
+        response.headers["X-Render-Time-Ms"] = f"{seconds * 1000:.1f}"
+        return response
+
     raise HTTPException(400, f"Unsupported export format: {export_format}")
 
 
+class BulkExportRequest(BaseModel):
+    task_ids: Optional[List[str]] = None
+    since: Optional[int] = None  # task startTime bounds, epoch ms
+    until: Optional[int] = None
+    formats: List[Literal["excel", "word", "project", "jpeg"]]
+
+
+@app.post("/api/export/bulk")
+async def export_bulk(req: BulkExportRequest):
+    """Export many tasks in several formats as one streamed ZIP (with a manifest.json)"""
+    if not req.formats:
+        raise HTTPException(400, "At least one format is required")
+    if req.task_ids is None and req.since is None and req.until is None:
+        raise HTTPException(400, "Provide task_ids or a since/until time range")
+
+    formats = list(dict.fromkeys(req.formats))
+    missing: List[str] = []
+    if req.task_ids is not None:
+        tasks = []
+        for task_id in dict.fromkeys(req.task_ids):
+            task = TASKS.get(task_id)
+            if task and task.status == "completed":
+                tasks.append(task)
+            else:
+                missing.append(task_id)
+    else:
+        tasks = sorted(
+            (t for t in TASKS.values() if t.status == "completed"
+             and (req.since is None or (t.startTime or 0) >= req.since)
+             and (req.until is None or (t.startTime or 0) < req.until)),
+            key=lambda t: t.startTime or 0,
+        )
+    if len(tasks) * len(formats) > BULK_EXPORT_MAX_ENTRIES:
+        raise HTTPException(400, f"Bulk export is limited to {BULK_EXPORT_MAX_ENTRIES} files")
+
+    # Snapshots are taken as each render is scheduled, not all up front
+    jobs = ((task.model_dump(), fmt) for task in tasks for fmt in formats)
+    return StreamingResponse(
+        stream_bulk_export(EXPORTS, jobs, missing),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=export_{_now_ms()}.zip"},
+    )
+
+
 # ---------------- WORKFLOW TRACKING ----------------
 @app.get("/api/workflows")
-def list_workflows():
+def list_workflows(request: Request, response: Response, limit: int = pagination.DEFAULT_PAGE_SIZE,
+                   cursor: Optional[str] = None, status: Optional[str] = None, stream: bool = False):
     """List workflow executions"""
+    query = select(WorkflowExecution)
+    if status:
+        query = query.where(WorkflowExecution.status == status)
+    sort_col, id_col = WorkflowExecution.started_at, WorkflowExecution.id
+    if pagination.wants_stream(request, stream):
+        return StreamingResponse(
+            pagination.stream_rows(engine, query, sort_col, id_col, lambda r: r.model_dump(), cursor=cursor),
+            media_type=ndjson.NDJSON_MEDIA_TYPE,
+        )
     with Session(engine) as s:
-        workflows = s.exec(select(WorkflowExecution).order_by(WorkflowExecution.started_at.desc()).limit(100)).all()
-        return workflows
+        workflows, next_cursor = pagination.fetch_page(s, query, sort_col, id_col, limit, cursor)
+    pagination.set_page_headers(request, response, next_cursor)
+    return workflows
 
 
 @app.get("/api/workflows/{workflow_id}")
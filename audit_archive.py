@@ -0,0 +1,354 @@
+"""Time-partitioned audit storage with compressed archival segments.
+
+Audit rows live in monthly partitions:
+ - Postgres: when ``audit`` is created as a native ``PARTITION BY RANGE
+   (created_at)`` table (fresh databases get this via
+   ``create_partitioned_audit``), monthly partitions are created ahead of time
+   and the planner prunes them on time-range queries. Rows that still land in
+   ``audit_default`` are moved into their month's partition when it is created.
+ - SQLite (and Postgres databases whose ``audit`` predates partitioning):
+   rolling tables. ``audit`` keeps the hot window; older months are moved in
+   id batches into ``audit_YYYYMM`` tables with their own (created_at, id) index.
+
+Months older than the retention window are exported to ``audit-YYYYMM.seg``
+files under ``FRANKLIN_AUDIT_ARCHIVE_DIR`` and then dropped. A segment is a
+run of independently gzipped NDJSON blocks sorted by (created_at, id); the
+``.idx.json`` sidecar records each block's byte range, time span and event
+types, so a query only inflates the blocks that can match.
+"""
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (Column, Index, Integer, MetaData, String, Table, delete, insert,
+                        inspect as sa_inspect, select, text)
+
+from timeutil import as_utc, naive_utc
+
+AUDIT_ARCHIVE_DIR = Path(os.getenv("FRANKLIN_AUDIT_ARCHIVE_DIR", "audit_archive"))
+AUDIT_HOT_DAYS = int(os.getenv("FRANKLIN_AUDIT_HOT_DAYS", "31"))
+AUDIT_RETENTION_DAYS = int(os.getenv("FRANKLIN_AUDIT_RETENTION_DAYS", "180"))
+AUDIT_MOVE_BATCH = int(os.getenv("FRANKLIN_AUDIT_MOVE_BATCH", "2000"))
+SEGMENT_BLOCK_ROWS = int(os.getenv("FRANKLIN_AUDIT_BLOCK_ROWS", "1000"))
+
+_MONTH_TABLE_RE = re.compile(r"^audit_p?(\d{4})(\d{2})$")
+_SEGMENT_RE = re.compile(r"^audit-(\d{4})(\d{2})\.seg$")
+NATIVE_MONTHS_AHEAD = 2
+
+
+def month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def create_partitioned_audit(engine):
+    """On Postgres, create ``audit`` as a range-partitioned parent if it does not exist yet.
+
+    Must run before ``SQLModel.metadata.create_all`` so the plain table is never created.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS audit ("
+            "id BIGSERIAL NOT NULL, event VARCHAR NOT NULL, payload VARCHAR NOT NULL, "
+            "created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL, PRIMARY KEY (id, created_at)"
+            ") PARTITION BY RANGE (created_at)"
+        ))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS audit_default PARTITION OF audit DEFAULT"))
+        # Partitions must exist before the first write, or rows pile up in DEFAULT
+        ensure_month_partitions(conn, "audit", upcoming_months(datetime.now(timezone.utc)))
+        rehome_default_rows(conn, "audit")
+
+
+def upcoming_months(now: datetime, ahead: int = NATIVE_MONTHS_AHEAD) -> List[datetime]:
+    months = [month_start(now)]
+    for _ in range(ahead):
+        months.append(next_month(months[-1]))
+    return months
+
+
+def ensure_month_partitions(conn, parent: str, months: Iterable[datetime]) -> List[str]:
+    """Create missing monthly partitions of a native ``parent`` table; returns the new names.
+
+    Postgres refuses to add a range while ``<parent>_default`` holds rows in
+    it, so for such a month DEFAULT is detached, the partition is created,
+    the stranded rows are re-inserted through the parent and DEFAULT is
+    attached again, all in the caller's transaction.
+    """
+    default = f"{parent}_default"
+    created = []
+    for month in months:
+        name = f"{parent}_p{month:%Y%m}"
+        if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+            continue
+        bounds = {"lo": naive_utc(month), "hi": naive_utc(next_month(month))}
+        in_range = "created_at >= :lo AND created_at < :hi"
+        create = (f"CREATE TABLE {name} PARTITION OF {parent} "
+                  f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')")
+        stranded = conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1"), bounds).first()
+        if stranded:
+            conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {default}"))
+            conn.execute(text(create))
+            conn.execute(text(
+                f"INSERT INTO {parent} (id, event, payload, created_at) "
+                f"SELECT id, event, payload, created_at FROM {default} WHERE {in_range}"
+            ), bounds)
+            conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"), bounds)
+            conn.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {default} DEFAULT"))
+        else:
+            conn.execute(text(create))
+        created.append(name)
+    return created
+
+
+def rehome_default_rows(conn, parent: str) -> List[str]:
+    """Give every month that has rows in ``<parent>_default`` its own partition."""
+    months = conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at) FROM {parent}_default"
+    )).scalars().all()
+    return ensure_month_partitions(conn, parent, sorted(month_start(as_utc(m)) for m in months))
+
+
+# ---------------- segment files ----------------
+def write_segment(path: Path, rows: Iterator[Dict[str, Any]], block_rows: int = SEGMENT_BLOCK_ROWS) -> Dict[str, Any]:
+    """Write rows (already in (created_at, id) order) as gzip blocks plus an index sidecar."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".seg.tmp")
+    blocks: List[Dict[str, Any]] = []
+    count = 0
+
+    def flush(f, block: List[Dict[str, Any]]):
+        data = gzip.compress("".join(json.dumps(r, default=str) + "\n" for r in block).encode("utf-8"))
+        blocks.append({
+            "offset": f.tell(),
+            "length": len(data),
+            "rows": len(block),
+            "first": block[0]["created_at"],
+            "last": block[-1]["created_at"],
+            "events": sorted({r["event"] for r in block}),
+        })
+        f.write(data)
+
+    with tmp.open("wb") as f:
+        block: List[Dict[str, Any]] = []
+        for row in rows:
+            row = {**row, "created_at": naive_utc(row["created_at"]).isoformat()}
+            block.append(row)
+            count += 1
+            if len(block) >= block_rows:
+                flush(f, block)
+                block = []
+        if block:
+            flush(f, block)
+    index = {"rows": count, "blocks": blocks, "created_at": datetime.now(timezone.utc).isoformat()}
+    path.with_suffix(".idx.json").write_text(json.dumps(index), encoding="utf-8")
+    os.replace(tmp, path)
+    return index
+
+
+def read_segment(path: Path, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 event: Optional[str] = None, newest_first: bool = True) -> Iterator[Dict[str, Any]]:
+    """Yield matching rows, inflating only blocks whose index entry can match."""
+    index = json.loads(path.with_suffix(".idx.json").read_text(encoding="utf-8"))
+    lo = naive_utc(since).isoformat() if since else None
+    hi = naive_utc(until).isoformat() if until else None
+    blocks = [
+        b for b in index["blocks"]
+        if (not lo or b["last"] >= lo) and (not hi or b["first"] < hi) and (not event or event in b["events"])
+    ]
+    if newest_first:
+        blocks.reverse()
+    with path.open("rb") as f:
+        for b in blocks:
+            f.seek(b["offset"])
+            rows = [json.loads(line) for line in gzip.decompress(f.read(b["length"])).splitlines()]
+            if newest_first:
+                rows.reverse()
+            for r in rows:
+                if (lo and r["created_at"] < lo) or (hi and r["created_at"] >= hi) or (event and r["event"] != event):
+                    continue
+                yield r
+
+
+# ---------------- partition management ----------------
+class AuditPartitions:
+    def __init__(self, engine, hot_table: Table, archive_dir: Path = AUDIT_ARCHIVE_DIR,
+                 hot_days: int = AUDIT_HOT_DAYS, retention_days: int = AUDIT_RETENTION_DAYS,
+                 batch_size: int = AUDIT_MOVE_BATCH):
+        self.engine = engine
+        self.hot = hot_table
+        self.archive_dir = Path(archive_dir)
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        self.batch_size = batch_size
+        self.metrics = {"rows_rolled": 0, "partitions_archived": 0, "rows_archived": 0, "last_run_at": None}
+
+    @property
+    def native(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return False
+        with self.engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :t"
+            ), {"t": self.hot.name}).first() is not None
+
+    def _month_table(self, month: datetime, prefix: str = "audit_") -> Table:
+        table = Table(
+            f"{prefix}{month:%Y%m}", MetaData(),
+            Column("id", Integer, primary_key=True),
+            Column("event", String, nullable=False),
+            Column("payload", String, nullable=False),
+            # Same column type as the hot table so datetime binds behave identically
+            Column("created_at", self.hot.c.created_at.type, nullable=False),
+        )
+        Index(f"ix_{table.name}_created_id", table.c.created_at, table.c.id)
+        return table
+
+    def partitions(self) -> List[Tuple[datetime, str]]:
+        """(month, table name) for every monthly partition/rolled table, oldest first."""
+        found = []
+        for name in sa_inspect(self.engine).get_table_names():
+            m = _MONTH_TABLE_RE.match(name)
+            if m:
+                found.append((datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc), name))
+        return sorted(found)
+
+    def segments(self) -> List[Tuple[datetime, Path]]:
+        if not self.archive_dir.exists():
+            return []
+        found = []
+        for path in self.archive_dir.iterdir():
+            m = _SEGMENT_RE.match(path.name)
+            if m and path.with_suffix(".idx.json").exists():
+                found.append((datetime(int(m.group(1)), int(m.group(2)), 1, tzinfo=timezone.utc), path))
+        return sorted(found)
+
+    # -- rolling / creating partitions ----------------------------------
+    def _ensure_native_partitions(self, now: datetime) -> List[str]:
+        with self.engine.begin() as conn:
+            created = ensure_month_partitions(conn, self.hot.name, upcoming_months(now))
+            return created + rehome_default_rows(conn, self.hot.name)
+
+    def _roll_month(self, month: datetime) -> int:
+        """Move one month out of the hot table into its rolling table, batch by batch."""
+        target = self._month_table(month)
+        target.create(self.engine, checkfirst=True)
+        hot, moved = self.hot, 0
+        lo, hi = month, next_month(month)
+        while True:
+            with self.engine.begin() as conn:
+                ids = conn.execute(
+                    select(hot.c.id).where(hot.c.created_at >= lo).where(hot.c.created_at < hi)
+                    .order_by(hot.c.id).limit(self.batch_size)
+                ).scalars().all()
+                if not ids:
+                    return moved
+                cols = [hot.c.id, hot.c.event, hot.c.payload, hot.c.created_at]
+                conn.execute(insert(target).from_select([c.name for c in cols], select(*cols).where(hot.c.id.in_(ids))))
+                conn.execute(delete(hot).where(hot.c.id.in_(ids)))
+            moved += len(ids)
+
+    def roll(self, now: Optional[datetime] = None) -> int:
+        now = as_utc(now or datetime.now(timezone.utc))
+        if self.native:
+            self._ensure_native_partitions(now)
+            return 0
+        cutoff = month_start(now - timedelta(days=self.hot_days))
+        with self.engine.connect() as conn:
+            oldest = conn.execute(select(self.hot.c.created_at).order_by(self.hot.c.created_at).limit(1)).scalar()
+        moved = 0
+        month = month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            moved += self._roll_month(month)
+            month = next_month(month)
+        self.metrics["rows_rolled"] += moved
+        return moved
+
+    # -- archival --------------------------------------------------------
+    def archive(self, now: Optional[datetime] = None) -> List[str]:
+        """Export partitions older than the retention window to segments and drop them."""
+        now = as_utc(now or datetime.now(timezone.utc))
+        cutoff = month_start(now - timedelta(days=self.retention_days))
+        native = self.native
+        if native:
+            # Old rows stranded in DEFAULT get a partition first, so they are archived with their month
+            with self.engine.begin() as conn:
+                rehome_default_rows(conn, self.hot.name)
+        archived = []
+        for month, name in self.partitions():
+            if next_month(month) > cutoff:
+                continue
+            table = self._month_table(month, prefix="audit_p" if name.startswith("audit_p") else "audit_")
+            with self.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=self.batch_size).execute(
+                    select(table).order_by(table.c.created_at, table.c.id)
+                )
+                index = write_segment(self.archive_dir / f"audit-{month:%Y%m}.seg", (dict(r) for r in result.mappings()))
+            with self.engine.begin() as conn:
+                if native and name.startswith("audit_p"):
+                    conn.execute(text(f"ALTER TABLE {self.hot.name} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+            self.metrics["partitions_archived"] += 1
+            self.metrics["rows_archived"] += index["rows"]
+            archived.append(name)
+        return archived
+
+    def run(self) -> Dict[str, Any]:
+        moved = self.roll()
+        archived = self.archive()
+        self.metrics["last_run_at"] = datetime.now(timezone.utc).isoformat()
+        return {"rolled": moved, "archived": archived}
+
+    # -- queries ---------------------------------------------------------
+    def history(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                event: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest-first rows across the hot table, rolled tables and archived segments."""
+        since, until = as_utc(since), as_utc(until)
+        sources: List[Any] = [(None, self.hot)]
+        if not self.native:
+            sources += [(month, self._month_table(month)) for month, _ in reversed(self.partitions())]
+        sources += [(month, path) for month, path in reversed(self.segments())]
+
+        results: List[Dict[str, Any]] = []
+        for month, source in sources:
+            if month is not None and ((since and next_month(month) <= since) or (until and month >= until)):
+                continue
+            need = limit - len(results)
+            if need <= 0:
+                break
+            if isinstance(source, Path):
+                for row in read_segment(source, since, until, event):
+                    results.append({**row, "archived": True})
+                    if len(results) >= limit:
+                        break
+                continue
+            query = select(source)
+            if since:
+                query = query.where(source.c.created_at >= since)
+            if until:
+                query = query.where(source.c.created_at < until)
+            if event:
+                query = query.where(source.c.event == event)
+            query = query.order_by(source.c.created_at.desc(), source.c.id.desc()).limit(need)
+            with self.engine.connect() as conn:
+                for row in conn.execute(query).mappings():
+                    results.append({**row, "created_at": naive_utc(row["created_at"]).isoformat(), "archived": False})
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "mode": "native" if self.native else "rolling",
+            "partitions": [name for _, name in self.partitions()],
+            "segments": [path.name for _, path in self.segments()],
+            "hot_days": self.hot_days,
+            "retention_days": self.retention_days,
+        }
@@ -0,0 +1,142 @@
+"""Buffered audit log writer.
+
+Handlers enqueue audit events and return immediately; a background thread
+drains the buffer into multi-row INSERTs every ``FRANKLIN_AUDIT_FLUSH_SECONDS``
+or as soon as ``FRANKLIN_AUDIT_BATCH`` events are waiting. The buffer is
+bounded: when it is full new events are dropped and counted rather than
+stalling requests. Compliance-critical events can bypass the buffer and be
+written synchronously.
+"""
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional
+
+AUDIT_FLUSH_INTERVAL = float(os.getenv("FRANKLIN_AUDIT_FLUSH_SECONDS", "1"))
+AUDIT_BATCH_SIZE = int(os.getenv("FRANKLIN_AUDIT_BATCH", "500"))
+AUDIT_MAX_QUEUE = int(os.getenv("FRANKLIN_AUDIT_MAX_QUEUE", "50000"))
+AUDIT_MODE = os.getenv("FRANKLIN_AUDIT_MODE", "async")  # async | sync
+AUDIT_SYNC_EVENTS = {
+    e.strip() for e in os.getenv("FRANKLIN_AUDIT_SYNC_EVENTS", "contract.create,user.revoke_tokens").split(",")
+    if e.strip()
+}
+
+# Each row is {"event": str, "payload": str, "created_at": datetime}
+AuditRow = Dict[str, object]
+
+
+class AuditWriter:
+    def __init__(self, write_fn: Callable[[List[AuditRow]], None], interval: float = AUDIT_FLUSH_INTERVAL,
+                 batch_size: int = AUDIT_BATCH_SIZE, max_queue: int = AUDIT_MAX_QUEUE,
+                 mode: str = AUDIT_MODE, sync_events=AUDIT_SYNC_EVENTS):
+        self._write_fn = write_fn
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.mode = mode
+        self.sync_events = set(sync_events)
+        self._queue: Deque[AuditRow] = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.enqueued = 0
+        self.written = 0
+        self.written_sync = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+
+    def submit(self, event: str, payload: str, sync: bool = False):
+        row = {"event": event, "payload": payload, "created_at": datetime.now(timezone.utc)}
+        if sync or self.mode == "sync" or event in self.sync_events or not self.running:
+            self._write([row])
+            self.written_sync += 1
+            return
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                return
+            self._queue.append(row)
+            self.enqueued += 1
+            if len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def _write(self, rows: List[AuditRow]):
+        with self._write_lock:
+            self._write_fn(rows)
+
+    def _take(self) -> List[AuditRow]:
+        with self._cond:
+            n = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _requeue(self, rows: List[AuditRow]):
+        with self._cond:
+            room = self.max_queue - len(self._queue)
+            keep = rows[:max(0, room)]
+            self.dropped += len(rows) - len(keep)
+            self._queue.extendleft(reversed(keep))
+
+    def flush(self) -> int:
+        """Write everything currently buffered; returns rows written."""
+        total = 0
+        while True:
+            rows = self._take()
+            if not rows:
+                return total
+            try:
+                self._write(rows)
+            except Exception as ex:
+                self.errors += 1
+                self._requeue(rows)
+                print(f"Audit flush failed ({len(rows)} events kept buffered): {ex}")
+                return total
+            self.batches += 1
+            self.written += len(rows)
+            total += len(rows)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                if len(self._queue) < self.batch_size:
+                    self._cond.wait(self.interval)
+            self.flush()
+
+    def start(self):
+        if self.running or self.mode == "sync":
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and flush whatever is still buffered."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            depth = len(self._queue)
+        return {
+            "mode": self.mode,
+            "running": self.running,
+            "depth": depth,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "written_sync": self.written_sync,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
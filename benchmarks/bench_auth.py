@@ -0,0 +1,76 @@
+"""
+Throughput benchmark for authenticated endpoints.
+Usage:
+    python benchmarks/bench_auth.py [--requests 2000] [--db /tmp/bench_auth.db]
+
+Compares the old per-call path (JWT decode + User SELECT) with the claims-only
+path (JWT decode + cached token-version check), both as raw auth resolution
+and end to end through GET /auth/me.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _rate(n: int, seconds: float) -> str:
+    return f"{n / seconds:10,.0f} ops/s  ({seconds / n * 1e6:8.1f} us/op)"
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--requests", type=int, default=2000)
+    p.add_argument("--db", type=str, default=os.path.join(tempfile.gettempdir(), "bench_auth.db"))
+    args = p.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    os.environ["FRANKLIN_DB_URL"] = f"sqlite:///{args.db}"
+
+    import jwt
+    from fastapi import HTTPException
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+    from starlette.requests import Request
+
+    import app
+
+    client = TestClient(app.app)
+    token = client.post("/auth/register", params={"email": "bench@example.com", "role": "client"}).json()["token"]
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": f"token={token}".encode()}
+
+    def legacy_get_user(req: Request):
+        data = jwt.decode(req.query_params["token"], app.SECRET, algorithms=[app.JWT_ALGO])
+        with Session(app.engine) as s:
+            user = s.get(app.User, int(data["sub"]))
+            if not user:
+                raise HTTPException(401, "User not found")
+            return user
+
+    n = args.requests
+    results = {}
+    for label, fn in (("decode + SELECT (before)", legacy_get_user), ("claims + cache (after)", app.get_principal)):
+        req = Request(scope)
+        fn(req)  # warm up
+        start = time.perf_counter()
+        for _ in range(n):
+            fn(Request(scope))
+        results[label] = time.perf_counter() - start
+
+    print(f"Auth resolution, {n} calls")
+    for label, seconds in results.items():
+        print(f"  {label:26s} {_rate(n, seconds)}")
+
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get("/auth/me", params={"token": token})
+    print(f"GET /auth/me end to end, {n} requests")
+    print(f"  {'claims + cache':26s} {_rate(n, time.perf_counter() - start)}")
+    print(f"User cache: {app.USER_CACHE.stats()}")
+
+
+if __name__ == "__main__":
+    main()
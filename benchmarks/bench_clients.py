@@ -0,0 +1,104 @@
+"""
+Per-call client overhead: building SDK clients per prompt vs the shared registry.
+Usage:
+    python benchmarks/bench_clients.py [--calls 200] [--threads 8] [--live 0]
+
+"before" builds a fresh client for every call, as `_make_clients()` and
+`gemini_master._make_gemini_client()` used to; "after" asks `client_registry`
+for the shared one. Engines whose SDK or key is missing are skipped; if none is
+usable, an `httpx.Client` (the connection pool every SDK client wraps) stands
+in so the construction cost is still visible. With --live N each usable engine
+also makes N cheap API calls (its health probe) both ways, which includes the
+TLS handshakes a fresh client pays for.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _per_call(fn, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+def _fmt(seconds: float) -> str:
+    return f"{seconds * 1e6:10.1f} us/call"
+
+
+def _stand_in():
+    import httpx
+
+    from client_registry import ClientRegistry, ClientSpec
+
+    def build(_key):
+        return httpx.Client(timeout=60)
+
+    return ClientRegistry([ClientSpec("httpx (stand-in)", build)])
+
+
+def run(args):
+    from client_registry import CLIENTS
+
+    registry = CLIENTS
+    usable = [n for n in registry.names() if n in registry.available()]
+    if not usable:
+        print("No SDK client is configured here; measuring an httpx.Client stand-in.")
+        registry = _stand_in()
+        usable = registry.names()
+
+    for name in usable:
+        spec = registry._specs[name]
+        keys = spec.keys() if spec.keys else [None]
+
+        def fresh():
+            client = spec.factory(keys[0])
+            close = getattr(client, "close", None)
+            if close:
+                close()  # do not leak a pool per iteration while measuring
+
+        before = _per_call(fresh, args.calls)
+        registry.get(name)
+        after = _per_call(lambda: registry.get(name), args.calls * 100)
+        print(f"{name:18s} before {_fmt(before)}   after {_fmt(after)}   ({before / after:,.0f}x)")
+
+        if args.live and spec.probe:
+            live_before = _per_call(lambda: spec.probe(spec.factory(keys[0])), args.live)
+            live_after = _per_call(lambda: spec.probe(registry.get(name)), args.live)
+            print(f"{'':18s} live   {live_before * 1000:8.1f} ms/call   after {live_after * 1000:8.1f} ms/call")
+
+    # Cold start under contention: many threads asking at once still build one client
+    name = usable[0]
+    registry.reset(name)
+    created = registry.stats()["created"][name]
+    barrier = threading.Barrier(args.threads)
+
+    def worker():
+        barrier.wait()
+        for _ in range(args.calls):
+            registry.get(name)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    built = registry.stats()["created"][name] - created
+    print(f"{args.threads} threads x {args.calls} cold get('{name}'): {built} client(s) built")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--calls", type=int, default=200)
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--live", type=int, default=0)
+    run(p.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Query latency benchmark for memory full-text search.
+Usage:
+    python benchmarks/bench_memory_search.py [--rows 100000] [--queries 200] [--db /tmp/bench_search.db]
+
+Loads synthetic memories into a scratch SQLite database, builds the FTS5 index
+and compares ranked search latency against the LIKE scan it replaces.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from memory_search import MemorySearchIndex  # noqa: E402
+
+WORDS = (
+    "sensor gpio relay mount volume cache device firmware weaver uplink battery thermal "
+    "schedule contract invoice pipeline camera solar voltage backup network latency drift "
+    "calibration humidity pressure storage snapshot replica config override threshold"
+).split()
+TYPES = ["general", "pfs", "air_weaver", "raspberry_pi"]
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]  # noqa: E731
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "mean": statistics.fmean(samples)}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--db", type=str, default=os.path.join(tempfile.gettempdir(), "bench_memory_search.db"))
+    args = p.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f"sqlite:///{args.db}")
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE cognitivememory (id INTEGER PRIMARY KEY, memory_key VARCHAR NOT NULL, "
+            "memory_value VARCHAR NOT NULL, memory_type VARCHAR NOT NULL, context VARCHAR, "
+            "meta_data VARCHAR, created_at DATETIME NOT NULL, expires_at DATETIME)"
+        ))
+    index = MemorySearchIndex(engine)
+    index.ensure()
+
+    start = time.perf_counter()
+    batch = []
+    for i in range(args.rows):
+        batch.append({
+            "k": f"bench:{i}",
+            "v": _sentence(rng, 24),
+            "t": rng.choice(TYPES),
+            "c": _sentence(rng, 8),
+            "m": '{"source": "%s"}' % rng.choice(WORDS),
+            "at": (now - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+        })
+        if len(batch) == 5000 or i == args.rows - 1:
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "INSERT INTO cognitivememory (memory_key, memory_value, memory_type, context, meta_data, created_at) "
+                    "VALUES (:k, :v, :t, :c, :m, :at)"
+                ), batch)
+            batch = []
+    load_s = time.perf_counter() - start
+    print(f"Loaded {args.rows} rows (indexed by trigger) in {load_s:.2f}s "
+          f"({args.rows / load_s:,.0f} rows/s)")
+
+    queries = [" ".join(rng.sample(WORDS, rng.choice([1, 2, 3]))) for _ in range(args.queries)]
+
+    fts_ms = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, memory_type=rng.choice(TYPES + [None]), limit=20)
+        fts_ms.append((time.perf_counter() - t0) * 1000)
+
+    like_ms = []
+    with engine.connect() as conn:
+        for q in queries[: max(1, args.queries // 10)]:
+            clauses = " AND ".join(f"(memory_value LIKE :w{i} OR context LIKE :w{i} OR meta_data LIKE :w{i})"
+                                   for i, _ in enumerate(q.split()))
+            params = {f"w{i}": f"%{w}%" for i, w in enumerate(q.split())}
+            t0 = time.perf_counter()
+            conn.execute(text(f"SELECT id FROM cognitivememory WHERE {clauses} ORDER BY created_at DESC LIMIT 20"), params).all()
+            like_ms.append((time.perf_counter() - t0) * 1000)
+
+    for label, samples in (("FTS5 bm25", fts_ms), ("LIKE scan", like_ms)):
+        stats = _percentiles(samples)
+        print(f"{label:10s} n={len(samples):4d}  " + "  ".join(f"{k}={v:.2f}ms" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
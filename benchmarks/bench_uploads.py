@@ -0,0 +1,107 @@
+"""
+Upload throughput benchmark: single-shot multipart vs chunked/parallel.
+Usage:
+    python benchmarks/bench_uploads.py [--size-mb 1024] [--chunk-mb 5] [--parallel 4]
+                                       [--url http://localhost:8080] [--skip-single]
+
+Without --url the app runs in-process (httpx ASGITransport) against a scratch
+SQLite database. Chunks are generated on the fly so a 1 GB run never holds the
+whole file in memory; the server's SHA-256 is checked against the client's.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MB = 1024 * 1024
+
+
+def _chunk(block: bytes, index: int, length: int) -> bytes:
+    # Distinct content per chunk without generating a gigabyte of randomness
+    return (index.to_bytes(8, "little") + block)[:length]
+
+
+def _rate(size: int, seconds: float) -> str:
+    return f"{size / MB / seconds:8.1f} MB/s  ({seconds:6.2f} s)"
+
+
+async def _chunked(client, size: int, chunk_size: int, parallel: int, block: bytes) -> dict:
+    init = (await client.post("/api/uploads/init", params={
+        "filename": "bench.bin", "size": size, "chunk_size": chunk_size,
+    })).json()
+    upload_id, total = init["uploadId"], init["totalChunks"]
+    gate = asyncio.Semaphore(parallel)
+
+    async def put(index: int):
+        length = min(chunk_size, size - index * chunk_size)
+        async with gate:
+            resp = await client.put(f"/api/uploads/{upload_id}/chunks/{index}", content=_chunk(block, index, length))
+            resp.raise_for_status()
+
+    await asyncio.gather(*(put(i) for i in range(total)))
+    done = await client.post(f"/api/uploads/{upload_id}/complete")
+    done.raise_for_status()
+    return done.json()
+
+
+async def run(args):
+    import httpx
+
+    size, chunk_size = args.size_mb * MB, args.chunk_mb * MB
+    block = os.urandom(chunk_size)
+    expected = hashlib.sha256()
+    for index in range(-(-size // chunk_size)):
+        expected.update(_chunk(block, index, min(chunk_size, size - index * chunk_size)))
+    expected = expected.hexdigest()
+
+    if args.url:
+        transport, base_url = None, args.url
+    else:
+        import app
+        transport, base_url = httpx.ASGITransport(app=app.app), "http://bench"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=600) as client:
+        print(f"Uploading {args.size_mb} MB, chunk {args.chunk_mb} MB")
+        if not args.skip_single:
+            body = b"".join(
+                _chunk(block, i, min(chunk_size, size - i * chunk_size)) for i in range(-(-size // chunk_size))
+            )
+            start = time.perf_counter()
+            resp = await client.post("/api/files/upload", files={"file": ("bench.bin", body)})
+            resp.raise_for_status()
+            print(f"  {'single POST /api/files/upload':34s} {_rate(size, time.perf_counter() - start)}")
+            del body
+        for parallel in sorted({1, args.parallel}):
+            start = time.perf_counter()
+            result = await _chunked(client, size, chunk_size, parallel, block)
+            elapsed = time.perf_counter() - start
+            ok = "sha256 ok" if result["sha256"] == expected else "SHA256 MISMATCH"
+            print(f"  {f'chunked, {parallel} in flight':34s} {_rate(size, elapsed)}  {ok}")
+        if not args.url:
+            print(f"Upload stats: {app.UPLOADS.stats()}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--size-mb", type=int, default=1024)
+    p.add_argument("--chunk-mb", type=int, default=5)
+    p.add_argument("--parallel", type=int, default=4)
+    p.add_argument("--url", type=str, default=None)
+    p.add_argument("--skip-single", action="store_true")
+    p.add_argument("--db", type=str, default=os.path.join(tempfile.gettempdir(), "bench_uploads.db"))
+    args = p.parse_args()
+
+    if not args.url:
+        if os.path.exists(args.db):
+            os.remove(args.db)
+        os.environ["FRANKLIN_DB_URL"] = f"sqlite:///{args.db}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
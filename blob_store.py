@@ -0,0 +1,130 @@
+"""Content-addressed blob storage for uploads.
+
+Files are stored once under ``<root>/<aa>/<bb>/<sha256>`` and shared by every
+``UploadedFile`` row with that hash. A blob table keeps a reference count per
+hash; blobs whose count has dropped to zero are deleted by the maintenance job
+after a grace period, so an upload that is linking the same content at that
+moment never loses its file.
+
+``adopt`` touches a blob it reuses before the upload links it. ``collect``
+re-checks that mtime under the same lock just before removing a file, so a
+blob adopted after its row was swept keeps its file and gets a zero-ref row
+back for ``link`` to bump.
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+BLOB_GC_GRACE = timedelta(minutes=float(os.getenv("FRANKLIN_BLOB_GC_GRACE_MINUTES", "60")))
+
+
+class BlobStore:
+    def __init__(self, root: str, table):
+        self.root = root
+        self.table = table
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()  # adopt vs. collect's file removal
+        self.linked = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.collected = 0
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256))
+
+    def adopt(self, src_path: str, sha256: str) -> Tuple[str, bool]:
+        """Move a freshly written file into the store; returns (blob path, created).
+
+        If the content is already stored the new copy is simply deleted.
+        """
+        path = self.path_for(sha256)
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)  # tells collect() the blob is about to be linked again
+                os.remove(src_path)
+                return path, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(src_path, path)  # same content either way if two uploads race here
+            os.utime(path)
+        return path, True
+
+    # -- reference counts (run inside the caller's transaction) ------------
+    def link(self, conn, sha256: str, size: int) -> Dict[str, object]:
+        """Add one reference, creating the blob row on first use; returns the blob row."""
+        t = self.table
+        now = datetime.now(timezone.utc)
+        bump = update(t).where(t.c.sha256 == sha256).values(ref_count=t.c.ref_count + 1, last_ref_at=now)
+        if not conn.execute(bump).rowcount:
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(t).values(
+                        sha256=sha256, size=size, path=self.path_for(sha256),
+                        ref_count=1, created_at=now, last_ref_at=now,
+                    ))
+            except IntegrityError:
+                conn.execute(bump)  # another upload created the row first
+            else:
+                self.linked += 1
+                return dict(conn.execute(select(t).where(t.c.sha256 == sha256)).mappings().one())
+        self.linked += 1
+        self.deduplicated += 1
+        self.bytes_saved += size
+        return dict(conn.execute(select(t).where(t.c.sha256 == sha256)).mappings().one())
+
+    def unlink(self, conn, sha256: str):
+        t = self.table
+        conn.execute(
+            update(t).where(t.c.sha256 == sha256, t.c.ref_count > 0)
+            .values(ref_count=t.c.ref_count - 1, last_ref_at=datetime.now(timezone.utc))
+        )
+
+    def lookup(self, conn, sha256: str) -> Optional[Dict[str, object]]:
+        row = conn.execute(select(self.table).where(self.table.c.sha256 == sha256)).mappings().first()
+        return dict(row) if row and row["ref_count"] > 0 and self.exists(sha256) else None
+
+    def collect(self, engine, now: Optional[datetime] = None) -> int:
+        """Delete unreferenced blobs idle past the grace period (maintenance hook)."""
+        t = self.table
+        cutoff = (now or datetime.now(timezone.utc)) - BLOB_GC_GRACE
+        with engine.begin() as conn:
+            # One statement, so a blob re-linked meanwhile is never in the result
+            doomed = conn.execute(
+                delete(t).where(t.c.ref_count <= 0, t.c.last_ref_at < cutoff).returning(*t.c)
+            ).mappings().all()
+        revived = []
+        collected = 0
+        for row in doomed:
+            path = self.path_for(row["sha256"])
+            with self._lock:
+                try:
+                    if os.path.getmtime(path) >= cutoff.timestamp():
+                        revived.append(dict(row, last_ref_at=datetime.now(timezone.utc)))
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            collected += 1
+        for row in revived:
+            # adopt() reused the file after the row was deleted; hand link() a row to bump
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(t).values(**row))
+            except IntegrityError:
+                pass  # link() already created it
+        self.collected += collected
+        return collected
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "linked": self.linked,
+            "deduplicated": self.deduplicated,
+            "bytes_saved": self.bytes_saved,
+            "collected": self.collected,
+        }
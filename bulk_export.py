@@ -0,0 +1,124 @@
+"""Multi-task export as a ZIP archive streamed while entries are rendered.
+
+Renders go through the shared ``ExportRenderer`` (so cached artifacts are
+reused and new ones are cached) with at most ``concurrency`` in flight. Each
+entry is copied from its artifact file into the archive as soon as it is ready,
+in completion order, and the archive bytes are yielded block by block. Memory
+is bounded by one copy block plus the ``concurrency`` pending renders, never
+by the archive size. Entries that fail are listed in ``manifest.json``, which
+closes the archive, instead of aborting the download.
+"""
+import asyncio
+import json
+import os
+import time
+import zipfile
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from export_renderer import FORMATS, ExportRenderer
+
+BULK_EXPORT_CONCURRENCY = int(os.getenv("FRANKLIN_BULK_EXPORT_CONCURRENCY", "4"))
+BULK_EXPORT_MAX_ENTRIES = int(os.getenv("FRANKLIN_BULK_EXPORT_MAX_ENTRIES", "2000"))
+COPY_BLOCK = 256 * 1024
+
+# Already-compressed containers are stored as-is rather than deflated again
+_STORED = {"excel", "word", "jpeg"}
+
+
+class _ZipSink:
+    """Write-only, unseekable file object for ZipFile; bytes are drained after each write."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self._buf)
+        self._buf.clear()
+        return data
+
+
+def entry_name(task_id: str, fmt: str) -> str:
+    ext = FORMATS[fmt][0]
+    prefix = "project" if fmt == "project" else "task"
+    return f"{task_id}/{prefix}_{task_id}{ext}"
+
+
+async def stream_bulk_export(
+    renderer: ExportRenderer,
+    jobs: Iterable[Tuple[Dict[str, Any], str]],
+    missing: Optional[List[str]] = None,
+    concurrency: int = BULK_EXPORT_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """Yield a ZIP of (task snapshot, format) jobs; ``missing`` task ids are noted in the manifest."""
+    sink = _ZipSink()
+    zf = zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED)
+    started = time.perf_counter()
+    manifest: List[Dict[str, Any]] = [{"task_id": t, "status": "missing"} for t in (missing or [])]
+    pending: Dict[asyncio.Task, Tuple[str, str]] = {}
+    queue = iter(jobs)
+    limit = max(1, concurrency)
+
+    async def render(task: Dict[str, Any], fmt: str):
+        return await renderer.render(task, fmt, wait=True)
+
+    def fill():
+        while len(pending) < limit:
+            job = next(queue, None)
+            if job is None:
+                return
+            task, fmt = job
+            pending[asyncio.ensure_future(render(task, fmt))] = (task["id"], fmt)
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in done:
+                task_id, fmt = pending.pop(fut)
+                name = entry_name(task_id, fmt)
+                try:
+                    path, cached, seconds = fut.result()
+                except Exception as ex:
+                    manifest.append({"task_id": task_id, "format": fmt, "status": "failed", "error": str(ex)})
+                    continue
+                info = zipfile.ZipInfo(name, time.localtime(os.path.getmtime(path))[:6])
+                info.compress_type = zipfile.ZIP_STORED if fmt in _STORED else zipfile.ZIP_DEFLATED
+                info.file_size = os.path.getsize(path)  # lets zipfile decide on zip64 up front
+                with open(path, "rb") as src, zf.open(info, "w") as dst:
+                    while True:
+                        block = await asyncio.to_thread(src.read, COPY_BLOCK)
+                        if not block:
+                            break
+                        dst.write(block)
+                        if data := sink.drain():
+                            yield data
+                if data := sink.drain():
+                    yield data
+                manifest.append({
+                    "task_id": task_id, "format": fmt, "status": "ok", "file": name,
+                    "bytes": info.file_size, "cached": cached, "render_ms": round(seconds * 1000, 1),
+                })
+            fill()
+
+        zf.writestr("manifest.json", json.dumps({
+            "entries": manifest,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }, indent=2))
+        zf.close()
+        yield sink.drain()
+    finally:
+        # Client went away: stop waiting on renders (they still finish into the cache)
+        for fut in pending:
+            fut.cancel()
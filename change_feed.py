@@ -0,0 +1,208 @@
+"""Incremental change feed for open bid requests.
+
+Every create/close of a ``BidRequest`` appends a row to an event table in the
+same transaction as the change, so the event id is a durable cursor.
+Workers announce new ids over the pub/sub bus; connected SSE clients wake up,
+read only the events after their cursor and get them filtered by keyword
+server-side. Clients resume with ``?since=`` or the standard
+``Last-Event-ID`` header.
+
+Ids are handed out at insert time but become visible at commit, so a slow
+transaction can commit a lower id after a higher one was already read. The
+cursor therefore only advances over events older than ``FEED_SETTLE_SECONDS``;
+newer ones are delivered but read again on the next fetch, and the stream
+skips the ones it already sent. Pollers of ``fetch`` should do the same by id.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, or_, select
+
+from timeutil import as_utc
+
+FEED_HEARTBEAT = float(os.getenv("FRANKLIN_FEED_HEARTBEAT_SECONDS", "15"))
+FEED_BATCH = int(os.getenv("FRANKLIN_FEED_BATCH", "200"))
+FEED_RETENTION_DAYS = float(os.getenv("FRANKLIN_FEED_RETENTION_DAYS", "7"))
+# Longest a create/close transaction may take to commit before its event could be skipped
+FEED_SETTLE_SECONDS = float(os.getenv("FRANKLIN_FEED_SETTLE_SECONDS", "10"))
+FEED_CHANNEL = "franklin:requests:feed"
+
+
+def parse_keywords(raw: Optional[str]) -> List[str]:
+    """Split ``"solar, roof repair"`` into ``["solar", "roof", "repair"]``."""
+    return [k for k in re.split(r"[\s,]+", (raw or "").lower()) if k]
+
+
+def sse_message(data: Dict[str, Any], event: Optional[str] = None, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class ChangeFeed:
+    def __init__(self, engine, event_table, request_table, bus, channel: str = FEED_CHANNEL,
+                 heartbeat: float = FEED_HEARTBEAT, batch_size: int = FEED_BATCH,
+                 retention_days: float = FEED_RETENTION_DAYS, settle: float = FEED_SETTLE_SECONDS):
+        self.engine = engine
+        self.events = event_table
+        self.requests = request_table
+        self.bus = bus
+        self.channel = channel
+        self.heartbeat = heartbeat
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.settle = settle
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+        self.latest_seen = 0
+        self.published = 0
+        self.delivered = 0
+        self.pruned = 0
+        bus.subscribe(channel, self._on_message)
+
+    # -- publishing -------------------------------------------------------
+    def publish(self, event_id: int):
+        """Announce a committed event to every worker's connected clients."""
+        self.published += 1
+        self.bus.publish(self.channel, str(event_id))
+
+    def _on_message(self, message: str):
+        with self._lock:
+            self.latest_seen = max(self.latest_seen, int(message))
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    # -- reading ----------------------------------------------------------
+    def latest_id(self) -> int:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.max(self.events.c.id))).scalar() or 0
+
+    def oldest_id(self) -> Optional[int]:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.min(self.events.c.id))).scalar()
+
+    def fetch(self, since: int, keywords: Optional[List[str]] = None,
+              limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """Events after ``since`` joined with their request; returns (events, new cursor).
+
+        The cursor stops before the first event younger than the settle window
+        (a lower id may still commit), so those events come back on the next
+        fetch. Otherwise it advances past events dropped by the keyword filter
+        too, so a narrow filter never rescans the same range.
+        """
+        ev, rq = self.events, self.requests
+        limit = limit or self.batch_size
+        with self.engine.connect() as conn:
+            seen = conn.execute(
+                select(ev.c.id, ev.c.created_at).where(ev.c.id > since).order_by(ev.c.id).limit(limit)
+            ).all()
+            if not seen:
+                return [], since
+            ids = [event_id for event_id, _ in seen]
+            settled_before = datetime.now(timezone.utc) - timedelta(seconds=self.settle)
+            cursor = since
+            for event_id, created_at in seen:
+                if as_utc(created_at) > settled_before:
+                    break
+                cursor = event_id
+            query = (
+                select(ev.c.id, ev.c.kind, ev.c.created_at.label("event_at"), rq)
+                .join(rq, rq.c.id == ev.c.request_id)
+                .where(ev.c.id.in_(ids))
+                .order_by(ev.c.id)
+            )
+            if keywords:
+                query = query.where(or_(*[
+                    or_(rq.c.title.ilike(f"%{k}%"), rq.c.description.ilike(f"%{k}%")) for k in keywords
+                ]))
+            rows = conn.execute(query).mappings().all()
+        events = []
+        for row in rows:
+            request = {c.name: row[c.name] for c in rq.columns}
+            events.append({"id": row["id"], "kind": row["kind"], "at": row["event_at"], "request": request})
+        return events, cursor
+
+    def resolve_cursor(self, since: Optional[int], last_event_id: Optional[str]) -> int:
+        """Explicit ``since`` wins, then ``Last-Event-ID``; otherwise start from now."""
+        if since is not None:
+            return since
+        if last_event_id and last_event_id.strip().isdigit():
+            return int(last_event_id)
+        return self.latest_id()
+
+    async def stream(self, request, since: int, keywords: List[str]) -> AsyncIterator[str]:
+        """SSE body: a ``reset`` if the cursor predates retention, then deltas and heartbeats.
+
+        Each message's SSE id is the settled cursor rather than the event id,
+        so a reconnect resumes before any event that may still appear.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        waiter = (loop, wake)
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            yield "retry: 3000\n\n"
+            oldest = await run_in_threadpool(self.oldest_id)
+            if oldest is not None and since < oldest - 1:
+                # Events were pruned; the client has to reload GET /requests
+                yield sse_message({"cursor": oldest - 1}, event="reset", event_id=oldest - 1)
+                since = oldest - 1
+            sent: Set[int] = set()  # delivered ids above the cursor
+            while not await request.is_disconnected():
+                wake.clear()
+                while True:
+                    events, cursor = await run_in_threadpool(self.fetch, since, keywords)
+                    for item in events:
+                        if item["id"] in sent:
+                            continue
+                        sent.add(item["id"])
+                        self.delivered += 1
+                        yield sse_message(item, event=item["kind"], event_id=cursor)
+                    sent = {i for i in sent if i > cursor}
+                    if cursor == since:
+                        break
+                    since = cursor
+                # Unsettled events pending: look again once they settle even without a wake-up
+                timeout = min(self.heartbeat, self.settle) if sent else self.heartbeat
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+    # -- housekeeping -----------------------------------------------------
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Drop events past the retention window (registered as a maintenance hook)."""
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.retention_days)
+        with self.engine.begin() as conn:
+            removed = conn.execute(delete(self.events).where(self.events.c.created_at < cutoff)).rowcount or 0
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            listeners = len(self._waiters)
+        return {
+            "listeners": listeners,
+            "latest_seen": self.latest_seen,
+            "published": self.published,
+            "delivered": self.delivered,
+            "pruned": self.pruned,
+            "retention_days": self.retention_days,
+            "bus": self.bus.backend,
+        }
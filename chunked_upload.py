@@ -0,0 +1,252 @@
+"""Resumable chunked uploads written straight into their final file.
+
+``init`` preallocates ``<root>/.partial/<upload_id>.part`` at the declared
+size. Each chunk PUT streams the request body into its own byte range with
+``os.pwrite`` from a worker thread, so chunks can arrive in parallel and in any
+order, the event loop never blocks on disk, and ``complete`` is a rename rather
+than a concatenation pass.
+
+The whole-file SHA-256 is advanced as a frontier: the chunk that sits at the
+frontier is hashed from memory while it streams in; chunks that arrive ahead of
+it are hashed from the file (normally still in the page cache) once the
+frontier reaches them. After a restart the frontier starts again from byte 0,
+which is the only case where ``complete`` reads a whole file back.
+
+Where ``os.pwrite`` is missing (Windows) writes fall back to ``lseek`` +
+``write`` under a lock.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import AsyncIterable, Dict, Iterable, Optional, Set, Tuple
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("FRANKLIN_UPLOAD_CHUNK_MB", "5")) * 1024 * 1024
+UPLOAD_MAX_BYTES = int(float(os.getenv("FRANKLIN_UPLOAD_MAX_GB", "5")) * 1024 ** 3)
+WRITE_BUFFER = 1024 * 1024
+READ_BLOCK = 4 * 1024 * 1024
+
+
+class ChunkError(ValueError):
+    """The chunk does not fit the upload (bad index, wrong size or checksum mismatch)."""
+
+
+class _Frontier:
+    """Running SHA-256 over the contiguous prefix of chunks hashed so far."""
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.next_index = 0
+        self.busy = False  # a streaming chunk or a catch-up read currently owns ``sha``
+        self.lock = threading.Lock()
+
+
+_seek_write_lock = threading.Lock()
+
+
+def _seek_write(fd: int, data: bytes, offset: int) -> int:
+    """``os.pwrite`` stand-in: the lock keeps the seek and the write together."""
+    with _seek_write_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    return len(data)
+
+
+_pwrite = os.pwrite if hasattr(os, "pwrite") else _seek_write
+
+
+def chunk_count(size: int, chunk_size: int) -> int:
+    return max(1, -(-size // chunk_size))
+
+
+def chunk_length(index: int, size: int, chunk_size: int) -> int:
+    return min(chunk_size, size - index * chunk_size)
+
+
+class ChunkedUploads:
+    def __init__(self, root: str):
+        self.root = root
+        self.partial_dir = os.path.join(root, ".partial")
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self._frontiers: Dict[str, _Frontier] = {}
+        self._lock = threading.Lock()
+        self.bytes_received = 0
+        self.bytes_hashed_inline = 0
+        self.bytes_hashed_catchup = 0
+
+    def part_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
+
+    def _frontier(self, upload_id: str) -> _Frontier:
+        with self._lock:
+            return self._frontiers.setdefault(upload_id, _Frontier())
+
+    def create(self, upload_id: str, size: int):
+        """Preallocate the destination (sparse where the filesystem allows)."""
+        with open(self.part_path(upload_id), "wb") as f:
+            f.truncate(size)
+        self._frontier(upload_id)
+
+    def exists(self, upload_id: str) -> bool:
+        return os.path.exists(self.part_path(upload_id))
+
+    async def write_chunk(self, upload_id: str, index: int, size: int, chunk_size: int,
+                          body: AsyncIterable[bytes], expected_sha256: Optional[str] = None) -> int:
+        """Stream one chunk into place; returns the bytes written."""
+        total = chunk_count(size, chunk_size)
+        if not 0 <= index < total:
+            raise ChunkError(f"Chunk index {index} out of range (0..{total - 1})")
+        expected = chunk_length(index, size, chunk_size)
+        offset = index * chunk_size
+
+        frontier = self._frontier(upload_id)
+        with frontier.lock:
+            inline = frontier.next_index == index and not frontier.busy
+            if inline:
+                frontier.busy = True
+                saved = frontier.sha.copy()
+        check = hashlib.sha256() if expected_sha256 else None
+
+        def flush(data: bytes, at: int):
+            _pwrite(fd, data, at)
+            if inline:
+                frontier.sha.update(data)
+            if check:
+                check.update(data)
+
+        fd = os.open(self.part_path(upload_id), os.O_WRONLY | getattr(os, "O_BINARY", 0))
+        written = 0
+        ok = False
+        try:
+            buffer = bytearray()
+            async for piece in body:
+                if written + len(buffer) + len(piece) > expected:
+                    raise ChunkError(f"Chunk {index} is larger than {expected} bytes")
+                buffer += piece
+                if len(buffer) >= WRITE_BUFFER:
+                    data = bytes(buffer)
+                    buffer.clear()
+                    await asyncio.to_thread(flush, data, offset + written)
+                    written += len(data)
+            if buffer:
+                await asyncio.to_thread(flush, bytes(buffer), offset + written)
+                written += len(buffer)
+            if written != expected:
+                raise ChunkError(f"Chunk {index} has {written} bytes, expected {expected}")
+            if check and check.hexdigest() != expected_sha256.lower():
+                raise ChunkError(f"Chunk {index} checksum mismatch")
+            ok = True
+        finally:
+            os.close(fd)
+            if inline:
+                with frontier.lock:
+                    if ok:
+                        frontier.next_index = index + 1
+                    else:
+                        frontier.sha = saved
+                    frontier.busy = False
+        self.bytes_received += written
+        if inline:
+            self.bytes_hashed_inline += written
+        return written
+
+    def advance(self, upload_id: str, size: int, chunk_size: int, received: Iterable[int]) -> int:
+        """Hash already-written chunks that the frontier has reached; returns the new frontier."""
+        received: Set[int] = set(received)
+        frontier = self._frontier(upload_id)
+        with frontier.lock:
+            if frontier.busy or frontier.next_index not in received:
+                return frontier.next_index
+            frontier.busy = True
+        try:
+            with open(self.part_path(upload_id), "rb") as f:
+                while frontier.next_index in received:
+                    index = frontier.next_index
+                    f.seek(index * chunk_size)
+                    remaining = chunk_length(index, size, chunk_size)
+                    while remaining:
+                        block = f.read(min(READ_BLOCK, remaining))
+                        if not block:
+                            raise ChunkError(f"Partial file for {upload_id} is truncated")
+                        frontier.sha.update(block)
+                        remaining -= len(block)
+                    self.bytes_hashed_catchup += chunk_length(index, size, chunk_size)
+                    with frontier.lock:
+                        frontier.next_index = index + 1
+        finally:
+            with frontier.lock:
+                frontier.busy = False
+        return frontier.next_index
+
+    def finish(self, upload_id: str, size: int, chunk_size: int, dest_path: Optional[str]) -> Tuple[str, int]:
+        """Hash whatever the frontier has not seen, then move the file into place.
+
+        Returns ``(sha256, size)``. With ``dest_path=None`` the partial file is
+        left for the caller (e.g. when the content turns out to be a duplicate).
+        """
+        total = chunk_count(size, chunk_size)
+        frontier = self._frontier(upload_id)
+        while self.advance(upload_id, size, chunk_size, range(total)) != total:
+            with frontier.lock:
+                busy = frontier.busy
+            if not busy:
+                raise ChunkError("Upload is still receiving chunks")
+            time.sleep(0.005)  # another thread is mid catch-up; let it finish
+        digest = self._frontier(upload_id).sha.hexdigest()
+        if dest_path:
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            os.replace(self.part_path(upload_id), dest_path)
+        with self._lock:
+            self._frontiers.pop(upload_id, None)
+        return digest, size
+
+    def discard(self, upload_id: str):
+        with self._lock:
+            self._frontiers.pop(upload_id, None)
+        try:
+            os.remove(self.part_path(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            active = len(self._frontiers)
+        usage = shutil.disk_usage(self.root)
+        return {
+            "active_uploads": active,
+            "bytes_received": self.bytes_received,
+            "bytes_hashed_inline": self.bytes_hashed_inline,
+            "bytes_hashed_catchup": self.bytes_hashed_catchup,
+            "disk_free_bytes": usage.free,
+        }
+
+
+async def stream_to_file(path: str, body: AsyncIterable[bytes], max_bytes: int = UPLOAD_MAX_BYTES) -> Tuple[str, int]:
+    """Write a single-shot upload off the event loop, hashing as it goes; returns (sha256, size)."""
+    sha = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, path, "wb")
+    try:
+        buffer = bytearray()
+        async for piece in body:
+            size += len(piece)
+            if size > max_bytes:
+                raise ChunkError(f"Upload exceeds {max_bytes} bytes")
+            buffer += piece
+            if len(buffer) >= WRITE_BUFFER:
+                data = bytes(buffer)
+                buffer.clear()
+                await asyncio.to_thread(lambda: (f.write(data), sha.update(data)))
+        if buffer:
+            data = bytes(buffer)
+            await asyncio.to_thread(lambda: (f.write(data), sha.update(data)))
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        os.remove(path)
+        raise
+    await asyncio.to_thread(f.close)
+    return sha.hexdigest(), size
@@ -0,0 +1,290 @@
+"""
+Process-wide registry of AI SDK clients.
+
+Building a `genai.Client`, `OpenAI` or `anthropic.Anthropic` sets up auth and
+an HTTP connection pool, so clients are created once per process on first use
+and shared by every caller (thread-safe). Each provider can have several keys
+(`<PROVIDER>_API_KEYS=k1,k2`, falling back to `<PROVIDER>_API_KEY`): when a
+call fails with an auth or quota error the caller reports it and the registry
+rotates to the next key. `health()` reports per-client state and can probe the
+provider with a cheap request.
+
+Import-safe like the orchestrator: missing SDKs or keys only surface as
+`ClientUnavailable` when that client is requested. So does a factory that
+fails (e.g. Google default credentials that cannot be found).
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Optional imports (import-safe)
+try:
+    from google import genai
+except Exception:
+    genai = None
+
+try:
+    from google.cloud import texttospeech
+    from google.auth import default as google_default_credentials
+except Exception:
+    texttospeech = None
+    google_default_credentials = None
+
+try:
+    from openai import OpenAI
+except Exception:
+    OpenAI = None
+
+try:
+    import anthropic
+except Exception:
+    anthropic = None
+
+try:
+    from config import get_config
+except Exception:
+    get_config = None
+
+HEALTH_TTL = float(os.getenv("TRINITY_CLIENT_HEALTH_TTL", "300"))
+# HTTP timeout baked into every SDK client, so a hung call gives its thread back
+CLIENT_TIMEOUT = float(os.getenv("TRINITY_ENGINE_TIMEOUT", "60"))
+
+# Error names / status codes that mean "this key is bad or exhausted", not "the request was bad"
+_ROTATE_STATUS = {401, 403, 429}
+_ROTATE_NAMES = ("Authentication", "PermissionDenied", "RateLimit", "ResourceExhausted", "Unauthenticated")
+
+
+class ClientUnavailable(RuntimeError):
+    pass
+
+
+def _keys_from_env(name: str, config_attr: Optional[str]) -> List[str]:
+    keys = [k.strip() for k in os.getenv(f"{name}_API_KEYS", "").split(",") if k.strip()]
+    if not keys:
+        single = os.getenv(f"{name}_API_KEY", "")
+        if not single and get_config and config_attr:
+            single = getattr(get_config(), config_attr, "")
+        keys = [single] if single else []
+    return keys
+
+
+def _fingerprint(key: Optional[str]) -> Optional[str]:
+    return f"...{key[-4:]}" if key else None
+
+
+def should_rotate(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int) and status in _ROTATE_STATUS:
+        return True
+    return any(n in type(exc).__name__ for n in _ROTATE_NAMES)
+
+
+class ClientSpec:
+    """How to build one kind of client: an SDK factory plus where its keys come from."""
+
+    def __init__(self, name: str, factory: Callable[[Optional[str]], Any],
+                 keys: Optional[Callable[[], List[str]]] = None,
+                 probe: Optional[Callable[[Any], Any]] = None,
+                 sdk_available: Callable[[], bool] = lambda: True,
+                 unavailable: str = ""):
+        self.name = name
+        self.factory = factory
+        self.keys = keys  # None: the client authenticates without an API key
+        self.probe = probe
+        self.sdk_available = sdk_available
+        self.unavailable = unavailable or f"{name} client not available."
+
+
+class _Slot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client: Any = None
+        self.keys: List[str] = []
+        self.key_index = 0
+        self.created = 0
+        self.rotations = 0
+        self.last_error: Optional[str] = None
+        self.healthy: Optional[bool] = None
+        self.checked_at: Optional[float] = None
+
+
+class ClientRegistry:
+    def __init__(self, specs: List[ClientSpec]):
+        self._specs = {s.name: s for s in specs}
+        self._slots = {s.name: _Slot() for s in specs}
+        self.hits = 0
+
+    def register(self, spec: ClientSpec):
+        self._specs[spec.name] = spec
+        self._slots[spec.name] = _Slot()
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def _build(self, spec: ClientSpec, slot: _Slot):
+        if not spec.sdk_available():
+            raise ClientUnavailable(spec.unavailable)
+        key = None
+        if spec.keys is not None:
+            slot.keys = slot.keys or spec.keys()
+            if not slot.keys:
+                raise ClientUnavailable(spec.unavailable)
+            slot.key_index %= len(slot.keys)
+            key = slot.keys[slot.key_index]
+        try:
+            slot.client = spec.factory(key)
+        except ClientUnavailable:
+            raise
+        except Exception as e:
+            slot.last_error = f"{type(e).__name__}: {e}"[:300]
+            raise ClientUnavailable(f"{spec.unavailable} {slot.last_error}") from e
+        slot.created += 1
+
+    def get(self, name: str):
+        """The shared client for ``name``, built on first use."""
+        slot = self._slots.get(name)
+        if slot is None:
+            raise ClientUnavailable(f"Unknown client: {name}")
+        client = slot.client
+        if client is not None:
+            self.hits += 1
+            return client
+        with slot.lock:
+            if slot.client is None:
+                self._build(self._specs[name], slot)
+            return slot.client
+
+    def available(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Every client (of ``names``, default all) that can be built, by name."""
+        clients = {}
+        for name in names or list(self._specs):
+            try:
+                clients[name] = self.get(name)
+            except ClientUnavailable:
+                continue
+        return clients
+
+    def report_failure(self, name: str, exc: BaseException, client: Any = None) -> bool:
+        """Record a failed call; rotates to the next key on auth/quota errors. Returns True if rotated.
+
+        Passing the ``client`` that failed keeps concurrent failures on one key
+        from rotating more than once.
+        """
+        slot = self._slots.get(name)
+        if slot is None:
+            return False
+        with slot.lock:
+            slot.last_error = f"{type(exc).__name__}: {exc}"[:300]
+            if not should_rotate(exc) or (client is not None and slot.client is not client):
+                return False
+            slot.healthy = False
+            if len(slot.keys) < 2:
+                return False
+            slot.key_index = (slot.key_index + 1) % len(slot.keys)
+            slot.rotations += 1
+            slot.client = None  # rebuilt with the next key on the next get()
+            return True
+
+    def reset(self, name: Optional[str] = None):
+        """Drop clients (and re-read keys) so the next get() picks up changed credentials."""
+        for n in [name] if name else list(self._slots):
+            slot = self._slots[n]
+            with slot.lock:
+                slot.client = None
+                slot.keys = []
+                slot.key_index = 0
+
+    def health(self, probe: bool = False, max_age: float = HEALTH_TTL) -> Dict[str, Dict[str, Any]]:
+        """Per-client state; with ``probe`` stale entries are checked against the provider."""
+        report = {}
+        for name, spec in self._specs.items():
+            slot = self._slots[name]
+            if probe and spec.probe and (slot.checked_at is None or time.time() - slot.checked_at > max_age):
+                self.check(name)
+            key = slot.keys[slot.key_index] if slot.keys else None
+            report[name] = {
+                "sdk": spec.sdk_available(),
+                "built": slot.client is not None,
+                "keys": len(slot.keys or spec.keys()) if spec.keys else None,
+                "key": _fingerprint(key),
+                "created": slot.created,
+                "rotations": slot.rotations,
+                "healthy": slot.healthy,
+                "checked_at": slot.checked_at,
+                "last_error": slot.last_error,
+            }
+        return report
+
+    def check(self, name: str) -> bool:
+        """Probe one client now; an auth failure rotates the key like a failed call would."""
+        spec, slot = self._specs[name], self._slots[name]
+        try:
+            client = self.get(name)
+            if spec.probe:
+                spec.probe(client)
+            slot.healthy = True
+        except ClientUnavailable as e:
+            slot.healthy, slot.last_error = False, str(e)
+        except Exception as e:
+            self.report_failure(name, e)
+            slot.healthy = False
+        slot.checked_at = time.time()
+        return bool(slot.healthy)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "created": {n: s.created for n, s in self._slots.items()},
+            "rotations": {n: s.rotations for n, s in self._slots.items()},
+        }
+
+
+def _google_tts(_key):
+    creds, _ = google_default_credentials()
+    return texttospeech.TextToSpeechClient(credentials=creds)
+
+
+CLIENTS = ClientRegistry([
+    ClientSpec(
+        "gemini", lambda key: genai.Client(api_key=key, http_options={"timeout": int(CLIENT_TIMEOUT * 1000)}),
+        keys=lambda: _keys_from_env("GEMINI", "gemini_api_key"),
+        probe=lambda c: next(iter(c.models.list()), None),
+        sdk_available=lambda: genai is not None,
+        unavailable="Gemini client not available (missing package or GEMINI_API_KEY).",
+    ),
+    ClientSpec(
+        "openai", lambda key: OpenAI(api_key=key, timeout=CLIENT_TIMEOUT),
+        keys=lambda: _keys_from_env("OPENAI", "openai_api_key"),
+        probe=lambda c: c.models.list(),
+        sdk_available=lambda: OpenAI is not None,
+        unavailable="OpenAI client not available (missing package or OPENAI_API_KEY).",
+    ),
+    ClientSpec(
+        "anthropic", lambda key: anthropic.Anthropic(api_key=key, timeout=CLIENT_TIMEOUT),
+        keys=lambda: _keys_from_env("ANTHROPIC", "anthropic_api_key"),
+        probe=lambda c: c.models.list(limit=1),
+        sdk_available=lambda: anthropic is not None,
+        unavailable="Anthropic client not available (missing package or ANTHROPIC_API_KEY).",
+    ),
+    ClientSpec(
+        "google_tts", _google_tts,
+        sdk_available=lambda: texttospeech is not None and google_default_credentials is not None,
+        unavailable="Google TTS not available (missing SDK).",
+    ),
+])
+
+
+def get_client(name: str):
+    return CLIENTS.get(name)
+
+
+@contextmanager
+def reporting(name: str, client: Any = None):
+    """Wrap an SDK call so auth/quota failures rotate that client's key."""
+    try:
+        yield
+    except Exception as e:
+        CLIENTS.report_failure(name, e, client)
+        raise
@@ -0,0 +1,317 @@
+"""Background ingestion of uploaded PDFs, DOCX files and images.
+
+Parsing, rendering and OCR run in a process pool so they never hold the API
+event loop (or the GIL). Large PDFs are split into page ranges that are
+processed in parallel; results are written back incrementally as ranges
+finish, so clients can watch ``pages_done`` grow. Jobs are keyed by content
+hash: the same blob is never processed twice at once, and a finished result is
+stored once for every upload that shares it.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import pymupdf as fitz  # PyMuPDF >= 1.24
+except Exception:
+    try:
+        import fitz  # older PyMuPDF
+    except Exception:  # optional: falls back to PyPDF2 (text only)
+        fitz = None
+
+try:
+    from PyPDF2 import PdfReader
+except Exception:
+    PdfReader = None
+
+DOC_WORKERS = int(os.getenv("FRANKLIN_DOC_WORKERS", str(os.cpu_count() or 2)))
+DOC_MAX_JOBS = int(os.getenv("FRANKLIN_DOC_MAX_JOBS", "4"))
+DOC_PAGES_PER_TASK = int(os.getenv("FRANKLIN_DOC_PAGES_PER_TASK", "8"))
+DOC_RENDER_PAGES = os.getenv("FRANKLIN_DOC_RENDER_PAGES", "1") == "1"
+DOC_RENDER_DPI = int(os.getenv("FRANKLIN_DOC_RENDER_DPI", "110"))
+DOC_OCR = os.getenv("FRANKLIN_DOC_OCR", "1") == "1"
+DOC_STORE_INTERVAL = float(os.getenv("FRANKLIN_DOC_STORE_SECONDS", "1"))
+DOC_START_METHOD = os.getenv("FRANKLIN_DOC_START_METHOD", "spawn")
+# Pages with less extractable text than this are treated as scans and OCR'd
+OCR_MIN_CHARS = 20
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# store_fn(sha256, result, done): done=True only for a completed result worth caching
+StoreFn = Callable[[str, Dict[str, Any], bool], None]
+
+
+class UnsupportedDocument(ValueError):
+    """The file is not a PDF, DOCX or image."""
+
+
+def detect_kind(filename: str, file_type: Optional[str]) -> Optional[str]:
+    ext = os.path.splitext(filename or "")[1].lower()
+    file_type = (file_type or "").lower()
+    if ext == ".pdf" or file_type == "application/pdf":
+        return "pdf"
+    if ext == ".docx" or file_type == DOCX_TYPE:
+        return "docx"
+    if ext in IMAGE_EXTENSIONS or file_type.startswith("image/"):
+        return "image"
+    return None
+
+
+# -- worker-process functions (top level so the pool can pickle them) ------
+def pdf_outline(path: str) -> Dict[str, Any]:
+    if fitz:
+        with fitz.open(path) as doc:
+            meta = {k: v for k, v in (doc.metadata or {}).items() if v}
+            return {"pages": doc.page_count, "metadata": meta, "engine": "pymupdf"}
+    if PdfReader:
+        reader = PdfReader(path)
+        meta = {k.lstrip("/"): str(v) for k, v in (reader.metadata or {}).items()}
+        return {"pages": len(reader.pages), "metadata": meta, "engine": "pypdf2"}
+    raise UnsupportedDocument("No PDF library installed (PyMuPDF or PyPDF2)")
+
+
+def pdf_pages(path: str, start: int, stop: int, artifact_dir: str, render: bool, ocr: bool) -> List[Dict[str, Any]]:
+    """Text (plus page image and OCR for scans) for pages [start, stop), 1-based in the output."""
+    pages = []
+    if fitz:
+        from image_processing_utils import ocr_available, ocr_image
+
+        with fitz.open(path) as doc:
+            for index in range(start, stop):
+                page = doc[index]
+                text = page.get_text()
+                entry: Dict[str, Any] = {"page": index + 1, "ocr": False}
+                scanned = len(text.strip()) < OCR_MIN_CHARS
+                if render or (ocr and scanned and ocr_available()):
+                    pix = page.get_pixmap(dpi=DOC_RENDER_DPI)
+                    if render:
+                        entry["image"] = os.path.join(artifact_dir, f"page-{index + 1:04d}.png")
+                        os.makedirs(artifact_dir, exist_ok=True)
+                        pix.save(entry["image"])
+                    if ocr and scanned and ocr_available():
+                        from PIL import Image
+
+                        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                        text = ocr_image(img) or text
+                        entry["ocr"] = True
+                entry["text"] = text
+                entry["chars"] = len(text)
+                pages.append(entry)
+        return pages
+    reader = PdfReader(path)
+    for index in range(start, stop):
+        text = reader.pages[index].extract_text() or ""
+        pages.append({"page": index + 1, "text": text, "chars": len(text), "ocr": False})
+    return pages
+
+
+def docx_extract(path: str) -> Dict[str, Any]:
+    from docx import Document
+
+    doc = Document(path)
+    props = doc.core_properties
+    meta = {
+        k: str(getattr(props, k)) for k in ("title", "author", "subject", "created", "modified", "last_modified_by")
+        if getattr(props, k, None)
+    }
+    meta.update({"paragraphs": len(doc.paragraphs), "tables": len(doc.tables), "sections": len(doc.sections)})
+    parts = [p.text for p in doc.paragraphs if p.text]
+    for table in doc.tables:
+        for row in table.rows:
+            parts.append("\t".join(cell.text for cell in row.cells))
+    text = "\n".join(parts)
+    # DOCX has no fixed pagination; report it as a single page
+    return {"metadata": meta, "pages": [{"page": 1, "text": text, "chars": len(text), "ocr": False}]}
+
+
+def image_extract(path: str, artifact_dir: str, ocr: bool) -> Dict[str, Any]:
+    from image_processing_utils import extract_image
+
+    entry = extract_image(path, artifact_dir, ocr=ocr)
+    return {"metadata": entry.pop("metadata"), "pages": [entry]}
+
+
+# -- coordinator (runs on the API event loop) -----------------------------
+class DocumentPipeline:
+    def __init__(self, artifact_root: str, store_fn: StoreFn, max_workers: int = DOC_WORKERS,
+                 max_jobs: int = DOC_MAX_JOBS, pages_per_task: int = DOC_PAGES_PER_TASK,
+                 render: bool = DOC_RENDER_PAGES, ocr: bool = DOC_OCR):
+        self.artifact_root = artifact_root
+        self._store_fn = store_fn
+        self.max_workers = max(1, max_workers)
+        self.max_jobs = max(1, max_jobs)
+        self.pages_per_task = max(1, pages_per_task)
+        self.render = render
+        self.ocr = ocr
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._active: Dict[str, Dict[str, Any]] = {}  # sha256 -> job
+        self.jobs: Dict[str, Dict[str, Any]] = {}  # pipeline_id -> job (recent)
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.pages = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        """Bind to the running event loop; worker processes spawn on first use."""
+        if self._pool:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._slots = asyncio.Semaphore(self.max_jobs)
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context(DOC_START_METHOD)
+        )
+
+    def _replace_pool(self, broken: ProcessPoolExecutor):
+        """Swap out a pool whose worker died, once, however many jobs saw it break."""
+        if self._pool is not broken:
+            return  # another job already replaced it, or the pipeline stopped
+        self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self):
+        pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, sha256: str, path: str, filename: str, file_type: Optional[str]) -> str:
+        """Queue a blob for processing (safe from any thread); returns its pipeline id."""
+        kind = detect_kind(filename, file_type)
+        if kind is None:
+            raise UnsupportedDocument(f"Cannot process {file_type or filename}")
+        if not self._pool:
+            raise RuntimeError("Document pipeline is not running")
+        with self._lock:
+            job = self._active.get(sha256)
+            if job:
+                return job["pipeline_id"]
+            job = {
+                "pipeline_id": uuid.uuid4().hex,
+                "sha256": sha256,
+                "kind": kind,
+                "status": "queued",
+                "pages_total": None,
+                "pages_done": 0,
+                "queued_at": time.time(),
+            }
+            self._active[sha256] = job
+            self.jobs[job["pipeline_id"]] = job
+            while len(self.jobs) > 500:
+                self.jobs.pop(next(iter(self.jobs)))
+        asyncio.run_coroutine_threadsafe(self._run(job, path), self._loop)
+        return job["pipeline_id"]
+
+    async def _store(self, job: Dict[str, Any], result: Dict[str, Any], done: bool):
+        await self._loop.run_in_executor(None, self._store_fn, job["sha256"], result, done)
+
+    async def _run(self, job: Dict[str, Any], path: str):
+        loop = asyncio.get_running_loop()
+        artifact_dir = os.path.join(self.artifact_root, job["sha256"])
+        result: Dict[str, Any] = {"pipeline_id": job["pipeline_id"], "kind": job["kind"], "status": "processing"}
+        async with self._slots:
+            pool = self._pool
+            self.started += 1
+            job["status"] = "processing"
+            started = time.perf_counter()
+            try:
+                if job["kind"] == "pdf":
+                    await self._run_pdf(pool, job, path, artifact_dir, result, started)
+                elif job["kind"] == "docx":
+                    result.update(await loop.run_in_executor(pool, docx_extract, path))
+                else:
+                    result.update(await loop.run_in_executor(pool, image_extract, path, artifact_dir, self.ocr))
+                elapsed = time.perf_counter() - started
+                job["pages_total"] = job["pages_done"] = result["pages_total"] = len(result["pages"])
+                result.update(status="completed", pages_done=len(result["pages"]), seconds=round(elapsed, 3),
+                              pages_per_second=round(len(result["pages"]) / elapsed, 2) if elapsed else None)
+                await self._store(job, result, True)
+                self.completed += 1
+                self.pages += len(result["pages"])
+                job["status"] = "completed"
+            except Exception as ex:
+                if isinstance(ex, BrokenProcessPool):
+                    # A worker died (e.g. OOM on a huge page); later jobs get a fresh pool
+                    self._replace_pool(pool)
+                result.update(status="failed", error=str(ex))
+                job.update(status="failed", error=str(ex))
+                self.failed += 1
+                await self._store(job, result, False)
+            finally:
+                job["seconds"] = round(time.perf_counter() - started, 3)
+                job["pages_per_second"] = result.get("pages_per_second")
+                self.busy_seconds += time.perf_counter() - started
+                with self._lock:
+                    self._active.pop(job["sha256"], None)
+
+    async def _run_pdf(self, pool: ProcessPoolExecutor, job, path: str, artifact_dir: str,
+                       result: Dict[str, Any], started: float):
+        loop = asyncio.get_running_loop()
+        outline = await loop.run_in_executor(pool, pdf_outline, path)
+        total = outline["pages"]
+        job["pages_total"] = total
+        result.update(metadata=outline["metadata"], engine=outline["engine"], pages_total=total,
+                      pages_done=0, pages=[])
+        await self._store(job, result, False)
+
+        ranges = [(s, min(s + self.pages_per_task, total)) for s in range(0, total, self.pages_per_task)]
+        futures = [
+            loop.run_in_executor(pool, pdf_pages, path, s, e, artifact_dir, self.render, self.ocr)
+            for s, e in ranges
+        ]
+        last_store = time.perf_counter()
+        try:
+            for finished in asyncio.as_completed(futures):
+                result["pages"].extend(await finished)
+                done = len(result["pages"])
+                job["pages_done"] = result["pages_done"] = done
+                elapsed = time.perf_counter() - started
+                result["pages_per_second"] = round(done / elapsed, 2) if elapsed else None
+                if done < total and time.perf_counter() - last_store >= DOC_STORE_INTERVAL:
+                    result["pages"].sort(key=lambda p: p["page"])
+                    await self._store(job, result, False)
+                    last_store = time.perf_counter()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        result["pages"].sort(key=lambda p: p["page"])
+
+    def job(self, pipeline_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(pipeline_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = [
+                {k: job.get(k) for k in ("pipeline_id", "kind", "status", "pages_done", "pages_total")}
+                for job in self._active.values()
+            ]
+        return {
+            "running": self.running,
+            "workers": self.max_workers,
+            "max_jobs": self.max_jobs,
+            "pages_per_task": self.pages_per_task,
+            "active": active,
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "pages": self.pages,
+            "pages_per_second": round(self.pages / self.busy_seconds, 2) if self.busy_seconds else None,
+            "pdf_engine": "pymupdf" if fitz else ("pypdf2" if PdfReader else None),
+        }
@@ -0,0 +1,394 @@
+"""Telemetry-driven engine registry and adaptive routing for the Trinity orchestrator.
+
+Every engine invocation is recorded here (latency and success), giving each
+engine a rolling window from which p50/p95 latency and a smoothed pass rate
+are derived. Routing orders engines by a score:
+
+    score = W_SUCCESS * pass_rate - W_LATENCY * latency_norm - W_COST * cost_norm
+            + W_MATCH * (engine is the keyword-classified route) + weight_bias
+
+and, with probability ``epsilon``, promotes a random other engine to the front
+so engines that look bad keep getting the occasional sample (exploration).
+
+Rows live in the ``engine_registry`` table (see ENGINE_MESH_PLAN.md for the
+shape). Stats are written behind every few seconds by the process doing the
+invocations; operator overrides (``disabled``, ``pinned``, ``weight_bias``,
+``cost_per_1k_tokens``) are written by the API and picked up by running
+orchestrators on their next refresh. Without a reachable database the
+registry still works in memory.
+
+``record()`` and ``route()`` never touch the database themselves: a due
+flush or refresh runs on a background thread, so both are safe to call from
+an event loop. Several processes can flush into one table: ``calls`` and
+``failures`` are added as SQL increments, while the rolling window and the
+figures derived from it are the last flushing process's view.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import (Boolean, Column, DateTime, Float, Integer, MetaData, String, Table, Text, insert,
+                        select, update)
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+ENGINE_WINDOW = int(os.getenv("TRINITY_ENGINE_WINDOW", "200"))
+ROUTE_EPSILON = float(os.getenv("TRINITY_ROUTE_EPSILON", "0.05"))
+FLUSH_SECONDS = float(os.getenv("TRINITY_REGISTRY_FLUSH_SECONDS", "5"))
+REFRESH_SECONDS = float(os.getenv("TRINITY_REGISTRY_REFRESH_SECONDS", "30"))
+# Latency at which the latency penalty reaches half its weight; also the prior for unseen engines
+LATENCY_REF = float(os.getenv("TRINITY_ROUTE_LATENCY_REF", "5.0"))
+WEIGHT_TEMPERATURE = 0.1
+
+DEFAULT_WEIGHTS = {
+    "success": float(os.getenv("TRINITY_ROUTE_W_SUCCESS", "1.0")),
+    "latency": float(os.getenv("TRINITY_ROUTE_W_LATENCY", "0.5")),
+    "cost": float(os.getenv("TRINITY_ROUTE_W_COST", "0.2")),
+    "match": float(os.getenv("TRINITY_ROUTE_W_MATCH", "0.3")),
+}
+
+# engine id -> (provider, default USD per 1k tokens)
+DEFAULT_ENGINES = {
+    "Gemini": ("Google", 0.01),
+    "OpenAI": ("OpenAI", 0.0006),
+    "Anthropic": ("Anthropic", 0.015),
+}
+
+OVERRIDE_FIELDS = ("disabled", "pinned", "weight_bias", "cost_per_1k_tokens")
+
+_metadata = MetaData()
+engine_registry_table = Table(
+    "engine_registry", _metadata,
+    Column("engine_id", String, primary_key=True),
+    Column("provider", String, nullable=False, default=""),
+    Column("cost_per_1k_tokens", Float, nullable=False, default=0.0),
+    Column("calls", Integer, nullable=False, default=0),
+    Column("failures", Integer, nullable=False, default=0),
+    Column("latency_p50_ms", Float),
+    Column("latency_p95_ms", Float),
+    Column("pass_rate", Float),
+    Column("routing_weight", Float),
+    Column("samples", Text),  # JSON [[latency_ms, ok], ...], the rolling window
+    Column("last_error", Text),
+    Column("disabled", Boolean, nullable=False, default=False),
+    Column("pinned", Boolean, nullable=False, default=False),
+    Column("weight_bias", Float, nullable=False, default=0.0),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    xs = sorted(values)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class EngineEntry:
+    def __init__(self, engine_id: str, provider: str = "", cost_per_1k_tokens: float = 0.0):
+        self.engine_id = engine_id
+        self.provider = provider
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=ENGINE_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.disabled = False
+        self.pinned = False
+        self.weight_bias = 0.0
+        self.routing_weight: Optional[float] = None
+        # Counts not yet added to the stored row
+        self.unflushed_calls = 0
+        self.unflushed_failures = 0
+
+    def latencies(self) -> List[float]:
+        return [lat for lat, ok in self.samples if ok]
+
+    def pass_rate(self) -> float:
+        # Laplace-smoothed, so a new engine starts at 0.5 instead of 0 or 1
+        ok = sum(1 for _, good in self.samples if good)
+        return (ok + 1) / (len(self.samples) + 2)
+
+    def row(self) -> Dict[str, Any]:
+        lats = self.latencies()
+        p50, p95 = _percentile(lats, 0.5), _percentile(lats, 0.95)
+        return {
+            "engine_id": self.engine_id,
+            "provider": self.provider,
+            "cost_per_1k_tokens": self.cost_per_1k_tokens,
+            "calls": self.calls,
+            "failures": self.failures,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "pass_rate": round(self.pass_rate(), 4),
+            "routing_weight": self.routing_weight,
+            "last_error": self.last_error,
+            "disabled": self.disabled,
+            "pinned": self.pinned,
+            "weight_bias": self.weight_bias,
+        }
+
+
+class EngineRegistry:
+    def __init__(self, db=None, engines: Optional[Dict[str, Tuple[str, float]]] = None,
+                 weights: Optional[Dict[str, float]] = None, epsilon: float = ROUTE_EPSILON,
+                 rng: Optional[random.Random] = None):
+        self.db = db
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.epsilon = epsilon
+        self._rng = rng or random.Random()
+        self._lock = threading.RLock()
+        self._entries = {eid: EngineEntry(eid, provider, cost)
+                         for eid, (provider, cost) in (engines or DEFAULT_ENGINES).items()}
+        self._dirty = False
+        self._flushed_at = time.monotonic()
+        self._refreshed_at = time.monotonic()
+        self._background: set = set()  # "flush"/"refresh" jobs in flight
+        self.explored = 0
+        self.routed = 0
+        self.persist_errors = 0
+        if db is not None:
+            try:
+                _metadata.create_all(db, tables=[engine_registry_table], checkfirst=True)
+                self.load()
+            except SQLAlchemyError as e:
+                self._persist_failed(e)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "EngineRegistry":
+        from sqlalchemy import create_engine
+
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        try:
+            db = create_engine(url, pool_pre_ping=True)
+        except Exception as e:
+            print(f"[EngineRegistry] database unavailable, keeping stats in memory: {e}")
+            db = None
+        return cls(db, **kwargs)
+
+    def _persist_failed(self, e: Exception):
+        self.persist_errors += 1
+        if self.persist_errors == 1:
+            print(f"[EngineRegistry] database unavailable, keeping stats in memory: {e}")
+
+    def _in_background(self, job: str):
+        """Run ``self.<job>()`` on a daemon thread unless one is already running."""
+        with self._lock:
+            if job in self._background:
+                return
+            self._background.add(job)
+
+        def run():
+            try:
+                getattr(self, job)()
+            finally:
+                with self._lock:
+                    self._background.discard(job)
+
+        threading.Thread(target=run, name=f"engine-registry-{job}", daemon=True).start()
+
+    def _entry(self, engine_id: str) -> EngineEntry:
+        entry = self._entries.get(engine_id)
+        if entry is None:
+            entry = self._entries[engine_id] = EngineEntry(engine_id)
+        return entry
+
+    # -- telemetry ---------------------------------------------------------
+    def record(self, engine_id: str, latency: float, ok: bool, error: Optional[str] = None):
+        """One invocation's outcome (latency in seconds); persisted write-behind."""
+        with self._lock:
+            entry = self._entry(engine_id)
+            entry.samples.append((latency, ok))
+            entry.calls += 1
+            entry.unflushed_calls += 1
+            if not ok:
+                entry.failures += 1
+                entry.unflushed_failures += 1
+                entry.last_error = (error or "")[:300]
+            self._dirty = True
+            due = time.monotonic() - self._flushed_at >= FLUSH_SECONDS
+        if due and self.db is not None:
+            self._in_background("flush")
+
+    # -- scoring / routing -------------------------------------------------
+    def scores(self, classified: Optional[str] = None) -> Dict[str, float]:
+        with self._lock:
+            entries = [e for e in self._entries.values() if not e.disabled]
+            max_cost = max((e.cost_per_1k_tokens for e in entries), default=0.0)
+            w = self.weights
+            out = {}
+            for e in entries:
+                p50 = _percentile(e.latencies(), 0.5)
+                latency = p50 if p50 is not None else LATENCY_REF
+                out[e.engine_id] = (
+                    w["success"] * e.pass_rate()
+                    - w["latency"] * latency / (latency + LATENCY_REF)
+                    - w["cost"] * (e.cost_per_1k_tokens / max_cost if max_cost else 0.0)
+                    + w["match"] * (e.engine_id == classified)
+                    + e.weight_bias
+                )
+            # Softmax shares, reported as routing_weight
+            if out:
+                top = max(out.values())
+                exp = {k: math.exp((v - top) / WEIGHT_TEMPERATURE) for k, v in out.items()}
+                total = sum(exp.values())
+                for k in exp:
+                    self._entries[k].routing_weight = round(exp[k] / total, 4)
+            return out
+
+    def route(self, classified: Optional[str] = None, candidates: Optional[List[str]] = None,
+              explore: bool = True) -> List[str]:
+        """Engines in the order to try them: pinned first, then by score, with epsilon exploration.
+
+        Disabled engines are left out, so the list is empty when every engine is disabled.
+        """
+        if self.db is not None and time.monotonic() - self._refreshed_at >= REFRESH_SECONDS:
+            self._in_background("refresh")  # this call routes on the overrides already loaded
+        scores = self.scores(classified)
+        pool = [e for e in (candidates or list(self._entries)) if e in scores]
+        ordered = sorted(pool, key=lambda e: (not self._entries[e].pinned, -scores[e]))
+        self.routed += 1
+        if explore and len(ordered) > 1 and not self._entries[ordered[0]].pinned \
+                and self._rng.random() < self.epsilon:
+            pick = self._rng.randrange(1, len(ordered))
+            ordered.insert(0, ordered.pop(pick))
+            self.explored += 1
+        return ordered
+
+    # -- overrides ---------------------------------------------------------
+    def set_override(self, engine_id: str, **changes) -> Dict[str, Any]:
+        unknown = set(changes) - set(OVERRIDE_FIELDS)
+        if unknown:
+            raise ValueError(f"Not overridable: {', '.join(sorted(unknown))}")
+        with self._lock:
+            entry = self._entry(engine_id)
+            for field, value in changes.items():
+                if value is not None:
+                    setattr(entry, field, value)
+        if self.db is not None:
+            values = {k: v for k, v in changes.items() if v is not None}
+            try:
+                with self.db.begin() as conn:
+                    self._upsert(conn, entry, values)
+            except SQLAlchemyError as e:
+                self._persist_failed(e)
+        return self.snapshot()[engine_id]
+
+    def set_weights(self, **weights):
+        unknown = set(weights) - set(self.weights)
+        if unknown:
+            raise ValueError(f"Unknown weights: {', '.join(sorted(unknown))}")
+        self.weights.update({k: float(v) for k, v in weights.items() if v is not None})
+
+    # -- persistence -------------------------------------------------------
+    def _upsert(self, conn, entry: EngineEntry, values: Dict[str, Any],
+                increments: Optional[Dict[str, int]] = None):
+        """Update the entry's row (``increments`` are added to the stored counts), inserting it if missing."""
+        t = engine_registry_table
+        values = dict(values, updated_at=datetime.now(timezone.utc))
+        changes = dict(values, **{k: t.c[k] + n for k, n in (increments or {}).items()})
+        if conn.execute(update(t).where(t.c.engine_id == entry.engine_id).values(**changes)).rowcount:
+            return
+        row = entry.row()
+        row.update(values, samples=json.dumps([[round(lat * 1000, 1), ok] for lat, ok in entry.samples]))
+        row.update({"calls": 0, "failures": 0}, **(increments or {}))  # unflushed counts arrive as increments
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(t).values(**row))
+        except IntegrityError:
+            conn.execute(update(t).where(t.c.engine_id == entry.engine_id).values(**changes))
+
+    def flush(self):
+        """Write rolling stats (never overrides, which belong to the API) to the database."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.scores()  # refresh routing_weight
+            rows = []
+            for entry in self._entries.values():
+                row = entry.row()
+                rows.append((entry, {
+                    "provider": row["provider"],
+                    "latency_p50_ms": row["latency_p50_ms"],
+                    "latency_p95_ms": row["latency_p95_ms"],
+                    "pass_rate": row["pass_rate"],
+                    "routing_weight": row["routing_weight"],
+                    "last_error": row["last_error"],
+                    "samples": json.dumps([[round(lat * 1000, 1), ok] for lat, ok in entry.samples]),
+                }, {"calls": entry.unflushed_calls, "failures": entry.unflushed_failures}))
+                entry.unflushed_calls = entry.unflushed_failures = 0
+            self._dirty = False
+            self._flushed_at = time.monotonic()
+        if self.db is None:
+            return
+        try:
+            with self.db.begin() as conn:
+                for entry, values, increments in rows:
+                    self._upsert(conn, entry, values, increments)
+        except SQLAlchemyError as e:
+            self._persist_failed(e)
+            with self._lock:  # keep the counts for the next flush
+                for entry, _, increments in rows:
+                    entry.unflushed_calls += increments["calls"]
+                    entry.unflushed_failures += increments["failures"]
+                self._dirty = True
+
+    def load(self):
+        """Replace in-memory state with the stored rows (stats and overrides)."""
+        self._apply(with_stats=True)
+
+    def refresh(self, force: bool = False):
+        """Pick up operator overrides made through the API since the last refresh."""
+        if self.db is None or (not force and time.monotonic() - self._refreshed_at < REFRESH_SECONDS):
+            return
+        self._apply(with_stats=False)
+
+    def _apply(self, with_stats: bool):
+        if self.db is None:
+            return
+        try:
+            with self.db.connect() as conn:
+                rows = conn.execute(select(engine_registry_table)).mappings().all()
+        except SQLAlchemyError as e:
+            self._persist_failed(e)
+            return
+        with self._lock:
+            self._refreshed_at = time.monotonic()
+            for row in rows:
+                entry = self._entry(row["engine_id"])
+                for field in OVERRIDE_FIELDS:
+                    if row[field] is not None:
+                        setattr(entry, field, row[field])
+                if with_stats:
+                    entry.provider = row["provider"] or entry.provider
+                    entry.calls = (row["calls"] or 0) + entry.unflushed_calls
+                    entry.failures = (row["failures"] or 0) + entry.unflushed_failures
+                    entry.last_error = row["last_error"]
+                    entry.samples.clear()
+                    for lat_ms, ok in json.loads(row["samples"] or "[]"):
+                        entry.samples.append((lat_ms / 1000.0, bool(ok)))
+
+    def snapshot(self, classified: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        scores = self.scores(classified)
+        with self._lock:
+            out = {}
+            for engine_id, entry in self._entries.items():
+                row = entry.row()
+                row["score"] = round(scores[engine_id], 4) if engine_id in scores else None
+                out[engine_id] = row
+            return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routed": self.routed,
+            "explored": self.explored,
+            "epsilon": self.epsilon,
+            "weights": dict(self.weights),
+            "persist_errors": self.persist_errors,
+        }
@@ -0,0 +1,367 @@
+"""Export rendering off the event loop, with an on-disk artifact cache.
+
+Excel, Word, project-JSON and JPEG exports are rendered by a process pool
+straight to a file under ``<cache_dir>/<task_id>/``. The file name carries the
+format and a hash of the task response, so a repeat export of an unchanged
+task is served from disk without rendering, and a task whose response changes
+never gets a stale file. At most ``max_queue`` renders may be running or
+waiting at once; beyond that callers get ``ExportBusy`` instead of piling up.
+
+Excel and Word exports are structured: one row / section per pipeline stage or
+agent. Both are written incrementally (openpyxl ``write_only`` mode, and a
+``document.xml`` streamed into the zip next to the python-docx default
+template parts), so memory stays flat however large the result is.
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
+
+EXPORT_WORKERS = int(os.getenv("FRANKLIN_EXPORT_WORKERS", "2"))
+EXPORT_MAX_QUEUE = int(os.getenv("FRANKLIN_EXPORT_MAX_QUEUE", "32"))
+EXPORT_CACHE_DAYS = float(os.getenv("FRANKLIN_EXPORT_CACHE_DAYS", "7"))
+EXPORT_START_METHOD = os.getenv("FRANKLIN_EXPORT_START_METHOD", "spawn")
+# Bump when a renderer's output changes so cached artifacts are not reused
+EXPORT_LAYOUT = 2
+EXCEL_CELL_CHARS = 32000  # Excel's hard limit is 32767 characters per cell
+
+FORMATS = {
+    "excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "word": (".docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "project": (".json", "application/json"),
+    "jpeg": (".jpg", "image/jpeg"),
+}
+
+
+class ExportBusy(RuntimeError):
+    """The render queue is full; retry later."""
+
+
+def response_hash(task: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        [EXPORT_LAYOUT, task.get("type"), task.get("status"), task.get("response")], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# -- result structure -----------------------------------------------------
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def content_text(value: Any) -> str:
+    """Printable text for a stage/agent output; inline images are summarised."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        if value.startswith("data:image"):
+            return f"[inline image, {len(value)} bytes base64]"
+        return _XML_ILLEGAL.sub("", value)
+    return _XML_ILLEGAL.sub("", json.dumps(value, indent=2, default=str))
+
+
+def _section(kind: str, name: Any, content: Any, status: str = "completed", provider: Any = None,
+             model: Any = None, timestamp: Any = None) -> Dict[str, Any]:
+    return {"kind": kind, "name": str(name), "status": status, "provider": provider,
+            "model": model, "timestamp": timestamp, "content": content}
+
+
+def export_sections(task: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """One section per pipeline stage or agent (plus final/aggregate output), in order."""
+    response = task.get("response")
+    if isinstance(response, dict) and isinstance(response.get("stages"), list):
+        for n, stage in enumerate(response["stages"], 1):
+            stage = stage if isinstance(stage, dict) else {"output": stage}
+            yield _section("stage", stage.get("stage") or f"Stage {n}", stage.get("output"),
+                           timestamp=stage.get("timestamp"))
+        if "finalOutput" in response:
+            yield _section("final", "Final output", response["finalOutput"], timestamp=response.get("timestamp"))
+    elif isinstance(response, dict) and isinstance(response.get("results"), list):
+        for result in response["results"]:
+            ai = result.get("response") or {}
+            ok = result.get("status") == "fulfilled"
+            yield _section("agent", result.get("agent"), ai.get("content") if ok else result.get("error"),
+                           result.get("status") or "", ai.get("provider"), ai.get("model"), ai.get("timestamp"))
+        aggregate = response.get("aggregate")
+        if aggregate:
+            yield _section("aggregate", "Aggregate", aggregate.get("content"), provider=aggregate.get("provider"),
+                           model=aggregate.get("model"), timestamp=aggregate.get("timestamp"))
+    elif response is not None:
+        yield _section("result", "Result", response.get("content", response) if isinstance(response, dict) else response)
+
+
+def _summary(task: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    start, end = task.get("startTime"), task.get("endTime")
+    yield "Task ID", task["id"]
+    yield "Type", task["type"]
+    yield "Status", task["status"]
+    response = task.get("response")
+    if isinstance(response, dict) and response.get("pipeline"):
+        yield "Pipeline", response["pipeline"]
+    yield "Duration (ms)", (end - start) if end and start else None
+
+
+# -- renderers (run in worker processes; each writes ``dest``) -------------
+def _render_excel(task: Dict[str, Any], dest: str):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font
+
+    wb = Workbook(write_only=True)
+    summary = wb.create_sheet("Summary")
+    summary.column_dimensions["A"].width = 16
+    summary.column_dimensions["B"].width = 48
+    for field, value in _summary(task):
+        summary.append([field, value])
+
+    ws = wb.create_sheet("AI Results")
+    for col, width in zip("ABCDEFGHI", (6, 12, 28, 12, 14, 20, 16, 6, 100)):
+        ws.column_dimensions[col].width = width
+    ws.freeze_panes = "A2"
+    bold, wrap = Font(bold=True), Alignment(wrap_text=True, vertical="top")
+    header = []
+    for title in ("#", "Kind", "Name", "Status", "Provider", "Model", "Timestamp", "Part", "Content"):
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+    for n, sec in enumerate(export_sections(task), 1):
+        text = content_text(sec["content"])
+        # Long outputs continue on following rows rather than being cut off
+        parts = [text[i:i + EXCEL_CELL_CHARS] for i in range(0, len(text), EXCEL_CELL_CHARS)] or [""]
+        for part_no, part in enumerate(parts, 1):
+            cell = WriteOnlyCell(ws, value=part)
+            cell.alignment = wrap
+            ws.append([n, sec["kind"], sec["name"], sec["status"], sec["provider"], sec["model"],
+                       sec["timestamp"], part_no, cell])
+    wb.save(dest)
+
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_DOCX_SECTION = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" w:header="720" w:footer="720" w:gutter="0"/>'
+    '</w:sectPr>'
+)
+
+
+def _docx_paragraph(text: str, style: Optional[str] = None, italic: bool = False) -> str:
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    rpr = "<w:rPr><w:i/></w:rPr>" if italic else ""
+    return f'<w:p>{ppr}<w:r>{rpr}<w:t xml:space="preserve">{escape(_XML_ILLEGAL.sub("", text))}</w:t></w:r></w:p>'
+
+
+def _docx_template() -> str:
+    import docx
+
+    return os.path.join(os.path.dirname(docx.__file__), "templates", "default.docx")
+
+
+def _render_word(task: Dict[str, Any], dest: str):
+    with zipfile.ZipFile(_docx_template()) as template, \
+            zipfile.ZipFile(dest, "w", zipfile.ZIP_DEFLATED) as out:
+        for item in template.infolist():
+            if item.filename != "word/document.xml":
+                out.writestr(item, template.read(item))
+        with out.open("word/document.xml", "w") as raw:
+            def write(xml: str):
+                raw.write(xml.encode("utf-8"))
+
+            write(f"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n<w:document xmlns:w=\"{_W_NS}\"><w:body>")
+            write(_docx_paragraph(f"Task Results: {task['id']}", "Title"))
+            for field, value in _summary(task):
+                write(_docx_paragraph(f"{field}: {'' if value is None else value}"))
+            for sec in export_sections(task):
+                write(_docx_paragraph(sec["name"], "Heading1"))
+                meta = [sec["kind"].title(), sec["status"]] + [str(v) for v in (sec["provider"], sec["model"]) if v]
+                write(_docx_paragraph(" · ".join(m for m in meta if m), italic=True))
+                for line in content_text(sec["content"]).split("\n"):
+                    write(_docx_paragraph(line))
+            write(_DOCX_SECTION + "</w:body></w:document>")
+
+
+def _render_project(task: Dict[str, Any], dest: str):
+    start, end = task.get("startTime"), task.get("endTime")
+    project_data = {
+        "project_id": task["id"],
+        "task_type": task["type"],
+        "status": task["status"],
+        "created_at": (task.get("request") or {}).get("timestamp", start),
+        "completed": end,
+        "duration_ms": (end - start) if end and start else 0,
+        "results": task.get("response"),
+    }
+    with open(dest, "w", encoding="utf-8") as f:
+        json.dump(project_data, f, indent=2, default=str)
+
+
+def _render_jpeg(task: Dict[str, Any], dest: str):
+    import base64
+    import io
+
+    from PIL import Image, ImageDraw
+
+    response = task.get("response")
+    content = response.get("content") if isinstance(response, dict) else None
+    if isinstance(content, str) and content.startswith("data:image"):
+        img = Image.open(io.BytesIO(base64.b64decode(content.split(",", 1)[1])))
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+    else:
+        img = Image.new("RGB", (800, 600), color=(255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        draw.text((20, 20), f"Task: {task['id']}\nType: {task['type']}\nStatus: {task['status']}", fill=(0, 0, 0))
+    img.save(dest, format="JPEG", quality=95)
+
+
+RENDERERS = {"excel": _render_excel, "word": _render_word, "project": _render_project, "jpeg": _render_jpeg}
+
+
+def render_to_file(fmt: str, task: Dict[str, Any], dest: str) -> float:
+    """Worker entry point: render, then atomically publish; returns render seconds."""
+    started = time.perf_counter()
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        RENDERERS[fmt](task, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return time.perf_counter() - started
+
+
+# -- coordinator ----------------------------------------------------------
+class ExportRenderer:
+    def __init__(self, cache_dir: str, max_workers: int = EXPORT_WORKERS, max_queue: int = EXPORT_MAX_QUEUE):
+        self.cache_dir = cache_dir
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._render_times: Deque[float] = deque(maxlen=500)
+        self._slot_freed = asyncio.Event()
+        self.queued = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+        self.failed = 0
+        self.pruned = 0
+
+    def artifact_path(self, task: Dict[str, Any], fmt: str) -> str:
+        ext = FORMATS[fmt][0]
+        return os.path.join(self.cache_dir, task["id"], f"{fmt}-{response_hash(task)[:24]}{ext}")
+
+    def _pool_or_start(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context(EXPORT_START_METHOD)
+            )
+        return self._pool
+
+    def stop(self):
+        pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, task: Dict[str, Any], fmt: str, wait: bool = False) -> Tuple[str, bool, float]:
+        """Path to the rendered artifact, whether it came from cache, and render seconds.
+
+        With ``wait`` a full queue is waited out instead of raising ``ExportBusy``.
+        """
+        if fmt not in RENDERERS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        path = self.artifact_path(task, fmt)
+        if os.path.exists(path):
+            self.hits += 1
+            return path, True, 0.0
+
+        # Identical concurrent exports share one render
+        job = self._inflight.get(path)
+        if job is not None:
+            self.hits += 1
+            return path, True, await asyncio.shield(job)
+        while self.queued >= self.max_queue:
+            if not wait:
+                self.rejected += 1
+                raise ExportBusy(f"Export queue is full ({self.max_queue} renders pending)")
+            self._slot_freed.clear()
+            await self._slot_freed.wait()
+            if os.path.exists(path) or path in self._inflight:
+                return await self.render(task, fmt, wait)
+
+        self.queued += 1
+        self.misses += 1
+        # The render is not tied to this caller: a client that goes away still leaves a cached file
+        job = asyncio.ensure_future(self._render(fmt, task, path))
+        job.add_done_callback(lambda j: j.cancelled() or j.exception())
+        self._inflight[path] = job
+        return path, False, await asyncio.shield(job)
+
+    async def _render(self, fmt: str, task: Dict[str, Any], path: str) -> float:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            loop = asyncio.get_running_loop()
+            pool = self._pool_or_start()
+            seconds = await loop.run_in_executor(pool, render_to_file, fmt, task, path)
+            self._render_times.append(seconds)
+            return seconds
+        except BrokenProcessPool:
+            self.failed += 1
+            if self._pool is pool:  # a worker died; start a fresh pool for the next render
+                self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.queued -= 1
+            self._inflight.pop(path, None)
+            self._slot_freed.set()
+
+    def prune(self, max_age_days: float = EXPORT_CACHE_DAYS) -> int:
+        """Delete cached artifacts not touched for ``max_age_days`` (maintenance hook)."""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for task_dir in os.scandir(self.cache_dir):
+            if not task_dir.is_dir():
+                continue
+            for entry in os.scandir(task_dir.path):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            if not os.listdir(task_dir.path):
+                shutil.rmtree(task_dir.path, ignore_errors=True)
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        times = sorted(self._render_times)
+        lookups = self.hits + self.misses
+        return {
+            "workers": self.max_workers,
+            "queued": self.queued,
+            "max_queue": self.max_queue,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "pruned": self.pruned,
+            "render_ms": {
+                "count": len(times),
+                "mean": round(sum(times) / len(times) * 1000, 1) if times else None,
+                "p95": round(times[min(len(times) - 1, int(0.95 * len(times)))] * 1000, 1) if times else None,
+            },
+        }
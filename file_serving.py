@@ -0,0 +1,169 @@
+"""Conditional, ranged file responses that never load a file into memory.
+
+``serve_file`` answers ``If-None-Match`` with 304, honours a single
+``Range`` (and ``If-Range``) with 206, and otherwise returns the whole file.
+The body is handed to the server with the ASGI ``http.response.pathsend`` or
+``http.response.zerocopysend`` extensions when the server offers them (so the
+kernel copies it with sendfile); otherwise it is streamed with ``os.pread``
+from a worker thread in fixed-size blocks (``lseek`` + ``read`` under a lock
+where ``os.pread`` is missing, as on Windows).
+"""
+import hashlib
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+STREAM_BLOCK = 256 * 1024
+DOWNLOAD_MAX_AGE = int(os.getenv("FRANKLIN_DOWNLOAD_MAX_AGE", "86400"))
+
+_RANGE_RE = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+_seek_read_lock = threading.Lock()
+
+
+def _seek_read(fd: int, n: int, offset: int) -> bytes:
+    """``os.pread`` stand-in: the lock keeps the seek and the read together."""
+    with _seek_read_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, n)
+
+
+_pread = os.pread if hasattr(os, "pread") else _seek_read
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single ``bytes=`` range, None to send the whole file.
+
+    Multi-range requests are answered with the full file, which RFC 9110 allows.
+    Raises HTTP 416 when the range cannot be satisfied.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):]
+    if "," in spec:
+        return None
+    m = _RANGE_RE.match(spec)
+    if not m or not (m.group(1) or m.group(2)):
+        return None
+    if m.group(1):
+        start = int(m.group(1))
+        end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    else:
+        suffix = int(m.group(2))
+        if suffix == 0:
+            start, end = size, size - 1
+        else:
+            start, end = max(0, size - suffix), size - 1
+    if start >= size or start > end:
+        raise HTTPException(416, "Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag.removeprefix("W/") in tags
+
+
+def content_disposition(filename: str, inline: bool) -> str:
+    kind = "inline" if inline else "attachment"
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "") or "download"
+    return f"{kind}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class FileRangeResponse(Response):
+    """Bytes [start, end] of a file, sent zero-copy when the ASGI server supports it."""
+
+    def __init__(self, path: str, start: int, end: int, size: int, status_code: int = 200,
+                 headers: Optional[dict] = None, media_type: Optional[str] = None):
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.size = size
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        length = self.end - self.start + 1
+        extensions = scope.get("extensions", {}) or {}
+        if scope.get("method") == "HEAD" or length <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if "http.response.pathsend" in extensions and self.start == 0 and length == self.size:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": self.start, "count": length})
+                return
+            fd = f.fileno()
+            offset, remaining = self.start, length
+            while remaining:
+                block = await anyio.to_thread.run_sync(_pread, fd, min(STREAM_BLOCK, remaining), offset)
+                if not block:
+                    break  # file shrank underneath us; the client sees a short body
+                offset += len(block)
+                remaining -= len(block)
+                await send({"type": "http.response.body", "body": block, "more_body": remaining > 0})
+        if remaining:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def serve_file(request: Request, path: str, etag: str, media_type: Optional[str] = None,
+               filename: Optional[str] = None, inline: bool = True,
+               last_modified: Optional[datetime] = None, cache_control: Optional[str] = None) -> Response:
+    """304 / 206 / 200 for a file on disk, with validators and cache headers."""
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        raise HTTPException(404, "File content is missing") from None
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control or f"private, max-age={DOWNLOAD_MAX_AGE}",
+    }
+    if last_modified:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename, inline)
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size - 1, size, 200, headers, media_type)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return FileRangeResponse(path, start, end, size, 206, headers, media_type)
+
+
+def file_etag(*parts: object) -> str:
+    """Strong ETag from stable identifiers (e.g. path + size + mtime)."""
+    return '"' + hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:32] + '"'
+
+
+def list_artifacts(directory: str) -> List[str]:
+    try:
+        return sorted(name for name in os.listdir(directory) if not name.startswith("."))
+    except FileNotFoundError:
+        return []
@@ -1,35 +1,22 @@
-import os
 import time
-from typing import Optional
 
-try:
-    from google import genai
-    from google.cloud import texttospeech
-    from google.auth import default
-except Exception:
-    genai = None
-    texttospeech = None
-    default = None
+from client_registry import get_client, reporting, texttospeech
 
 
 def _make_gemini_client():
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not genai or not api_key:
-        raise RuntimeError("Gemini client not available (missing SDK or GEMINI_API_KEY).")
-    return genai.Client(api_key=api_key)
+    """Shared Gemini client (built once per process by the client registry)."""
+    return get_client("gemini")
 
 
 def _make_tts_client():
-    if not texttospeech or not default:
-        raise RuntimeError("Google TTS not available (missing SDK).")
-    creds, _ = default()
-    return texttospeech.TextToSpeechClient(credentials=creds)
+    return get_client("google_tts")
 
 
 def generate_text(prompt: str):
     start = time.time()
     client = _make_gemini_client()
-    response = client.models.generate_content(model="models/gemini-2.5-pro", contents=prompt)
+    with reporting("gemini", client):
+        response = client.models.generate_content(model="models/gemini-2.5-pro", contents=prompt)
     text = getattr(response, "text", "")
     return {"engine": "Gemini", "text": text, "latency": round(time.time() - start, 2), "confidence": 0.9}
 
@@ -37,7 +24,8 @@ def generate_text(prompt: str):
 def generate_image(prompt: str, out_path: str = "output_image.png"):
     start = time.time()
     client = _make_gemini_client()
-    response = client.models.generate_images(model="models/imagen-4.0-ultra-generate-001", prompt=prompt)
+    with reporting("gemini", client):
+        response = client.models.generate_images(model="models/imagen-4.0-ultra-generate-001", prompt=prompt)
     image_bytes = response.generated_images[0].image.image_bytes
     with open(out_path, "wb") as f:
         f.write(image_bytes)
@@ -47,7 +35,8 @@ def generate_image(prompt: str, out_path: str = "output_image.png"):
 def generate_video(prompt: str, out_path: str = "output_video.mp4"):
     start = time.time()
     client = _make_gemini_client()
-    operation = client.models.generate_videos(model="models/veo-3.1-generate-preview", prompt=prompt)
+    with reporting("gemini", client):
+        operation = client.models.generate_videos(model="models/veo-3.1-generate-preview", prompt=prompt)
     result = operation.result()
     video_bytes = result.videos[0].video_bytes
     with open(out_path, "wb") as f:
@@ -61,7 +50,8 @@ def generate_audio(prompt: str, out_path: str = "output_audio.mp3"):
     synthesis_input = texttospeech.SynthesisInput(text=prompt)
     voice = texttospeech.VoiceSelectionParams(language_code="en-US", name="en-US-Studio-O")
     audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
-    response = tts.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
+    with reporting("google_tts", tts):
+        response = tts.synthesize_speech(input=synthesis_input, voice=voice, audio_config=audio_config)
     with open(out_path, "wb") as out:
         out.write(response.audio_content)
     return {"engine": "Gemini", "path": out_path, "latency": round(time.time() - start, 2), "confidence": 0.9}
@@ -70,7 +60,8 @@ def generate_audio(prompt: str, out_path: str = "output_audio.mp3"):
 def generate_embedding(prompt: str):
     start = time.time()
     client = _make_gemini_client()
-    embedding = client.models.embed_content(model="models/text-embedding-004", contents=prompt)
+    with reporting("gemini", client):
+        embedding = client.models.embed_content(model="models/text-embedding-004", contents=prompt)
     vec = getattr(embedding, "embedding", None)
     length = len(vec.values) if vec and hasattr(vec, "values") else None
     return {"engine": "Gemini", "embedding_length": length, "latency": round(time.time() - start, 2), "confidence": 0.9}
@@ -1,2 +1,76 @@
+"""Image helpers for the document pipeline: metadata, previews and optional OCR.
+
+Everything here runs inside pipeline worker processes. OCR needs both the
+``pytesseract`` package and the ``tesseract`` binary; without them images and
+scanned pages are still processed, just without recognised text.
+"""
 import os
-# ... existing code ...
+from typing import Any, Dict, Optional
+
+from PIL import ExifTags, Image
+
+try:
+    import pytesseract
+except Exception:  # pytesseract is optional
+    pytesseract = None
+
+OCR_LANG = os.getenv("FRANKLIN_OCR_LANG", "eng")
+PREVIEW_MAX_SIDE = int(os.getenv("FRANKLIN_PREVIEW_MAX_SIDE", "1600"))
+EXIF_FIELDS = ("Make", "Model", "DateTimeOriginal", "Orientation", "Software")
+
+_ocr_ready: Optional[bool] = None
+
+
+def ocr_available() -> bool:
+    global _ocr_ready
+    if _ocr_ready is None:
+        try:
+            _ocr_ready = pytesseract is not None and bool(pytesseract.get_tesseract_version())
+        except Exception:
+            _ocr_ready = False
+    return _ocr_ready
+
+
+def image_metadata(img: Image.Image) -> Dict[str, Any]:
+    meta: Dict[str, Any] = {"format": img.format, "mode": img.mode, "width": img.width, "height": img.height}
+    try:
+        exif = img.getexif()
+    except Exception:
+        exif = {}
+    names = {ExifTags.TAGS.get(tag, tag): value for tag, value in exif.items()}
+    meta.update({k: str(names[k]) for k in EXIF_FIELDS if k in names})
+    return meta
+
+
+def save_preview(img: Image.Image, dest: str, max_side: int = PREVIEW_MAX_SIDE) -> str:
+    """Write a downscaled PNG next to the other artifacts; returns its path."""
+    preview = img.copy()
+    preview.thumbnail((max_side, max_side))
+    if preview.mode not in ("RGB", "RGBA", "L"):
+        preview = preview.convert("RGB")
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    preview.save(dest, format="PNG", optimize=True)
+    return dest
+
+
+def ocr_image(img: Image.Image, lang: str = OCR_LANG) -> Optional[str]:
+    if not ocr_available():
+        return None
+    return pytesseract.image_to_string(img, lang=lang)
+
+
+def extract_image(path: str, artifact_dir: str, ocr: bool = True) -> Dict[str, Any]:
+    """Metadata, preview and (when available) OCR text for one image file."""
+    with Image.open(path) as img:
+        img.load()
+        meta = image_metadata(img)
+        preview = save_preview(img, os.path.join(artifact_dir, "image.png"))
+        text = ocr_image(img) if ocr else None
+    return {
+        "page": 1,
+        "text": text or "",
+        "chars": len(text or ""),
+        "image": preview,
+        "ocr": text is not None,
+        "metadata": meta,
+    }
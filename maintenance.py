@@ -0,0 +1,238 @@
+"""Background TTL sweeper and compaction for expiring tables.
+
+Each run:
+ - deletes rows whose ``expires_at`` has passed, ``batch_size`` ids at a time
+   so no single statement holds the write lock for long
+ - evicts rows over optional row/byte caps, least-frequently (``lfu``) or
+   least-recently (``lru``) used first
+ - reports the deleted rows to the target's ``on_delete`` callback (e.g. cache
+   invalidation) once the delete has committed
+ - refreshes planner statistics after deletions and VACUUMs on a slower cadence
+ - runs any registered hooks (e.g. audit partition rollover) and records their results
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, select, text
+
+MAINTENANCE_INTERVAL = float(os.getenv("FRANKLIN_MAINTENANCE_SECONDS", "300"))
+SWEEP_BATCH_SIZE = int(os.getenv("FRANKLIN_SWEEP_BATCH", "500"))
+SWEEP_PAUSE = float(os.getenv("FRANKLIN_SWEEP_PAUSE_SECONDS", "0.05"))
+VACUUM_INTERVAL = float(os.getenv("FRANKLIN_VACUUM_HOURS", "24")) * 3600
+EVICTION_POLICY = os.getenv("FRANKLIN_EVICTION_POLICY", "lfu")  # lfu | lru
+
+
+class SweepTarget:
+    """A table with an ``expires_at`` column and optional size caps."""
+
+    def __init__(self, table, count_column: str, last_used_column: str,
+                 size_columns: List[str], max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None, notify_columns: Sequence[str] = (),
+                 on_delete: Optional[Callable[[List[tuple]], None]] = None):
+        self.table = table
+        self.count_column = table.c[count_column]
+        self.last_used_column = table.c[last_used_column]
+        self.size_columns = [table.c[c] for c in size_columns]
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.notify_columns = [table.c[c] for c in notify_columns]
+        self.on_delete = on_delete
+
+    @property
+    def name(self) -> str:
+        return self.table.name
+
+    def eviction_order(self, policy: str):
+        if policy == "lru":
+            return [self.last_used_column.asc(), self.table.c.id.asc()]
+        return [self.count_column.asc(), self.last_used_column.asc(), self.table.c.id.asc()]
+
+    def row_size(self):
+        return sum(func.coalesce(func.length(c), 0) for c in self.size_columns)
+
+
+class MaintenanceJob:
+    def __init__(self, engine, targets: List[SweepTarget], interval: float = MAINTENANCE_INTERVAL,
+                 batch_size: int = SWEEP_BATCH_SIZE, policy: str = EVICTION_POLICY,
+                 vacuum_interval: float = VACUUM_INTERVAL,
+                 hooks: Optional[Dict[str, Callable[[], object]]] = None):
+        self.engine = engine
+        self.hooks = dict(hooks or {})
+        self.targets = targets
+        self.interval = interval
+        self.batch_size = batch_size
+        self.policy = policy
+        self.vacuum_interval = vacuum_interval
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._deleted_since_vacuum = 0
+        self._last_vacuum = time.monotonic()
+        self.metrics: Dict[str, object] = {
+            "runs": 0,
+            "errors": 0,
+            "expired_deleted": {t.name: 0 for t in targets},
+            "evicted": {t.name: 0 for t in targets},
+            "analyze_runs": 0,
+            "vacuum_runs": 0,
+            "last_run_at": None,
+            "last_run_ms": None,
+            "last_error": None,
+            "hooks": {},
+        }
+
+    # -- deletion -------------------------------------------------------
+    def _delete_ids(self, target: SweepTarget, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        t = target.table
+        stmt = delete(t).where(t.c.id.in_(ids))
+        with self.engine.begin() as conn:
+            if not target.on_delete:
+                return conn.execute(stmt).rowcount or 0
+            if self.engine.dialect.delete_returning:
+                rows = conn.execute(stmt.returning(*target.notify_columns)).all()
+            else:
+                rows = conn.execute(select(*target.notify_columns).where(t.c.id.in_(ids))).all()
+                conn.execute(stmt)
+        target.on_delete([tuple(r) for r in rows])
+        return len(rows)
+
+    def sweep_expired(self, target: SweepTarget) -> int:
+        t = target.table
+        deleted = 0
+        while not self._stop.is_set():
+            now = datetime.now(timezone.utc)
+            with self.engine.connect() as conn:
+                ids = conn.execute(
+                    select(t.c.id).where(t.c.expires_at.is_not(None)).where(t.c.expires_at < now).limit(self.batch_size)
+                ).scalars().all()
+            deleted += self._delete_ids(target, ids)
+            if len(ids) < self.batch_size:
+                break
+            time.sleep(SWEEP_PAUSE)
+        return deleted
+
+    def enforce_caps(self, target: SweepTarget) -> int:
+        t = target.table
+        evicted = 0
+        order = target.eviction_order(self.policy)
+
+        if target.max_rows is not None:
+            with self.engine.connect() as conn:
+                excess = conn.execute(select(func.count()).select_from(t)).scalar_one() - target.max_rows
+            while excess > 0 and not self._stop.is_set():
+                with self.engine.connect() as conn:
+                    ids = conn.execute(select(t.c.id).order_by(*order).limit(min(excess, self.batch_size))).scalars().all()
+                if not ids:
+                    break
+                removed = self._delete_ids(target, ids)
+                evicted += removed
+                excess -= removed
+                time.sleep(SWEEP_PAUSE)
+
+        if target.max_bytes is not None:
+            with self.engine.connect() as conn:
+                excess = (conn.execute(select(func.coalesce(func.sum(target.row_size()), 0))).scalar_one()
+                          - target.max_bytes)
+            while excess > 0 and not self._stop.is_set():
+                with self.engine.connect() as conn:
+                    rows = conn.execute(
+                        select(t.c.id, target.row_size().label("size")).order_by(*order).limit(self.batch_size)
+                    ).all()
+                if not rows:
+                    break
+                ids = []
+                for row_id, size in rows:
+                    ids.append(row_id)
+                    excess -= size or 0
+                    if excess <= 0:
+                        break
+                evicted += self._delete_ids(target, ids)
+                time.sleep(SWEEP_PAUSE)
+
+        return evicted
+
+    # -- compaction -----------------------------------------------------
+    def _autocommit(self, statements: List[str]):
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for stmt in statements:
+                conn.execute(text(stmt))
+
+    def compact(self, force_vacuum: bool = False):
+        names = [t.name for t in self.targets]
+        if self.engine.dialect.name == "sqlite":
+            self._autocommit(["ANALYZE"])
+        else:
+            self._autocommit([f"ANALYZE {n}" for n in names])
+        self.metrics["analyze_runs"] += 1
+
+        due = time.monotonic() - self._last_vacuum >= self.vacuum_interval
+        if force_vacuum or (due and self._deleted_since_vacuum):
+            if self.engine.dialect.name == "sqlite":
+                self._autocommit(["VACUUM"])
+            else:
+                self._autocommit([f"VACUUM {n}" for n in names])
+            self.metrics["vacuum_runs"] += 1
+            self._last_vacuum = time.monotonic()
+            self._deleted_since_vacuum = 0
+
+    # -- scheduling -----------------------------------------------------
+    def run_once(self, force_vacuum: bool = False) -> Dict[str, object]:
+        with self._run_lock:
+            started = time.monotonic()
+            removed = 0
+            try:
+                for target in self.targets:
+                    expired = self.sweep_expired(target)
+                    evicted = self.enforce_caps(target)
+                    self.metrics["expired_deleted"][target.name] += expired
+                    self.metrics["evicted"][target.name] += evicted
+                    removed += expired + evicted
+                self._deleted_since_vacuum += removed
+                if removed or force_vacuum:
+                    self.compact(force_vacuum=force_vacuum)
+            except Exception as ex:
+                self.metrics["errors"] += 1
+                self.metrics["last_error"] = str(ex)
+                print(f"Maintenance run failed: {ex}")
+            for name, hook in self.hooks.items():
+                try:
+                    self.metrics["hooks"][name] = hook()
+                except Exception as ex:
+                    self.metrics["errors"] += 1
+                    self.metrics["last_error"] = f"{name}: {ex}"
+                    print(f"Maintenance hook {name} failed: {ex}")
+            self.metrics["runs"] += 1
+            self.metrics["last_run_at"] = datetime.now(timezone.utc).isoformat()
+            self.metrics["last_run_ms"] = round((time.monotonic() - started) * 1000, 1)
+            return {"removed": removed, **self.stats()}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            **self.metrics,
+            "expired_deleted": dict(self.metrics["expired_deleted"]),
+            "evicted": dict(self.metrics["evicted"]),
+            "hooks": dict(self.metrics["hooks"]),
+            "policy": self.policy,
+            "interval_seconds": self.interval,
+        }
@@ -0,0 +1,274 @@
+"""Marketplace search over bid requests and incrementally maintained bid statistics.
+
+Search follows ``memory_search``: an FTS5 external-content table with triggers
+on SQLite, a generated ``tsvector`` column with a GIN index on Postgres.
+
+Bid statistics live in one row per request that ``submit_bid``/``accept_bid``
+update in the same transaction as the bid itself, so reads never scan bids.
+The row keeps the sorted list of prices, which makes the median exact
+without going back to the bid table. Updates are version-checked
+(``fold_bid_stats``) because SQLite ignores ``SELECT ... FOR UPDATE``; a
+writer that loses the race rolls back and retries.
+"""
+import bisect
+import json
+import os
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import DateTime, bindparam, insert, select, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from memory_search import SearchUnavailable, ensure_fts5_index, fts5_query
+from timeutil import as_utc
+
+REQUEST_TABLE = "bidrequest"
+SEARCH_COLUMNS = ("title", "description")
+# bm25 column weights: a title match outranks a description match
+BM25_WEIGHTS = (2.0, 1.0)
+# Attempts at a version-checked stats update before the bid is refused with 503
+BID_STATS_RETRIES = int(os.getenv("FRANKLIN_BID_STATS_RETRIES", "8"))
+
+
+def _median(prices: List[float]) -> Optional[float]:
+    n = len(prices)
+    if not n:
+        return None
+    mid = n // 2
+    return prices[mid] if n % 2 else (prices[mid - 1] + prices[mid]) / 2
+
+
+# -- bid statistics -----------------------------------------------------
+def record_bid(stats, price: float, bid_at: datetime, request_created_at: datetime):
+    """Fold one new bid into a stats row (any object with the BidStats attributes)."""
+    prices = json.loads(stats.prices or "[]")
+    bisect.insort(prices, price)
+    stats.prices = json.dumps(prices)
+    stats.bid_count = len(prices)
+    stats.price_sum = (stats.price_sum or 0.0) + price
+    stats.min_price = prices[0]
+    stats.max_price = prices[-1]
+    stats.median_price = _median(prices)
+    if stats.first_bid_at is None:
+        stats.first_bid_at = bid_at
+        stats.seconds_to_first_bid = (as_utc(bid_at) - as_utc(request_created_at)).total_seconds()
+    stats.last_bid_at = bid_at
+    stats.updated_at = datetime.now(timezone.utc)
+
+
+def record_accept(stats, bid_id: int, price: float, accepted_at: datetime):
+    stats.accepted_bid_id = bid_id
+    stats.accepted_price = price
+    stats.closed_at = accepted_at
+    stats.updated_at = datetime.now(timezone.utc)
+
+
+def fold_bid_stats(conn, stats_table, request_id: int, fold: Callable[[Any], None]) -> bool:
+    """Apply ``fold`` to a request's stats row with a compare-and-set on ``version``.
+
+    Runs inside the caller's transaction. Returns False when another writer
+    got there first; the caller must roll back and try again.
+    """
+    row = conn.execute(
+        select(stats_table).where(stats_table.c.request_id == request_id).with_for_update()
+    ).mappings().first()
+    if row is None:
+        stats = SimpleNamespace(**{c.name: None for c in stats_table.columns})
+        stats.request_id, stats.bid_count, stats.price_sum, stats.version = request_id, 0, 0.0, 0
+        fold(stats)
+        try:
+            conn.execute(insert(stats_table).values(**vars(stats)))
+        except IntegrityError:
+            return False
+        return True
+
+    stats = SimpleNamespace(**row)
+    version = row["version"] or 0
+    fold(stats)
+    values = {k: v for k, v in vars(stats).items() if k != "request_id"}
+    values["version"] = version + 1
+    result = conn.execute(
+        update(stats_table)
+        .where(stats_table.c.request_id == request_id, stats_table.c.version == version)
+        .values(**values)
+    )
+    return result.rowcount == 1
+
+
+def stats_summary(stats) -> Dict[str, Any]:
+    bid_count = stats.bid_count or 0
+    return {
+        "request_id": stats.request_id,
+        "bid_count": bid_count,
+        "min_price": stats.min_price,
+        "median_price": stats.median_price,
+        "max_price": stats.max_price,
+        "mean_price": round(stats.price_sum / bid_count, 4) if bid_count else None,
+        "first_bid_at": as_utc(stats.first_bid_at),
+        "last_bid_at": as_utc(stats.last_bid_at),
+        "seconds_to_first_bid": stats.seconds_to_first_bid,
+        "accepted_bid_id": stats.accepted_bid_id,
+        "accepted_price": stats.accepted_price,
+        "closed_at": as_utc(stats.closed_at),
+    }
+
+
+def backfill_bid_stats(engine, stats_table, request_table, bid_table) -> int:
+    """One-off: build stats rows for requests created before the table existed."""
+    with engine.connect() as conn:
+        missing = conn.execute(
+            select(request_table.c.id, request_table.c.created_at)
+            .where(~request_table.c.id.in_(select(stats_table.c.request_id)))
+        ).all()
+    if not missing:
+        return 0
+
+    rows = []
+    with engine.connect() as conn:
+        for request_id, created_at in missing:
+            row = SimpleNamespace(**{c.name: None for c in stats_table.columns})
+            row.request_id, row.bid_count, row.price_sum, row.version = request_id, 0, 0.0, 0
+            bids = conn.execute(
+                select(bid_table.c.id, bid_table.c.price, bid_table.c.accepted, bid_table.c.created_at)
+                .where(bid_table.c.request_id == request_id)
+                .order_by(bid_table.c.created_at, bid_table.c.id)
+            ).all()
+            for bid_id, price, accepted, bid_at in bids:
+                record_bid(row, price, bid_at, created_at)
+                if accepted:
+                    record_accept(row, bid_id, price, bid_at)
+            row.updated_at = datetime.now(timezone.utc)
+            rows.append(vars(row))
+    with engine.begin() as conn:
+        conn.execute(insert(stats_table), rows)
+    return len(rows)
+
+
+# -- search -------------------------------------------------------------
+class RequestSearchIndex:
+    def __init__(self, engine, table: str = REQUEST_TABLE, stats_table: str = "bidstats"):
+        self.engine = engine
+        self.table = table
+        self.stats_table = stats_table
+        self.fts_table = f"{table}_fts"
+        self.dialect = engine.dialect.name
+        self.available = False
+
+    def ensure(self):
+        """Create the index (and back-fill it) if it does not exist yet."""
+        try:
+            if self.dialect == "sqlite":
+                self._ensure_sqlite()
+            elif self.dialect == "postgresql":
+                self._ensure_postgres()
+            else:
+                return
+            self.available = True
+        except OperationalError as ex:
+            print(f"Request search index unavailable: {ex}")
+
+    def _ensure_sqlite(self):
+        ensure_fts5_index(self.engine, self.table, self.fts_table, SEARCH_COLUMNS)
+
+    def _ensure_postgres(self):
+        t = self.table
+        # setweight: title terms rank above description terms
+        document = (
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+        )
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {t} ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+                f"GENERATED ALWAYS AS ({document}) STORED"
+            ))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{t}_search_tsv ON {t} USING GIN (search_tsv)"))
+
+    def search(self, query: str, open_only: bool = True, client_id: Optional[int] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None,
+               min_bids: Optional[int] = None, max_price: Optional[float] = None,
+               limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Ranked matching requests with their bid statistics, best first.
+
+        ``max_price`` keeps requests whose lowest bid is at or under it (or that
+        have no bids yet).
+        """
+        if not self.available:
+            raise SearchUnavailable("Full-text search is not available on this database")
+
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        filters = []
+        if open_only:
+            filters.append("r.open = :open")
+            params["open"] = True
+        if client_id is not None:
+            filters.append("r.client_id = :client_id")
+            params["client_id"] = client_id
+        if since:
+            filters.append("r.created_at >= :since")
+            params["since"] = since
+        if until:
+            filters.append("r.created_at < :until")
+            params["until"] = until
+        if min_bids:
+            filters.append("coalesce(s.bid_count, 0) >= :min_bids")
+            params["min_bids"] = min_bids
+        if max_price is not None:
+            filters.append("(s.min_price IS NULL OR s.min_price <= :max_price)")
+            params["max_price"] = max_price
+        where = "".join(f" AND {f}" for f in filters)
+        stats_cols = (
+            "s.bid_count, s.min_price, s.median_price, s.max_price, s.seconds_to_first_bid"
+        )
+
+        if self.dialect == "sqlite":
+            params["q"] = fts5_query(query)
+            if not params["q"]:
+                return []
+            weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+            sql = (
+                f"SELECT r.id, r.client_id, r.title, r.open, r.created_at, {stats_cols}, "
+                f"bm25({self.fts_table}, {weights}) AS score, "
+                f"snippet({self.fts_table}, 1, '[', ']', '...', 16) AS snippet "
+                f"FROM {self.fts_table} JOIN {self.table} r ON r.id = {self.fts_table}.rowid "
+                f"LEFT JOIN {self.stats_table} s ON s.request_id = r.id "
+                f"WHERE {self.fts_table} MATCH :q{where} "
+                f"ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+        else:
+            params["q"] = query
+            sql = (
+                f"SELECT r.id, r.client_id, r.title, r.open, r.created_at, {stats_cols}, "
+                f"-ts_rank_cd(r.search_tsv, q) AS score, "
+                f"ts_headline('english', r.description, q, 'StartSel=[, StopSel=], MaxWords=24') AS snippet "
+                f"FROM {self.table} r CROSS JOIN websearch_to_tsquery('english', :q) q "
+                f"LEFT JOIN {self.stats_table} s ON s.request_id = r.id "
+                f"WHERE r.search_tsv @@ q{where} "
+                f"ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+
+        stmt = text(sql).bindparams(
+            *(bindparam(name, type_=DateTime()) for name in ("since", "until") if name in params)
+        ).columns(created_at=DateTime)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt, params).mappings().all()
+        return [
+            {
+                "id": r["id"],
+                "client_id": r["client_id"],
+                "title": r["title"],
+                "open": bool(r["open"]),
+                "created_at": as_utc(r["created_at"]),
+                "score": round(-float(r["score"]), 6),
+                "snippet": r["snippet"],
+                "bids": {
+                    "count": r["bid_count"] or 0,
+                    "min_price": r["min_price"],
+                    "median_price": r["median_price"],
+                    "max_price": r["max_price"],
+                    "seconds_to_first_bid": r["seconds_to_first_bid"],
+                },
+            }
+            for r in rows
+        ]
@@ -0,0 +1,173 @@
+"""Keyword search over cognitive memory values, context and metadata.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers, ranked
+with ``bm25()``. Postgres uses a stored ``tsvector`` column with a GIN index,
+ranked with ``ts_rank_cd`` (cover density; Postgres has no built-in BM25).
+Either way inserts, updates, bulk imports and sweeper deletes are indexed
+without any extra application code.
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import OperationalError
+
+MEMORY_TABLE = "cognitivememory"
+SEARCH_COLUMNS = ("memory_value", "context", "meta_data")
+# bm25 column weights: value matches outrank context, context outranks metadata
+BM25_WEIGHTS = (1.0, 0.6, 0.3)
+
+_TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+
+
+class SearchUnavailable(RuntimeError):
+    """Raised when the database has no usable full-text engine."""
+
+
+def fts5_query(query: str) -> str:
+    """Turn free text into a safe FTS5 MATCH expression (AND of quoted terms, ``term*`` = prefix)."""
+    terms = []
+    for token in _TOKEN_RE.findall(query):
+        prefix = token.endswith("*")
+        word = token.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+def ensure_fts5_index(engine, table: str, fts_table: str, columns: Sequence[str]):
+    """Create an external-content FTS5 table over ``columns`` of ``table`` plus its sync triggers.
+
+    The index is back-filled with ``rebuild`` the first time it is created.
+    """
+    t, f = table, fts_table
+    cols = ", ".join(columns)
+    new_cols = ", ".join(f"new.{c}" for c in columns)
+    old_cols = ", ".join(f"old.{c}" for c in columns)
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": f}
+        ).first()
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {f} USING fts5("
+            f"{cols}, content='{t}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {f}_ai AFTER INSERT ON {t} BEGIN "
+            f"INSERT INTO {f}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {f}_ad AFTER DELETE ON {t} BEGIN "
+            f"INSERT INTO {f}({f}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {f}_au AFTER UPDATE OF {cols} ON {t} BEGIN "
+            f"INSERT INTO {f}({f}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {f}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        ))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {f}({f}) VALUES ('rebuild')"))
+
+
+class MemorySearchIndex:
+    def __init__(self, engine, table: str = MEMORY_TABLE):
+        self.engine = engine
+        self.table = table
+        self.fts_table = f"{table}_fts"
+        self.dialect = engine.dialect.name
+        self.available = False
+
+    # -- schema ---------------------------------------------------------
+    def ensure(self):
+        """Create the index (and back-fill it) if it does not exist yet."""
+        try:
+            if self.dialect == "sqlite":
+                self._ensure_sqlite()
+            elif self.dialect == "postgresql":
+                self._ensure_postgres()
+            else:
+                return
+            self.available = True
+        except OperationalError as ex:
+            # e.g. SQLite compiled without FTS5
+            print(f"Memory search index unavailable: {ex}")
+
+    def _ensure_sqlite(self):
+        ensure_fts5_index(self.engine, self.table, self.fts_table, SEARCH_COLUMNS)
+
+    def _ensure_postgres(self):
+        t = self.table
+        document = " || ' ' || ".join(f"coalesce({c}, '')" for c in SEARCH_COLUMNS)
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {t} ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+                f"GENERATED ALWAYS AS (to_tsvector('english', {document})) STORED"
+            ))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{t}_search_tsv ON {t} USING GIN (search_tsv)"))
+
+    # -- queries --------------------------------------------------------
+    def search(self, query: str, memory_type: Optional[str] = None, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, now: Optional[datetime] = None,
+               limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """Ranked matches, best first. ``now`` hides rows whose ``expires_at`` has passed."""
+        if not self.available:
+            raise SearchUnavailable("Full-text search is not available on this database")
+
+        params: Dict[str, Any] = {"limit": limit, "offset": offset}
+        filters = []
+        if memory_type:
+            filters.append("m.memory_type = :memory_type")
+            params["memory_type"] = memory_type
+        if since:
+            filters.append("m.created_at >= :since")
+            params["since"] = since
+        if until:
+            filters.append("m.created_at < :until")
+            params["until"] = until
+        if now:
+            filters.append("(m.expires_at IS NULL OR m.expires_at > :now)")
+            params["now"] = now
+        where = "".join(f" AND {f}" for f in filters)
+
+        if self.dialect == "sqlite":
+            params["q"] = fts5_query(query)
+            if not params["q"]:
+                return []
+            weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+            sql = (
+                f"SELECT m.id, m.memory_key, m.memory_type, m.created_at, "
+                f"bm25({self.fts_table}, {weights}) AS score, "
+                f"snippet({self.fts_table}, -1, '[', ']', '...', 12) AS snippet "
+                f"FROM {self.fts_table} JOIN {self.table} m ON m.id = {self.fts_table}.rowid "
+                f"WHERE {self.fts_table} MATCH :q{where} "
+                f"ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+        else:
+            params["q"] = query
+            sql = (
+                f"SELECT m.id, m.memory_key, m.memory_type, m.created_at, "
+                f"-ts_rank_cd(m.search_tsv, q) AS score, "
+                f"ts_headline('english', m.memory_value, q, 'StartSel=[, StopSel=], MaxWords=24') AS snippet "
+                f"FROM {self.table} m, websearch_to_tsquery('english', :q) q "
+                f"WHERE m.search_tsv @@ q{where} "
+                f"ORDER BY score LIMIT :limit OFFSET :offset"
+            )
+
+        stmt = text(sql).bindparams(
+            *(bindparam(name, type_=DateTime()) for name in ("since", "until", "now") if name in params)
+        ).columns(created_at=DateTime)
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt, params).mappings().all()
+        # Lower bm25 is better; flip the sign so callers see "higher is better" on both engines
+        return [
+            {
+                "id": r["id"],
+                "key": r["memory_key"],
+                "type": r["memory_type"],
+                "created_at": r["created_at"],
+                "score": round(-float(r["score"]), 6),
+                "snippet": r["snippet"],
+            }
+            for r in rows
+        ]
@@ -0,0 +1,64 @@
+"""Newline-delimited JSON helpers for streaming request and response bodies."""
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, Iterator, Tuple
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class LineTooLong(ValueError):
+    """A single NDJSON line is larger than ``MAX_LINE_BYTES``."""
+
+    def __init__(self, line_no: int, limit: int):
+        super().__init__(f"NDJSON line {line_no} exceeds {limit} bytes")
+        self.line_no = line_no
+
+
+def _default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_line(obj: Any) -> bytes:
+    """Serialise one record as a single NDJSON line."""
+    return (json.dumps(obj, ensure_ascii=False, default=_default) + "\n").encode("utf-8")
+
+
+def iter_lines(records: Iterable[Any]) -> Iterator[bytes]:
+    """Serialise records lazily, one NDJSON line each."""
+    for record in records:
+        yield dumps_line(record)
+
+
+async def aiter_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any, str]]:
+    """Parse an async byte stream into ``(line_no, record, error)`` tuples.
+
+    Blank lines are skipped; a malformed line yields ``record=None`` and an
+    error message instead of aborting the whole stream. A line longer than
+    ``MAX_LINE_BYTES`` raises `LineTooLong`, since it cannot be skipped
+    without buffering it.
+    """
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            if len(raw) > MAX_LINE_BYTES:
+                raise LineTooLong(line_no, MAX_LINE_BYTES)
+            if raw.strip():
+                yield _parse(line_no, raw)
+        if len(buffer) > MAX_LINE_BYTES:
+            raise LineTooLong(line_no + 1, MAX_LINE_BYTES)
+    if buffer.strip():
+        yield _parse(line_no + 1, buffer)
+
+
+def _parse(line_no: int, raw: bytes) -> Tuple[int, Any, str]:
+    try:
+        return line_no, json.loads(raw), ""
+    except ValueError as ex:
+        return line_no, None, f"invalid JSON: {ex}"
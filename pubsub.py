@@ -0,0 +1,90 @@
+"""Lightweight pub/sub for cross-worker notifications.
+
+Uses Redis channels when ``REDIS_URL`` is set and reachable; otherwise falls
+back to an in-process bus so single-worker deployments (and tests) behave the
+same way without Redis.
+"""
+import os
+import threading
+import uuid
+from typing import Callable, Dict, List
+
+try:
+    import redis
+except Exception:  # redis-py is optional
+    redis = None
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+Handler = Callable[[str], None]
+
+
+class LocalBus:
+    """In-process stand-in: delivers synchronously to local subscribers."""
+
+    backend = "local"
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel: str, handler: Handler):
+        with self._lock:
+            self._handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel: str, message: str):
+        with self._lock:
+            handlers = list(self._handlers.get(channel, []))
+        for handler in handlers:
+            handler(message)
+
+
+class RedisBus:
+    """Redis-backed bus; a daemon thread fans incoming messages out to handlers.
+
+    Each process tags what it publishes with an origin id so its own messages
+    are not handled twice (local handlers already ran synchronously).
+    """
+
+    backend = "redis"
+
+    def __init__(self, client):
+        self._client = client
+        self._origin = uuid.uuid4().hex
+        self._local = LocalBus()
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._thread = None
+
+    def subscribe(self, channel: str, handler: Handler):
+        self._local.subscribe(channel, handler)
+        self._pubsub.subscribe(**{channel: self._dispatch})
+        if self._thread is None:
+            self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _dispatch(self, msg):
+        data = msg.get("data")
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        origin, _, message = (data or "").partition("|")
+        if origin != self._origin:
+            channel = msg["channel"].decode("utf-8") if isinstance(msg["channel"], bytes) else msg["channel"]
+            self._local.publish(channel, message)
+
+    def publish(self, channel: str, message: str):
+        self._local.publish(channel, message)
+        try:
+            self._client.publish(channel, f"{self._origin}|{message}")
+        except Exception as ex:
+            print(f"[Redis] Publish failed on {channel}: {ex}")
+
+
+def make_bus():
+    if redis and REDIS_URL:
+        try:
+            client = redis.from_url(REDIS_URL, socket_connect_timeout=2)
+            client.ping()
+            print(f"[Redis] Connected to {REDIS_URL.split('@')[-1]}")
+            return RedisBus(client)
+        except Exception as ex:
+            print(f"[Redis] Connection failed: {ex}. Using in-memory storage.")
+    return LocalBus()
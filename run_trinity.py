@@ -2,40 +2,268 @@
 Small runner for Trinity unified orchestrator.
 Usage:
     python run_trinity.py --prompt "Tell me a story" [--dry-run] [--max-tokens 200] [--report report.json]
+                          [--mode sequential|race|staggered]
+    python run_trinity.py --input prompts.jsonl [--concurrency 4] [--report prompts.report.ndjson]
+                          [--dry-run] [--retry-failed] [--fresh] [--mode ...]
 
 Dry-run will only classify and show routing order without calling APIs.
+
+Batch mode reads one prompt per line, either a JSON string or an object with
+"prompt" and an optional "id" (the line number otherwise). Up to
+--concurrency prompts run at once in one process, so SDK clients are built
+once. Each result is appended to the NDJSON report as soon as it finishes;
+rerunning the same command skips every id already in the report (add
+--retry-failed to run failures again, --fresh to start over). The summary at
+the end covers the whole report: latency percentiles and per-engine success
+rates, or the routing breakdown for a dry run.
 """
 import argparse
+import asyncio
 import json
-from trinity_orchestrator_unified import classify_prompt, trinity_engine
-
-p = argparse.ArgumentParser()
-p.add_argument("--prompt", "-p", type=str, required=True)
-p.add_argument("--dry-run", action="store_true")
-p.add_argument("--max-tokens", type=int, default=600)
-p.add_argument("--report", type=str, default="trinity_run_report.json")
-args = p.parse_args()
-
-report = {"prompt": args.prompt, "dry_run": args.dry_run, "results": [], "timestamp": __import__('time').strftime('%Y-%m-%d %H:%M:%S')}
-
-if args.dry_run:
-    primary = classify_prompt(args.prompt)
-    ordered = [primary] + [e for e in ["Gemini","OpenAI","Anthropic"] if e != primary]
-    print("Dry run routing order:", ordered)
-    report["ordered"] = ordered
-    with open(args.report, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
-    print(f"Report written to {args.report}")
-else:
+import os
+import sys
+import time
+from collections import Counter
+
+from trinity_orchestrator_unified import (MODES, AllEnginesFailed, classify_prompt_scores, latency_report,
+                                          routing_order, trinity_engine, trinity_engine_async)
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def read_prompts(path: str):
+    """Yield (id, line number, prompt) for every usable line of a JSONL prompt file."""
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ {path}:{n}: not JSON ({e.msg}); skipped", file=sys.stderr)
+                continue
+            if isinstance(item, str):
+                item = {"prompt": item}
+            prompt = item.get("prompt") if isinstance(item, dict) else None
+            if not isinstance(prompt, str) or not prompt.strip():
+                print(f"⚠️ {path}:{n}: no \"prompt\"; skipped", file=sys.stderr)
+                continue
+            yield str(item.get("id", n)), n, prompt
+
+
+def load_report(path: str) -> dict:
+    """Records already in an NDJSON report, latest per id.
+
+    A run killed mid-write can leave a torn last line (no trailing newline);
+    it is cut off here so the resumed run appends after the last complete
+    record. Any other line that is not a record is skipped with a warning and
+    left in place.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    end = 0
+    torn = False
+    with open(path, "rb") as f:
+        for n, raw in enumerate(f, 1):
+            if not raw.endswith(b"\n"):
+                torn = True  # only the last line can lack its newline
+                break
+            end += len(raw)
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                records[record["id"]] = record
+            except (ValueError, TypeError, KeyError):
+                print(f"⚠️ {path}:{n}: not a report record; skipped", file=sys.stderr)
+    if torn:
+        print(f"⚠️ {path}: dropping a partial record at byte {end}", file=sys.stderr)
+        with open(path, "r+b") as f:
+            f.truncate(end)
+    return records
+
+
+def percentile(xs, q: float):
+    return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else None
+
+
+def summarize(records: dict, dry_run: bool) -> dict:
+    rows = list(records.values())
+    if dry_run:
+        return {
+            "prompts": len(rows),
+            "primary": dict(Counter(r["ordered"][0] for r in rows if r["ordered"]).most_common()),
+            "keyword_route": dict(Counter(r["keyword_route"] for r in rows).most_common()),
+            "no_keyword": sum(1 for r in rows if not r["matches"]),
+        }
+    ok = [r for r in rows if r.get("ok")]
+    elapsed = sorted(r["elapsed"] for r in ok)
+    engines = {}
+    for r in rows:
+        for a in r.get("attempts", []):
+            if a.get("cancelled"):
+                continue
+            stats = engines.setdefault(a["engine"], {"attempts": 0, "successes": 0, "wins": 0})
+            stats["attempts"] += 1
+            stats["successes"] += a["ok"]
+        if r.get("ok"):
+            engines.setdefault(r["engine"], {"attempts": 0, "successes": 0, "wins": 0})["wins"] += 1
+    for stats in engines.values():
+        stats["success_rate"] = round(stats["successes"] / stats["attempts"], 3) if stats["attempts"] else None
+    return {
+        "prompts": len(rows),
+        "ok": len(ok),
+        "failed": len(rows) - len(ok),
+        "latency": {"mean": round(sum(elapsed) / len(elapsed), 3) if elapsed else None,
+                    **{f"p{int(q * 100)}": percentile(elapsed, q) for q in PERCENTILES}},
+        "engines": engines,
+    }
+
+
+def print_summary(summary: dict, dry_run: bool):
+    print("\n--- BATCH SUMMARY ---")
+    if dry_run:
+        print(f"Prompts: {summary['prompts']} | no keyword hit: {summary['no_keyword']}")
+        print("Primary engine:", ", ".join(f"{k} {v}" for k, v in summary["primary"].items()) or "-")
+        print("Keyword route: ", ", ".join(f"{k} {v}" for k, v in summary["keyword_route"].items()) or "-")
+        return
+    lat = summary["latency"]
+    print(f"Prompts: {summary['prompts']} | ok: {summary['ok']} | failed: {summary['failed']}")
+    print("Latency (s): " + " | ".join(f"{k} {v}" for k, v in lat.items()))
+    print(f"{'Engine':12s} {'attempts':>9s} {'ok':>6s} {'rate':>7s} {'wins':>6s}")
+    for engine, s in sorted(summary["engines"].items()):
+        rate = f"{s['success_rate']:.1%}" if s["success_rate"] is not None else "-"
+        print(f"{engine:12s} {s['attempts']:9d} {s['successes']:6d} {rate:>7s} {s['wins']:6d}")
+
+
+def dry_run_record(pid: str, line: int, prompt: str) -> dict:
+    route = classify_prompt_scores(prompt)
+    return {"id": pid, "line": line, "prompt": prompt, "dry_run": True,
+            "ordered": routing_order(prompt, explore=False), "keyword_route": route.route,
+            "scores": route.scores, "matches": route.matches}
+
+
+async def run_one(pid: str, line: int, prompt: str, args) -> dict:
+    record = {"id": pid, "line": line, "prompt": prompt, "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
     try:
-        res = trinity_engine(args.prompt, max_tokens=args.max_tokens)
-        print("--- FINAL OUTPUT ---")
-        print(f"Source: {res.get('engine')} | Latency: {res.get('latency')}s | Confidence: {res.get('confidence')}")
-        print(res.get('text'))
-        report["results"].append(res)
+        res = await trinity_engine_async(prompt, max_tokens=args.max_tokens, mode=args.mode)
+        record.update(res, ok=True)
+    except AllEnginesFailed as e:
+        record.update(ok=False, error=str(e), attempts=e.attempts)
     except Exception as e:
-        print("Engine error:", e)
-        report["error"] = str(e)
-    with open(args.report, "w", encoding="utf-8") as f:
+        record.update(ok=False, error=f"{type(e).__name__}: {e}", attempts=[])
+    return record
+
+
+async def run_batch(pending, report, args) -> int:
+    """Run ``pending`` with at most ``args.concurrency`` in flight, appending each result as it lands."""
+    running = set()
+    written = 0
+
+    def write(record: dict):
+        nonlocal written
+        report.write(json.dumps(record, ensure_ascii=False) + "\n")
+        report.flush()
+        written += 1
+        status = f"{record['engine']} {record['elapsed']}s" if record["ok"] else f"failed: {record['error'][:80]}"
+        print(f"[{written}/{len(pending)}] {record['id']}: {status}")
+
+    for item in pending:
+        if len(running) >= args.concurrency:
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                write(task.result())
+        running.add(asyncio.ensure_future(run_one(*item, args)))
+    for task in asyncio.as_completed(running):
+        write(await task)
+    return written
+
+
+def batch(args):
+    report_path = args.report or f"{os.path.splitext(args.input)[0]}.report.ndjson"
+    if args.fresh and os.path.exists(report_path):
+        os.remove(report_path)
+    done = load_report(report_path)
+    if done and any(r.get("dry_run", False) != args.dry_run for r in done.values()):
+        sys.exit(f"{report_path} holds {'dry-run' if not args.dry_run else 'live'} results; "
+                 "use --fresh or another --report")
+    prompts = list(read_prompts(args.input))
+    pending = [p for p in prompts
+               if p[0] not in done or (args.retry_failed and not done[p[0]].get("ok", True))]
+    print(f"{len(prompts)} prompts in {args.input}: {len(prompts) - len(pending)} already in {report_path}, "
+          f"{len(pending)} to run")
+
+    started = time.perf_counter()
+    with open(report_path, "a", encoding="utf-8") as report:
+        if args.dry_run:
+            for item in pending:
+                record = dry_run_record(*item)
+                report.write(json.dumps(record, ensure_ascii=False) + "\n")
+                done[record["id"]] = record
+        else:
+            try:
+                asyncio.run(run_batch(pending, report, args))
+            except KeyboardInterrupt:
+                print(f"\nInterrupted; rerun the same command to resume from {report_path}")
+                raise SystemExit(130)
+    wall = time.perf_counter() - started
+    if pending:
+        print(f"Ran {len(pending)} prompts in {wall:.1f}s ({len(pending) / wall:.2f}/s)")
+
+    ids = {p[0] for p in prompts}
+    records = {pid: r for pid, r in load_report(report_path).items() if pid in ids}
+    print_summary(summarize(records, args.dry_run), args.dry_run)
+    if not args.dry_run and pending:
+        print(f"Mode latency this run: {latency_report()[args.mode]}")
+    print(f"Report written to {report_path}")
+
+
+def single(args):
+    report_path = args.report or "trinity_run_report.json"
+    report = {"prompt": args.prompt, "dry_run": args.dry_run, "results": [], "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')}
+
+    if args.dry_run:
+        ordered = routing_order(args.prompt, explore=False)
+        print("Dry run routing order:", ordered)
+        report["ordered"] = ordered
+    else:
+        try:
+            res = trinity_engine(args.prompt, max_tokens=args.max_tokens, mode=args.mode)
+            print("--- FINAL OUTPUT ---")
+            print(f"Source: {res.get('engine')} | Latency: {res.get('latency')}s | Confidence: {res.get('confidence')}")
+            print(res.get('text'))
+            report["results"].append(res)
+        except Exception as e:
+            print("Engine error:", e)
+            report["error"] = str(e)
+        report["latency"] = latency_report()[args.mode]
+    with open(report_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
-    print(f"Report written to {args.report}")
+    print(f"Report written to {report_path}")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("--prompt", "-p", type=str)
+    source.add_argument("--input", "-i", type=str, help="JSONL file of prompts (batch mode)")
+    p.add_argument("--dry-run", action="store_true")
+    p.add_argument("--max-tokens", type=int, default=600)
+    p.add_argument("--report", type=str, default=None,
+                   help="trinity_run_report.json, or <input>.report.ndjson in batch mode")
+    p.add_argument("--mode", choices=MODES, default="sequential")
+    p.add_argument("--concurrency", "-c", type=int, default=4, help="Prompts in flight at once (batch mode)")
+    p.add_argument("--retry-failed", action="store_true", help="Run prompts whose earlier attempt failed again")
+    p.add_argument("--fresh", action="store_true", help="Discard an existing batch report instead of resuming")
+    args = p.parse_args()
+    args.concurrency = max(1, args.concurrency)
+    if args.input:
+        batch(args)
+    else:
+        single(args)
+
+
+if __name__ == "__main__":
+    main()
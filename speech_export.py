@@ -0,0 +1,266 @@
+"""Long-text speech synthesis for audio exports.
+
+Text is split on sentence boundaries into chunks that fit one Google
+Text-to-Speech request, the chunks are synthesized concurrently (at most
+``concurrency`` requests in flight, over one shared HTTP client) and the MP3
+segments are streamed back in order as soon as each one is ready. MP3 frames
+concatenate cleanly, so the client receives one playable file. Every segment
+is cached on disk under a hash of its text and voice settings, so exporting
+the same text again makes no API calls.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from export_renderer import content_text, export_sections
+
+TTS_ENDPOINT = "https://texttospeech.googleapis.com/v1/text:synthesize"
+TTS_VOICE = os.getenv("FRANKLIN_TTS_VOICE", "en-US-Neural2-C")
+TTS_LANGUAGE = os.getenv("FRANKLIN_TTS_LANGUAGE", "en-US")
+TTS_CONCURRENCY = int(os.getenv("FRANKLIN_TTS_CONCURRENCY", "4"))
+# Google's limit is 5000 bytes of input per request
+TTS_CHUNK_BYTES = int(os.getenv("FRANKLIN_TTS_CHUNK_BYTES", "4500"))
+TTS_MAX_CHARS = int(os.getenv("FRANKLIN_TTS_MAX_CHARS", "500000"))
+TTS_CACHE_DAYS = float(os.getenv("FRANKLIN_TTS_CACHE_DAYS", "30"))
+READ_BLOCK = 256 * 1024
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:。！？])\s+|\n+")
+
+
+class SpeechError(RuntimeError):
+    def __init__(self, message: str, status_code: int = 502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _utf8_len(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+def _split_long(sentence: str, max_bytes: int) -> List[str]:
+    """Break one over-long sentence on whitespace, or hard on bytes as a last resort."""
+    parts: List[str] = []
+    current = ""
+    for word in sentence.split(" "):
+        candidate = f"{current} {word}" if current else word
+        if _utf8_len(candidate) <= max_bytes:
+            current = candidate
+            continue
+        if current:
+            parts.append(current)
+        while _utf8_len(word) > max_bytes:
+            cut = len(word.encode("utf-8")[:max_bytes].decode("utf-8", "ignore"))
+            parts.append(word[:cut])
+            word = word[cut:]
+        current = word
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_text(text: str, max_bytes: int = TTS_CHUNK_BYTES) -> List[str]:
+    """Pack whole sentences into chunks of at most ``max_bytes`` UTF-8 bytes."""
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        candidate = f"{current} {sentence}" if current else sentence
+        if _utf8_len(candidate) <= max_bytes:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        if _utf8_len(sentence) <= max_bytes:
+            current = sentence
+        else:
+            *whole, current = _split_long(sentence, max_bytes)
+            chunks.extend(whole)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def speech_text(task: Dict[str, Any]) -> str:
+    """What an audio export reads out: each stage/agent output, introduced by its name."""
+    sections = [s for s in export_sections(task)
+                if not (isinstance(s["content"], str) and s["content"].startswith("data:image"))]
+    if len(sections) == 1:
+        return content_text(sections[0]["content"])
+    return "\n\n".join(f"{s['name']}.\n{content_text(s['content'])}" for s in sections)
+
+
+def _strip_id3(data: bytes) -> bytes:
+    """Drop a leading ID3v2 tag so segments after the first splice in as bare frames."""
+    if len(data) < 10 or data[:3] != b"ID3":
+        return data
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    return data[10 + size:]
+
+
+class SpeechSynthesizer:
+    def __init__(self, cache_dir: str, api_key: Optional[str], voice: str = TTS_VOICE,
+                 language: str = TTS_LANGUAGE, concurrency: int = TTS_CONCURRENCY):
+        self.cache_dir = cache_dir
+        self.api_key = api_key
+        self.voice = voice
+        self.language = language
+        self.concurrency = max(1, concurrency)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limit = asyncio.Semaphore(self.concurrency)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        self.segments_cached = 0
+        self.chars_synthesized = 0
+        self.api_seconds = 0.0
+        self.failed = 0
+        self.pruned = 0
+
+    def _client_or_start(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=60, limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+            )
+        return self._client
+
+    async def aclose(self):
+        client, self._client = self._client, None
+        if client:
+            await client.aclose()
+
+    def segment_path(self, text: str, first: bool) -> str:
+        key = hashlib.sha256(f"{self.language}|{self.voice}|MP3|{text}".encode()).hexdigest()
+        # Only the opening segment keeps its ID3 header; later ones are stored as bare frames
+        return os.path.join(self.cache_dir, key[:2], f"{key}{'' if first else '.frames'}.mp3")
+
+    async def _fetch(self, text: str, path: str):
+        body = {
+            "input": {"text": text},
+            "voice": {"languageCode": self.language, "name": self.voice},
+            "audioConfig": {"audioEncoding": "MP3"},
+        }
+        async with self._limit:
+            started = time.perf_counter()
+            try:
+                resp = await self._client_or_start().post(f"{TTS_ENDPOINT}?key={self.api_key}", json=body)
+            except httpx.HTTPError as ex:
+                self.failed += 1
+                raise SpeechError(f"Text-to-speech request failed: {ex}") from ex
+            self.api_seconds += time.perf_counter() - started
+            self.requests += 1
+        if resp.status_code != 200:
+            self.failed += 1
+            raise SpeechError(f"Text-to-speech returned {resp.status_code}: {resp.text[:200]}")
+        audio = base64.b64decode(resp.json().get("audioContent") or "")
+        if path.endswith(".frames.mp3"):
+            audio = _strip_id3(audio)
+        self.chars_synthesized += len(text)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+
+    async def segment(self, text: str, first: bool = False) -> str:
+        """Path of the cached MP3 for one chunk, synthesizing it if needed."""
+        path = self.segment_path(text, first)
+        if os.path.exists(path):
+            self.segments_cached += 1
+            return path
+        job = self._inflight.get(path)
+        if job is None:
+            # Detached from the caller, so a dropped download still fills the cache
+            job = asyncio.ensure_future(self._fetch(text, path))
+
+            def finished(j: asyncio.Future):
+                self._inflight.pop(path, None)
+                if not j.cancelled():
+                    j.exception()  # retrieved here when no caller is left waiting
+
+            job.add_done_callback(finished)
+            self._inflight[path] = job
+        await asyncio.shield(job)
+        return path
+
+    async def open_stream(self, text: str) -> AsyncIterator[bytes]:
+        """Start synthesizing ``text``; returns the MP3 byte stream once the first segment is ready.
+
+        Raising before the stream is returned lets the caller answer with a
+        proper error status instead of a truncated 200.
+        """
+        if not text.strip():
+            raise SpeechError("Nothing to read aloud", 400)
+        if len(text) > TTS_MAX_CHARS:
+            raise SpeechError(f"Text is longer than {TTS_MAX_CHARS} characters", 413)
+        chunks = split_text(text)
+        window = self.concurrency * 2
+        jobs: List[asyncio.Future] = []
+
+        def schedule():
+            # Keep a bounded number of segments ahead of the one being streamed
+            while len(jobs) < len(chunks) and len(jobs) - sent < window:
+                n = len(jobs)
+                jobs.append(asyncio.ensure_future(self.segment(chunks[n], first=n == 0)))
+
+        sent = 0
+        schedule()
+        try:
+            await asyncio.shield(jobs[0])
+        except BaseException:
+            for job in jobs:
+                job.cancel()
+            raise
+
+        async def stream() -> AsyncIterator[bytes]:
+            nonlocal sent
+            try:
+                while sent < len(chunks):
+                    path = await jobs[sent]
+                    sent += 1
+                    schedule()
+                    with open(path, "rb") as f:
+                        while block := await asyncio.to_thread(f.read, READ_BLOCK):
+                            yield block
+            finally:
+                for job in jobs[sent:]:
+                    job.cancel()
+
+        return stream()
+
+    def prune(self, max_age_days: float = TTS_CACHE_DAYS) -> int:
+        """Delete cached segments not written for ``max_age_days`` (maintenance hook)."""
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            if not os.listdir(bucket.path):
+                shutil.rmtree(bucket.path, ignore_errors=True)
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "voice": self.voice,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "segments_cached": self.segments_cached,
+            "chars_synthesized": self.chars_synthesized,
+            "api_seconds": round(self.api_seconds, 3),
+            "failed": self.failed,
+            "pruned": self.pruned,
+        }
@@ -0,0 +1,87 @@
+"""Blob garbage collection vs. adopt, and the legacy-upload dedupe pass."""
+import hashlib
+import os
+import tempfile
+from datetime import datetime, timezone
+
+_TMP = tempfile.mkdtemp(prefix="franklin-test-")
+os.environ.setdefault("FRANKLIN_DB_URL", f"sqlite:///{os.path.join(_TMP, 'franklin.db')}")
+os.environ.setdefault("FRANKLIN_VECTOR_DIR", os.path.join(_TMP, "vectors"))
+
+import pytest  # noqa: E402
+from sqlalchemy import select, update  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+import app  # noqa: E402
+from blob_store import BLOB_GC_GRACE, BlobStore  # noqa: E402
+
+
+@pytest.fixture
+def blobs(tmp_path, monkeypatch):
+    store = BlobStore(str(tmp_path / "blobs"), app.Blob.__table__)
+    monkeypatch.setattr(app, "BLOBS", store)
+    return store
+
+
+def _write(path, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def _orphan(store, tmp_path, data: bytes) -> str:
+    """A stored blob whose last reference went away long ago."""
+    sha = _write(tmp_path / "src", data)
+    store.adopt(str(tmp_path / "src"), sha)
+    old = datetime.now(timezone.utc) - 2 * BLOB_GC_GRACE
+    os.utime(store.path_for(sha), (old.timestamp(), old.timestamp()))
+    with app.engine.begin() as conn:
+        store.link(conn, sha, len(data))
+        store.unlink(conn, sha)
+        conn.execute(update(store.table).where(store.table.c.sha256 == sha).values(last_ref_at=old))
+    return sha
+
+
+def test_collect_removes_idle_blobs(blobs, tmp_path):
+    sha = _orphan(blobs, tmp_path, b"idle")
+    assert blobs.collect(app.engine) == 1
+    assert not blobs.exists(sha)
+
+
+def test_collect_keeps_a_blob_adopted_after_its_row_went_idle(blobs, tmp_path):
+    sha = _orphan(blobs, tmp_path, b"reused")
+    # A new upload of the same content adopts the blob just before collect runs
+    _write(tmp_path / "again", b"reused")
+    path, created = blobs.adopt(str(tmp_path / "again"), sha)
+    assert not created
+
+    assert blobs.collect(app.engine) == 0
+    assert os.path.exists(path)
+    with app.engine.begin() as conn:
+        row = blobs.link(conn, sha, 6)
+    assert row["ref_count"] == 1
+
+
+def test_dedupe_pages_past_missing_files(blobs, tmp_path):
+    with Session(app.engine) as s:
+        for i in range(5):
+            path = tmp_path / f"legacy{i}"
+            if i % 2 == 0:  # every other file has vanished from disk
+                _write(path, f"legacy {i}".encode())
+            s.add(app.UploadedFile(file_uuid=f"legacy-{i}-{tmp_path.name}", filename=path.name,
+                                   file_path=str(path), file_size=8, file_type="text"))
+        s.commit()
+
+    moved = missing = 0
+    after_id, pages = 0, 0
+    while after_id is not None:
+        result = app.dedupe_files(batch_size=2, after_id=after_id)
+        moved, missing, after_id = moved + result["moved"], missing + result["missing"], result["next_after_id"]
+        pages += 1
+        assert pages < 10, "dedupe stopped making progress"
+    assert (moved, missing) == (3, 2)
+
+    with Session(app.engine) as s:
+        paths = s.execute(select(app.UploadedFile.file_path)
+                          .where(app.UploadedFile.file_uuid.like(f"%-{tmp_path.name}"))).scalars().all()
+    assert sum(p.startswith(blobs.root) for p in paths) == 3
@@ -0,0 +1,72 @@
+"""The change feed cursor must not skip events whose ids commit out of order."""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, insert
+
+from change_feed import ChangeFeed
+from pubsub import LocalBus
+
+metadata = MetaData()
+requests_table = Table("bidrequest", metadata, Column("id", Integer, primary_key=True),
+                       Column("title", String), Column("description", String))
+events_table = Table("bidrequestevent", metadata, Column("id", Integer, primary_key=True),
+                     Column("request_id", Integer), Column("kind", String), Column("created_at", DateTime))
+
+
+@pytest.fixture
+def feed(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'feed.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(requests_table), [{"id": i, "title": f"job {i}", "description": ""} for i in (1, 2, 3)])
+    return ChangeFeed(engine, events_table, requests_table, LocalBus(), heartbeat=0.05, settle=5)
+
+
+def _event(feed, event_id: int, age: float):
+    with feed.engine.begin() as conn:
+        conn.execute(insert(events_table).values(
+            id=event_id, request_id=event_id, kind="created",
+            created_at=datetime.now(timezone.utc) - timedelta(seconds=age)))
+
+
+def test_cursor_waits_for_a_lower_id_that_commits_late(feed):
+    _event(feed, 1, age=60)
+    _event(feed, 3, age=0)  # id 2 is still in an open transaction
+    events, cursor = feed.fetch(0)
+    assert [e["id"] for e in events] == [1, 3]
+    assert cursor == 1
+
+    _event(feed, 2, age=6)  # a slow transaction: commits after 3 was read
+    events, cursor = feed.fetch(cursor)
+    assert [e["id"] for e in events] == [2, 3]
+    assert cursor == 2
+
+    feed.settle = 0
+    events, cursor = feed.fetch(cursor)
+    assert [e["id"] for e in events] == [3]
+    assert cursor == 3
+
+
+def test_stream_delivers_the_late_event_once(feed):
+    _event(feed, 1, age=60)
+    _event(feed, 3, age=0)
+
+    class Client:
+        checks = 0
+
+        async def is_disconnected(self):
+            self.checks += 1
+            if self.checks == 2:
+                _event(feed, 2, age=1)
+            return self.checks > 4
+
+    async def collect():
+        return [m async for m in feed.stream(Client(), 0, [])]
+
+    frames = [m.split("\n") for m in asyncio.run(collect()) if m.startswith("id:")]
+    assert sorted(json.loads(f[2][len("data: "):])["id"] for f in frames) == [1, 2, 3]
+    # Last-Event-ID never jumps past the unsettled event 3
+    assert {f[0] for f in frames} <= {"id: 1", "id: 2"}
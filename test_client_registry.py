@@ -0,0 +1,41 @@
+"""A client that cannot be built must not take the text engines down with it."""
+import pytest
+
+import trinity_orchestrator_unified as trinity
+from client_registry import ClientRegistry, ClientSpec, ClientUnavailable
+
+
+class DefaultCredentialsError(Exception):
+    """Stand-in for google.auth.exceptions.DefaultCredentialsError."""
+
+
+def _no_credentials(_key):
+    raise DefaultCredentialsError("Could not automatically determine credentials.")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    reg = ClientRegistry([
+        ClientSpec("gemini", lambda key: ("gemini", key), keys=lambda: ["g-key"]),
+        ClientSpec("openai", lambda key: ("openai", key), keys=lambda: ["o-key"]),
+        ClientSpec("anthropic", lambda key: ("anthropic", key), keys=lambda: []),
+        ClientSpec("google_tts", _no_credentials, unavailable="Google TTS not available."),
+    ])
+    monkeypatch.setattr(trinity, "CLIENTS", reg)
+    return reg
+
+
+def test_make_clients_survives_tts_credential_failure(registry, monkeypatch):
+    calls = []
+    monkeypatch.setitem(registry._specs, "google_tts",
+                        ClientSpec("google_tts", lambda key: calls.append(key) or _no_credentials(key)))
+    clients = trinity._make_clients()
+    assert clients == {"gemini": ("gemini", "g-key"), "openai": ("openai", "o-key")}
+    assert calls == []  # the engines never build the speech client
+
+
+def test_factory_errors_become_client_unavailable(registry):
+    with pytest.raises(ClientUnavailable, match="DefaultCredentialsError"):
+        registry.get("google_tts")
+    assert "google_tts" not in registry.available()
+    assert registry.health()["google_tts"]["last_error"].startswith("DefaultCredentialsError")
@@ -0,0 +1,49 @@
+"""Engine registry routing and multi-process stats merging."""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select
+
+import trinity_orchestrator_unified as trinity
+from engine_registry import EngineRegistry, engine_registry_table
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # telemetry and the orchestrator log write to the working directory
+    reg = EngineRegistry(None, epsilon=0.0)
+    monkeypatch.setattr(trinity, "ADAPTIVE_ROUTING", True)
+    monkeypatch.setattr(trinity, "_registry", reg)
+    return reg
+
+
+def test_routing_with_every_engine_disabled_is_empty(registry):
+    for engine_id in registry.snapshot():
+        registry.set_override(engine_id, disabled=True)
+    assert registry.route("OpenAI") == []
+    assert trinity.routing_order("analyze this data") == []
+    with pytest.raises(trinity.AllEnginesFailed, match="No engines enabled"):
+        asyncio.run(trinity.trinity_engine_async("analyze this data"))
+
+
+def test_disabled_engine_is_skipped(registry):
+    registry.set_override("Gemini", disabled=True)
+    assert "Gemini" not in trinity.routing_order("render an image")
+
+
+def test_flushes_from_two_processes_add_up(tmp_path):
+    db = create_engine(f"sqlite:///{tmp_path / 'registry.db'}")
+    a, b = EngineRegistry(db), EngineRegistry(db)
+    for _ in range(3):
+        a.record("OpenAI", 0.5, True)
+    b.record("OpenAI", 0.7, False, "boom")
+    b.record("OpenAI", 0.6, True)
+    a.flush()
+    b.flush()
+    a.record("OpenAI", 0.4, True)
+    a.flush()
+
+    with db.connect() as conn:
+        row = conn.execute(select(engine_registry_table)
+                           .where(engine_registry_table.c.engine_id == "OpenAI")).mappings().one()
+    assert (row["calls"], row["failures"]) == (6, 1)
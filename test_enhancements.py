@@ -128,6 +128,35 @@ def test_cognitive_memory():
     
     print("\n✓ Cognitive memory tests passed\n")
 
+def test_memory_bulk():
+    """Test NDJSON bulk import/export of memories"""
+    print("Testing bulk memory import/export...")
+
+    lines = [
+        json.dumps({"key": f"bulk:device:{i}", "value": f"state {i}", "memory_type": "raspberry_pi", "ttl_days": 1})
+        for i in range(250)
+    ]
+    lines.append("{not json")
+    response = requests.post(
+        f"{BASE_URL}/api/memory/import",
+        data="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    print(f"Status: {response.status_code}")
+    data = response.json()
+    print(f"Response: {json.dumps(data, indent=2)}")
+    assert response.status_code == 200
+    assert data['stored'] == 250
+    assert data['rejected'] == 1
+
+    response = requests.get(f"{BASE_URL}/api/memory/export?memory_type=raspberry_pi", stream=True)
+    exported = [json.loads(line) for line in response.iter_lines() if line]
+    print(f"Exported {len(exported)} raspberry_pi memories")
+    assert response.status_code == 200
+    assert any(m['key'] == 'bulk:device:0' for m in exported)
+
+    print("✓ Bulk memory tests passed\n")
+
 def test_ai_caching():
     """Test AI response caching"""
     print("Testing AI response caching...")
@@ -271,6 +300,7 @@ def run_all_tests():
         
         print_section("2. Cognitive Memory Tests")
         test_cognitive_memory()
+        test_memory_bulk()
         
         print_section("3. AI Caching Tests")
         test_ai_caching()
@@ -0,0 +1,80 @@
+"""Bid statistics stay exact when bids on one request race each other."""
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String, Table, create_engine, insert,
+                        select)
+from sqlalchemy.exc import OperationalError
+
+from marketplace import fold_bid_stats, record_bid
+
+metadata = MetaData()
+bids = Table("bid", metadata, Column("id", Integer, primary_key=True), Column("request_id", Integer),
+             Column("price", Float))
+stats_table = Table(
+    "bidstats", metadata,
+    Column("request_id", Integer, primary_key=True),
+    Column("bid_count", Integer, nullable=False, default=0),
+    Column("price_sum", Float, nullable=False, default=0.0),
+    Column("min_price", Float), Column("median_price", Float), Column("max_price", Float),
+    Column("prices", String),
+    Column("first_bid_at", DateTime), Column("last_bid_at", DateTime), Column("seconds_to_first_bid", Float),
+    Column("accepted_bid_id", Integer), Column("accepted_price", Float), Column("closed_at", DateTime),
+    Column("updated_at", DateTime),
+    Column("version", Integer, nullable=False, default=0),
+)
+
+
+def submit(engine, request_id, price, created_at, retries=200):
+    """The submit_bid loop: write the bid, fold it into the stats, retry on a lost race."""
+    for _ in range(retries):
+        with engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                conn.execute(insert(bids).values(request_id=request_id, price=price))
+                folded = fold_bid_stats(conn, stats_table, request_id,
+                                        lambda s: record_bid(s, price, datetime.now(timezone.utc), created_at))
+            except OperationalError:
+                folded = False
+            if folded:
+                trans.commit()
+                return
+            trans.rollback()
+    raise AssertionError("stats update never went through")
+
+
+def test_concurrent_bids_fold_every_price(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bids.db'}", connect_args={"timeout": 30})
+    metadata.create_all(engine)
+    created_at = datetime.now(timezone.utc)
+    prices = [float(p) for p in range(1, 81)]
+
+    threads = [threading.Thread(target=lambda ps=prices[i::8]: [submit(engine, 1, p, created_at) for p in ps])
+               for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    with engine.connect() as conn:
+        row = conn.execute(select(stats_table)).mappings().one()
+        bid_total = conn.execute(select(bids.c.price)).scalars().all()
+    assert len(bid_total) == len(prices)
+    assert row["bid_count"] == len(prices)
+    assert row["price_sum"] == sum(prices)
+    assert (row["min_price"], row["max_price"], row["median_price"]) == (1.0, 80.0, 40.5)
+    assert row["version"] == len(prices) - 1
+
+
+def test_stale_version_is_rejected(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bids.db'}")
+    metadata.create_all(engine)
+    created_at = datetime.now(timezone.utc)
+    submit(engine, 1, 10.0, created_at)
+
+    with engine.begin() as conn:
+        def race(stats):
+            # Another writer commits between our read and our update
+            conn.execute(stats_table.update().values(version=stats.version + 1))
+            record_bid(stats, 20.0, datetime.now(timezone.utc), created_at)
+        assert fold_bid_stats(conn, stats_table, 1, race) is False
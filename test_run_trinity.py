@@ -0,0 +1,69 @@
+"""Batch mode resumes from its NDJSON report."""
+import argparse
+import json
+
+import pytest
+
+import run_trinity
+import trinity_orchestrator_unified as trinity
+
+
+def _record(pid: str) -> dict:
+    return {"id": pid, "ok": True, "engine": "OpenAI", "elapsed": 0.1,
+            "attempts": [{"engine": "OpenAI", "ok": True, "seconds": 0.1}]}
+
+
+@pytest.fixture
+def prompts_seen(tmp_path, monkeypatch):
+    """Stub every engine; returns the prompts they were asked to answer."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(trinity, "ADAPTIVE_ROUTING", False)
+    seen = []
+
+    def answer(prompt, max_tokens=600, clients=None):
+        seen.append(prompt)
+        return {"engine": "OpenAI", "text": "ok", "latency": 0.0, "confidence": 1.0}
+
+    for engine in ("Gemini", "OpenAI", "Anthropic"):
+        monkeypatch.setitem(trinity._HANDLER_REGISTRY, engine, answer)
+    monkeypatch.setattr(trinity, "_make_clients", lambda: {})
+    return seen
+
+
+def _args(tmp_path, **overrides) -> argparse.Namespace:
+    args = dict(input=str(tmp_path / "prompts.jsonl"), report=str(tmp_path / "report.ndjson"),
+                dry_run=False, retry_failed=False, fresh=False, concurrency=2, max_tokens=50,
+                mode="sequential")
+    return argparse.Namespace(**dict(args, **overrides))
+
+
+def test_batch_resume_keeps_good_records_and_drops_only_the_torn_tail(tmp_path, prompts_seen):
+    (tmp_path / "prompts.jsonl").write_text(
+        "".join(json.dumps({"id": f"p{i}", "prompt": f"prompt {i}"}) + "\n" for i in range(1, 5)))
+    report = tmp_path / "report.ndjson"
+    report.write_text(
+        json.dumps(_record("p1")) + "\n"
+        + "{corrupt middle line\n"
+        + json.dumps(_record("p2")) + "\n"
+        + '{"id": "p3", "ok": tr',  # killed mid-write
+        encoding="utf-8",
+    )
+
+    run_trinity.batch(_args(tmp_path))
+
+    assert sorted(prompts_seen) == ["prompt 3", "prompt 4"]
+    lines = report.read_text(encoding="utf-8").splitlines()
+    assert lines[:3] == [json.dumps(_record("p1")), "{corrupt middle line", json.dumps(_record("p2"))]
+    assert sorted(json.loads(line)["id"] for line in lines[3:]) == ["p3", "p4"]
+    assert set(run_trinity.load_report(str(report))) == {"p1", "p2", "p3", "p4"}
+
+
+def test_load_report_skips_bad_middle_lines(tmp_path, capsys):
+    report = tmp_path / "report.ndjson"
+    report.write_text(json.dumps(_record("a")) + "\n[1, 2]\nnot json\n" + json.dumps(_record("b")) + "\n")
+    size = report.stat().st_size
+
+    assert set(run_trinity.load_report(str(report))) == {"a", "b"}
+    assert report.stat().st_size == size
+    err = capsys.readouterr().err
+    assert "report.ndjson:2" in err and "report.ndjson:3" in err
@@ -0,0 +1,52 @@
+"""Keyword routing, and hung engine calls must not silently starve the shared engine threads."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import trinity_orchestrator_unified as trinity
+
+
+@pytest.fixture
+def hung_engines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(trinity, "ADAPTIVE_ROUTING", False)
+    monkeypatch.setattr(trinity, "_make_clients", lambda: {})
+    monkeypatch.setattr(trinity, "ENGINE_THREADS", 2)
+    release = threading.Event()
+
+    def hang(prompt, max_tokens=600, clients=None):
+        release.wait(5)
+        return {"engine": "OpenAI", "text": "late", "latency": 0.0}
+
+    for engine in ("Gemini", "OpenAI", "Anthropic"):
+        monkeypatch.setitem(trinity._HANDLER_REGISTRY, engine, hang)
+    yield release
+    release.set()
+
+
+def test_saturated_pool_fails_fast_and_recovers(hung_engines):
+    run = lambda: asyncio.run(trinity.trinity_engine_async("hello", timeout=0.1))  # noqa: E731
+    with pytest.raises(trinity.AllEnginesFailed):
+        run()  # two engines time out and keep both threads
+
+    started = time.perf_counter()
+    with pytest.raises(trinity.AllEnginesFailed) as busy:
+        run()
+    assert time.perf_counter() - started < 0.1
+    assert all("engine threads are busy" in a["error"] for a in busy.value.attempts)
+
+    hung_engines.set()
+    deadline = time.monotonic() + 2
+    while trinity._engine_busy and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert run()["text"] == "late"
+
+
+def test_first_matching_engine_wins():
+    assert trinity.classify_prompt("Render the data, then compare and calculate") == "Gemini"
+    route = trinity.classify_prompt_scores("Render the data, then compare and calculate")
+    assert route.route == "Gemini"
+    assert route.scores == {"Gemini": 1, "OpenAI": 3, "Anthropic": 0}
+    assert trinity.classify_prompt("hello") == trinity.DEFAULT_ENGINE
@@ -0,0 +1,24 @@
+"""UTC normalisation for datetimes read back from the database.
+
+SQLite returns naive datetimes (stored as UTC); Postgres and callers may hand
+in offset-aware ones. Compare and serialise them only after passing through
+these helpers.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """Aware UTC datetime; naive values are taken to already be UTC."""
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """Naive UTC datetime, for TIMESTAMP WITHOUT TIME ZONE columns and ISO strings."""
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
@@ -7,6 +7,7 @@ Usage examples:
     python trinity_mothership.py --register
     python trinity_mothership.py --run-smoke
     python trinity_mothership.py --start-api 8080
+    python trinity_mothership.py --health
 """
 import subprocess
 import sys
@@ -65,8 +66,14 @@ def main():
     p.add_argument("--register", action="store_true")
     p.add_argument("--run-smoke", action="store_true")
     p.add_argument("--start-api", type=int, help="Start FastAPI on given port")
+    p.add_argument("--health", action="store_true", help="Probe the shared SDK clients and print their state")
     args = p.parse_args()
 
+    if args.health:
+        import json
+        from client_registry import CLIENTS
+        print(json.dumps(CLIENTS.health(probe=True), indent=2))
+
     if args.register:
         register_all()
     if args.run_smoke:
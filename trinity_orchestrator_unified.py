@@ -6,28 +6,21 @@ This module is written to be import-safe: external SDKs are optionally imported
 so a developer can `import` the module without API keys installed. Engines are
 created lazily when first used.
 """
+import asyncio
+import atexit
+import functools
 import os
+import threading
 import time
 import json
 import traceback
-from typing import Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
 from telemetry import record_request, record_success, record_failure
 
-# Optional imports (import-safe)
-try:
-    from google import genai
-except Exception:
-    genai = None
-
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None
-
-try:
-    import anthropic
-except Exception:
-    anthropic = None
+from client_registry import CLIENTS, reporting
+from engine_registry import EngineRegistry
 
 # Optional config import (centralized env access)
 try:
@@ -35,31 +28,63 @@ try:
 except Exception:
     get_config = None
 
+_warned_missing = False
+
+MODES = ("sequential", "race", "staggered")
+ENGINE_TIMEOUT = float(os.getenv("TRINITY_ENGINE_TIMEOUT", "60"))
+RACE_FANOUT = int(os.getenv("TRINITY_RACE_FANOUT", "2"))
+STAGGER_SECONDS = float(os.getenv("TRINITY_STAGGER_SECONDS", "2.0"))
+# SDK calls block, so engines run on their own threads; a cancelled loser's
+# thread finishes in the background and its answer is dropped. The clients
+# carry the same timeout, so such a thread is released soon after; until then
+# it counts against ENGINE_THREADS and new calls are refused once all are busy.
+ENGINE_THREADS = int(os.getenv("TRINITY_ENGINE_THREADS", "16"))
+_ENGINE_POOL = ThreadPoolExecutor(max_workers=ENGINE_THREADS, thread_name_prefix="trinity-engine")
+_engine_busy = 0
+_engine_busy_lock = threading.Lock()
+ADAPTIVE_ROUTING = os.getenv("TRINITY_ADAPTIVE_ROUTING", "1") == "1"
+# Registry clients the text engines use; speech and other clients are built by their own callers
+ENGINE_CLIENTS = ("gemini", "openai", "anthropic")
+_registry: Optional[EngineRegistry] = None
+
+
+class EnginePoolBusy(RuntimeError):
+    """Every engine thread is still occupied by an earlier (possibly timed-out) call."""
+
+
+class AllEnginesFailed(RuntimeError):
+    """No engine answered; ``attempts`` lists what each engine did."""
+
+    def __init__(self, message: str, attempts: List[dict]):
+        super().__init__(message)
+        self.attempts = attempts
+
+
+def engine_registry() -> EngineRegistry:
+    """Process-wide engine registry, persisted to the Franklin database."""
+    global _registry
+    if _registry is None:
+        url = get_config().db_url if get_config else os.getenv("FRANKLIN_DB_URL", "sqlite:///franklin.db")
+        _registry = EngineRegistry.from_url(url)
+        atexit.register(_registry.flush)
+    return _registry
+
 
 def _make_clients():
-    """Lazily create API clients from environment variables (via config if available)."""
-    clients = {}
-    if get_config:
-        cfg = get_config()
-        gemini_key = cfg.gemini_api_key
-        openai_key = cfg.openai_api_key
-        anthropic_key = cfg.anthropic_api_key
-        missing = cfg.missing_keys()
+    """Clients for every configured engine, from the process-wide registry (built once, then shared)."""
+    global _warned_missing
+    if get_config and not _warned_missing:
+        missing = get_config().missing_keys()
         if missing:
             print(f"[TrinityConfig] Missing keys: {', '.join(missing)} (engines without keys will be skipped)")
-    else:
-        gemini_key = os.getenv("GEMINI_API_KEY")
-        openai_key = os.getenv("OPENAI_API_KEY")
-        anthropic_key = os.getenv("ANTHROPIC_API_KEY")
+        _warned_missing = True
+    return CLIENTS.available(ENGINE_CLIENTS)
 
-    if genai and gemini_key:
-        clients["gemini"] = genai.Client(api_key=gemini_key)
-    if OpenAI and openai_key:
-        clients["openai"] = OpenAI(api_key=openai_key)
-    if anthropic and anthropic_key:
-        clients["anthropic"] = anthropic.Anthropic(api_key=anthropic_key)
 
-    return clients
+def _client(name: str, clients: Optional[dict]):
+    if clients and name in clients:
+        return clients[name]
+    return CLIENTS.get(name)  # ClientUnavailable is a RuntimeError, as before
 
 
 # --- Plugin / handler registry ---
@@ -79,79 +104,246 @@ def get_handler(kind: str):
     return _HANDLER_REGISTRY.get(kind)
 
 
+# Keyword routing: the first engine with a keyword anywhere in the prompt wins
+ENGINE_KEYWORDS = (
+    ("Gemini", ("image", "video", "render", "design", "visualize")),
+    ("OpenAI", ("analyze", "summarize", "compare", "calculate", "data")),
+    ("Anthropic", ("philosophy", "ethics", "meaning", "law", "spiritual")),
+)
+DEFAULT_ENGINE = "OpenAI"
+
+
+class Route(NamedTuple):
+    route: str
+    scores: Dict[str, int]
+    matches: List[str]
+
+
 def classify_prompt(prompt: str) -> str:
     lower = prompt.lower()
-    if any(k in lower for k in ["image", "video", "render", "design", "visualize"]):
-        return "Gemini"
-    if any(k in lower for k in ["analyze", "summarize", "compare", "calculate", "data"]):
-        return "OpenAI"
-    if any(k in lower for k in ["philosophy", "ethics", "meaning", "law", "spiritual"]):
-        return "Anthropic"
-    return "OpenAI"
+    for engine, keywords in ENGINE_KEYWORDS:
+        if any(k in lower for k in keywords):
+            return engine
+    return DEFAULT_ENGINE
+
+
+def classify_prompt_scores(prompt: str) -> Route:
+    """`classify_prompt`'s route plus the keywords each engine matched (for reports; slower)."""
+    lower = prompt.lower()
+    matches = [k for _, keywords in ENGINE_KEYWORDS for k in keywords if k in lower]
+    scores = {engine: sum(k in lower for k in keywords) for engine, keywords in ENGINE_KEYWORDS}
+    return Route(classify_prompt(prompt), scores, matches)
 
 
 def run_gemini(prompt: str, max_tokens: int = 600, clients: Optional[dict] = None):
     start = time.time()
-    clients = clients or _make_clients()
-    if "gemini" not in clients:
-        raise RuntimeError("Gemini client not available (missing package or GEMINI_API_KEY).")
-    client = clients["gemini"]
-    r = client.models.generate_content(model="models/gemini-2.5-pro", contents=prompt)
+    client = _client("gemini", clients)
+    with reporting("gemini", client):
+        r = client.models.generate_content(model="models/gemini-2.5-pro", contents=prompt)
     text = getattr(r, "text", None) or getattr(r, "output", None) or str(r)
     return {"engine": "Gemini", "text": text.strip(), "latency": round(time.time() - start, 2), "confidence": 0.9}
 
 
 def run_openai(prompt: str, max_tokens: int = 600, clients: Optional[dict] = None):
     start = time.time()
-    clients = clients or _make_clients()
-    if "openai" not in clients:
-        raise RuntimeError("OpenAI client not available (missing package or OPENAI_API_KEY).")
-    client = clients["openai"]
-    r = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=max_tokens)
+    client = _client("openai", clients)
+    with reporting("openai", client):
+        r = client.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": prompt}], max_tokens=max_tokens)
     text = r.choices[0].message.content.strip()
     return {"engine": "OpenAI", "text": text, "latency": round(time.time() - start, 2), "confidence": 0.92}
 
 
 def run_anthropic(prompt: str, max_tokens: int = 600, clients: Optional[dict] = None):
     start = time.time()
-    clients = clients or _make_clients()
-    if "anthropic" not in clients:
-        raise RuntimeError("Anthropic client not available (missing package or ANTHROPIC_API_KEY).")
-    client = clients["anthropic"]
-    r = client.messages.create(model="claude-sonnet-4-5-20250929", max_tokens=max_tokens, messages=[{"role": "user", "content": prompt}])
+    client = _client("anthropic", clients)
+    with reporting("anthropic", client):
+        r = client.messages.create(model="claude-sonnet-4-5-20250929", max_tokens=max_tokens, messages=[{"role": "user", "content": prompt}])
     text = r.content[0].text.strip()
     return {"engine": "Anthropic", "text": text, "latency": round(time.time() - start, 2), "confidence": 0.88}
 
 
-def trinity_engine(prompt: str, max_tokens: int = 600, log_file: str = "trinity_log.json"):
-    record_request(prompt)
-    primary = classify_prompt(prompt)
-    engines = {"Gemini": run_gemini, "OpenAI": run_openai, "Anthropic": run_anthropic}
-    ordered = [primary] + [e for e in engines if e != primary]
+class _ModeLatency:
+    """Rolling wall-clock time to the final answer, per orchestration mode."""
 
-    log_entry = {"prompt": prompt, "results": [], "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
-    clients = _make_clients()
+    def __init__(self, window: int = 1000):
+        self._samples: Dict[str, deque] = {m: deque(maxlen=window) for m in MODES}
+        self._failures: Dict[str, int] = {m: 0 for m in MODES}
+
+    def record(self, mode: str, seconds: float, ok: bool):
+        if ok:
+            self._samples[mode].append(seconds)
+        else:
+            self._failures[mode] += 1
+
+    def report(self) -> Dict[str, dict]:
+        out = {}
+        for mode in MODES:
+            xs = sorted(self._samples[mode])
+
+            def pct(q: float):
+                return round(xs[min(len(xs) - 1, int(q * len(xs)))], 3) if xs else None
+
+            out[mode] = {
+                "count": len(xs),
+                "failures": self._failures[mode],
+                "mean": round(sum(xs) / len(xs), 3) if xs else None,
+                "p50": pct(0.5),
+                "p95": pct(0.95),
+            }
+        return out
+
+
+MODE_LATENCY = _ModeLatency()
 
-    for engine in ordered:
+
+def latency_report() -> Dict[str, dict]:
+    return MODE_LATENCY.report()
+
+
+def routing_order(prompt: str, explore: bool = True) -> List[str]:
+    """Engines to try, best first: scored by the engine registry, or keyword order if adaptive routing is off.
+
+    Empty when every engine is disabled in the registry.
+    """
+    primary = classify_prompt(prompt)
+    if ADAPTIVE_ROUTING:
+        return engine_registry().route(primary, explore=explore)
+    return [primary] + [e for e in ("Gemini", "OpenAI", "Anthropic") if e != primary]
+
+
+async def _call_engine(engine: str, prompt: str, max_tokens: int, clients: dict, timeout: float) -> dict:
+    builtins = {"Gemini": run_gemini, "OpenAI": run_openai, "Anthropic": run_anthropic}
+    # allow registered handlers to override built-ins
+    fn = get_handler(engine) or builtins[engine]
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, prompt, max_tokens=max_tokens, clients=clients)
+    return await asyncio.wait_for(loop.run_in_executor(_ENGINE_POOL, _occupy_thread(call)), timeout)
+
+
+def _occupy_thread(call):
+    """Count ``call`` against the engine threads until it returns, even after its caller timed out."""
+    global _engine_busy
+    with _engine_busy_lock:
+        if _engine_busy >= ENGINE_THREADS:
+            raise EnginePoolBusy(f"all {ENGINE_THREADS} engine threads are busy with unfinished calls")
+        _engine_busy += 1
+
+    def run():
+        global _engine_busy
         try:
-            print(f"\n🚀 Routing to {engine}...")
-            # allow registered handlers to override built-ins
-            fn = get_handler(engine) or engines[engine]
-            result = fn(prompt, max_tokens=max_tokens, clients=clients)
-            print(f"✅ {engine} succeeded in {result['latency']}s")
-            log_entry["results"].append(result)
-            record_success(engine, result['latency'])
-            with open(log_file, "a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
-            return result
-        except Exception as e:
-            print(f"⚠️ {engine} failed: {type(e).__name__} - {e}")
-            traceback.print_exc()
-            log_entry["results"].append({"engine": engine, "error": str(e)})
-            record_failure(engine, str(e))
-            continue
-
-    raise RuntimeError("❌ All engines failed.")
+            return call()
+        finally:
+            with _engine_busy_lock:
+                _engine_busy -= 1
+    return run
+
+
+async def trinity_engine_async(prompt: str, max_tokens: int = 600, log_file: str = "trinity_log.json",
+                               mode: str = "sequential", fanout: int = RACE_FANOUT,
+                               stagger: float = STAGGER_SECONDS, timeout: float = ENGINE_TIMEOUT):
+    """Route a prompt across engines and return the first good answer.
+
+    sequential: try engines in routing order, one at a time (the classic behaviour).
+    race:       start the top ``fanout`` engines at once; a failure starts the next one.
+    staggered:  start the primary, then another engine every ``stagger`` seconds
+                (or immediately when one fails) until something answers.
+    The losers are cancelled as soon as there is a winner. Each engine gets
+    ``timeout`` seconds, so a hung engine counts as a failure instead of
+    stalling the fallback. The result's ``attempts`` (or the raised
+    `AllEnginesFailed`'s) records how every launched engine fared.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}; expected one of {', '.join(MODES)}")
+    record_request(prompt)
+    ordered = routing_order(prompt)
+    if not ordered:
+        raise AllEnginesFailed("❌ No engines enabled.", [])
+    started = time.perf_counter()
+    log_entry = {"prompt": prompt, "mode": mode, "results": [], "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")}
+    clients = _make_clients()
+
+    registry = engine_registry() if ADAPTIVE_ROUTING else None
+    waiting = list(ordered)
+    running: Dict[asyncio.Task, str] = {}
+    launched_at: Dict[asyncio.Task, float] = {}
+    attempts: List[dict] = []
+
+    def launch():
+        engine = waiting.pop(0)
+        print(f"\n🚀 Routing to {engine}...")
+        task = asyncio.ensure_future(_call_engine(engine, prompt, max_tokens, clients, timeout))
+        running[task] = engine
+        launched_at[task] = time.perf_counter()
+
+    for _ in range(max(1, fanout) if mode == "race" else 1):
+        if waiting:
+            launch()
+    winner = None
+    try:
+        while running and winner is None:
+            wait_for = stagger if mode == "staggered" and waiting else None
+            done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                launch()  # staggered: the running engines are slow, bring in the next one
+                continue
+            for task in done:
+                engine = running.pop(task)
+                took = time.perf_counter() - launched_at.pop(task)
+                try:
+                    result = task.result()
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError):
+                        e = TimeoutError(f"no answer within {timeout}s")
+                    print(f"⚠️ {engine} failed: {type(e).__name__} - {e}")
+                    if not isinstance(e, (TimeoutError, EnginePoolBusy)):
+                        traceback.print_exception(e)
+                    log_entry["results"].append({"engine": engine, "error": str(e)})
+                    attempts.append({"engine": engine, "ok": False, "seconds": round(took, 3), "error": str(e)[:300]})
+                    record_failure(engine, str(e))
+                    if registry and not isinstance(e, EnginePoolBusy):  # not the engine's fault
+                        registry.record(engine, took, False, f"{type(e).__name__}: {e}")
+                    if waiting:
+                        launch()
+                    continue
+                if winner is None:
+                    winner = result
+                    print(f"✅ {engine} succeeded in {result['latency']}s")
+                    log_entry["results"].append(result)
+                    record_success(engine, result['latency'])
+                attempts.append({"engine": engine, "ok": True, "seconds": round(took, 3)})
+                if registry:
+                    registry.record(engine, took, True)
+    finally:
+        for task, engine in running.items():
+            task.cancel()
+            log_entry["results"].append({"engine": engine, "cancelled": True})
+            attempts.append({"engine": engine, "cancelled": True})
+
+    elapsed = time.perf_counter() - started
+    MODE_LATENCY.record(mode, elapsed, winner is not None)
+    if winner is None:
+        raise AllEnginesFailed("❌ All engines failed.", attempts)
+    log_entry["elapsed"] = round(elapsed, 3)
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+    return {**winner, "mode": mode, "elapsed": round(elapsed, 3), "attempts": attempts}
+
+
+def trinity_engine(prompt: str, max_tokens: int = 600, log_file: str = "trinity_log.json",
+                   mode: str = "sequential", **options):
+    """Blocking wrapper around `trinity_engine_async` for scripts and the CLI.
+
+    Called from inside a running event loop (a notebook, an async handler) it
+    runs the orchestration on a worker thread with its own loop and blocks
+    until it finishes; async callers should await `trinity_engine_async`.
+    """
+    coro = trinity_engine_async(prompt, max_tokens=max_tokens, log_file=log_file, mode=mode, **options)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="trinity-sync") as pool:
+        return pool.submit(asyncio.run, coro).result()
 
 
 def _cli():
@@ -159,10 +351,15 @@ def _cli():
     p = argparse.ArgumentParser(description="Trinity Unified Orchestrator CLI")
     p.add_argument("--prompt", "-p", type=str, required=True, help="Prompt text to send")
     p.add_argument("--max-tokens", type=int, default=600, help="Max tokens for completion")
+    p.add_argument("--mode", choices=MODES, default="sequential", help="Engine scheduling mode")
+    p.add_argument("--fanout", type=int, default=RACE_FANOUT, help="Engines started at once in race mode")
+    p.add_argument("--stagger", type=float, default=STAGGER_SECONDS, help="Seconds between starts in staggered mode")
+    p.add_argument("--timeout", type=float, default=ENGINE_TIMEOUT, help="Per-engine timeout in seconds")
     args = p.parse_args()
-    res = trinity_engine(args.prompt, max_tokens=args.max_tokens)
+    res = trinity_engine(args.prompt, max_tokens=args.max_tokens, mode=args.mode,
+                         fanout=args.fanout, stagger=args.stagger, timeout=args.timeout)
     print("\n--- FINAL OUTPUT ---")
-    print(f"Source: {res['engine']} | Latency: {res['latency']}s | Confidence: {res.get('confidence')}")
+    print(f"Source: {res['engine']} | Latency: {res['latency']}s | Confidence: {res.get('confidence')} | Mode: {res['mode']}")
     print(res['text'])
 
 
@@ -0,0 +1,279 @@
+"""Compact binary embedding storage for cognitive memory.
+
+Vectors are L2-normalised and appended as fixed-size records to append-only
+segment files under ``FRANKLIN_VECTOR_DIR``. One segment holds vectors of a
+single (dtype, dim) pair; the SQL row only keeps a ``"<segment>#<row>"``
+pointer. Search maps segments with ``np.memmap`` so float32 vectors are scored
+straight from the page cache; float16/int8 segments are dequantised chunk by
+chunk so memory stays bounded.
+
+Deleted, re-embedded and migrated memories leave orphan records behind;
+``compact()`` copies the live records of mostly-dead sealed segments into the
+active one and deletes the old files.
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_DIR = Path(os.getenv("FRANKLIN_VECTOR_DIR", "vector_segments"))
+VECTOR_DTYPE = os.getenv("FRANKLIN_VECTOR_DTYPE", "float32")  # float32 | float16 | int8
+SEGMENT_MAX_BYTES = int(os.getenv("FRANKLIN_VECTOR_SEGMENT_MB", "64")) * 1024 * 1024
+SEARCH_CHUNK_ROWS = 65536
+# Sealed segments are rewritten once at least this share of their records is orphaned
+COMPACT_MIN_DEAD = float(os.getenv("FRANKLIN_VECTOR_COMPACT_MIN_DEAD", "0.25"))
+
+DTYPES = ("float32", "float16", "int8")
+_SEGMENT_RE = re.compile(r"^(float32|float16|int8)-(\d+)-(\d{6})\.vseg$")
+
+
+def record_dtype(dtype: str, dim: int) -> np.dtype:
+    """On-disk record layout for one vector."""
+    if dtype == "float32":
+        return np.dtype([("id", "<i8"), ("v", "<f4", (dim,))])
+    if dtype == "float16":
+        return np.dtype([("id", "<i8"), ("v", "<f2", (dim,))])
+    if dtype == "int8":
+        return np.dtype([("id", "<i8"), ("scale", "<f4"), ("v", "i1", (dim,))])
+    raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+
+def encode_record(memory_id: int, vector: Sequence[float], dtype: str) -> np.ndarray:
+    """Normalise and quantise a vector into a single on-disk record."""
+    vec = np.asarray(vector, dtype=np.float32).ravel()
+    if vec.size == 0:
+        raise ValueError("Embedding vector is empty")
+    norm = float(np.linalg.norm(vec))
+    if norm > 0:
+        vec = vec / norm
+
+    rec = np.zeros(1, dtype=record_dtype(dtype, vec.size))
+    rec["id"] = memory_id
+    if dtype == "int8":
+        scale = float(np.abs(vec).max()) / 127.0 or 1.0
+        rec["scale"] = scale
+        rec["v"] = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+    else:
+        rec["v"] = vec
+    return rec
+
+
+def decode_vectors(recs: np.ndarray) -> np.ndarray:
+    """Return float32 vectors for a slice of records (a view for float32 segments)."""
+    vecs = recs["v"]
+    if "scale" in recs.dtype.names:
+        return vecs.astype(np.float32) * recs["scale"][:, None]
+    if vecs.dtype != np.float32:
+        return vecs.astype(np.float32)
+    return vecs
+
+
+def parse_pointer(pointer: str) -> Tuple[str, int, int, int]:
+    """Split ``"<segment>#<row>"`` into (dtype, dim, segment name, row)."""
+    name, _, row = pointer.partition("#")
+    m = _SEGMENT_RE.match(name)
+    if not m or not row.isdigit():
+        raise ValueError(f"Invalid vector pointer: {pointer}")
+    return m.group(1), int(m.group(2)), name, int(row)
+
+
+class VectorStore:
+    """Append-only, memory-mapped segment files keyed by (dtype, dim)."""
+
+    def __init__(self, root: Path = VECTOR_DIR, dtype: str = VECTOR_DTYPE,
+                 segment_max_bytes: int = SEGMENT_MAX_BYTES):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+        self.root = Path(root)
+        self.dtype = dtype
+        self.segment_max_bytes = segment_max_bytes
+        # Guards segment files (append/compact) and the memmap cache
+        self._lock = threading.Lock()
+        self._maps: Dict[str, Tuple[int, np.memmap]] = {}
+        self.compactions = 0
+        self.records_moved = 0
+        self.bytes_reclaimed = 0
+
+    def _segments(self, dim: Optional[int] = None, dtype: Optional[str] = None) -> List[str]:
+        if not self.root.exists():
+            return []
+        names = []
+        for path in self.root.iterdir():
+            m = _SEGMENT_RE.match(path.name)
+            if not m:
+                continue
+            if dtype and m.group(1) != dtype:
+                continue
+            if dim and int(m.group(2)) != dim:
+                continue
+            names.append(path.name)
+        return sorted(names)
+
+    def _active_segment(self, dtype: str, dim: int, itemsize: int) -> str:
+        existing = self._segments(dim=dim, dtype=dtype)
+        if existing:
+            last = existing[-1]
+            if (self.root / last).stat().st_size + itemsize <= self.segment_max_bytes:
+                return last
+            seq = int(_SEGMENT_RE.match(last).group(3)) + 1
+        else:
+            seq = 1
+        return f"{dtype}-{dim}-{seq:06d}.vseg"
+
+    def _append_records(self, dtype: str, dim: int, recs: np.ndarray) -> List[str]:
+        """Write records to the active segment(s); the caller holds ``_lock``."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        pointers: List[str] = []
+        itemsize = recs.dtype.itemsize
+        done = 0
+        while done < len(recs):
+            name = self._active_segment(dtype, dim, itemsize)
+            path = self.root / name
+            with path.open("ab") as f:
+                offset = f.tell()
+                room = max(1, (self.segment_max_bytes - offset) // itemsize)
+                batch = recs[done:done + room]
+                f.write(batch.tobytes())
+            first = offset // itemsize
+            pointers.extend(f"{name}#{first + i}" for i in range(len(batch)))
+            done += len(batch)
+        return pointers
+
+    def append(self, memory_id: int, vector: Sequence[float], dtype: Optional[str] = None) -> str:
+        """Append a vector and return its pointer."""
+        rec = encode_record(memory_id, vector, dtype or self.dtype)
+        dim = rec.dtype["v"].shape[0]
+        with self._lock:
+            return self._append_records(dtype or self.dtype, dim, rec)[0]
+
+    def _map(self, name: str) -> Optional[np.memmap]:
+        dtype, dim = _SEGMENT_RE.match(name).group(1, 2)
+        rec = record_dtype(dtype, int(dim))
+        with self._lock:
+            try:
+                size = (self.root / name).stat().st_size
+            except FileNotFoundError:  # removed by compact()
+                self._maps.pop(name, None)
+                return None
+            rows = size // rec.itemsize
+            if rows == 0:
+                return None
+            cached = self._maps.get(name)
+            if cached and cached[0] == rows:
+                return cached[1]
+            mm = np.memmap(self.root / name, dtype=rec, mode="r", shape=(rows,))
+            self._maps[name] = (rows, mm)
+            return mm
+
+    def get(self, pointer: str) -> np.ndarray:
+        """Load a single (normalised) vector by pointer."""
+        _, _, name, row = parse_pointer(pointer)
+        mm = self._map(name)
+        if mm is None or row >= len(mm):
+            raise KeyError(pointer)
+        return decode_vectors(mm[row:row + 1])[0].copy()
+
+    def search(self, query: Sequence[float], top_k: int = 10) -> List[Tuple[int, str, float]]:
+        """Cosine-score every stored vector of the query's dimension.
+
+        Returns ``(memory_id, pointer, score)`` tuples, best first. Callers are
+        expected to drop pointers that no longer match a live SQL row.
+        """
+        q = np.asarray(query, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(q))
+        if norm == 0 or top_k <= 0:
+            return []
+        q = q / norm
+
+        best_scores = np.empty(0, dtype=np.float32)
+        best_ids = np.empty(0, dtype=np.int64)
+        best_ptrs: List[str] = []
+        for name in self._segments(dim=q.size):
+            mm = self._map(name)
+            if mm is None:
+                continue
+            for start in range(0, len(mm), SEARCH_CHUNK_ROWS):
+                chunk = mm[start:start + SEARCH_CHUNK_ROWS]
+                scores = decode_vectors(chunk) @ q
+                k = min(top_k, scores.size)
+                idx = np.argpartition(-scores, k - 1)[:k]
+                best_scores = np.concatenate([best_scores, scores[idx]])
+                best_ids = np.concatenate([best_ids, chunk["id"][idx]])
+                best_ptrs.extend(f"{name}#{start + int(i)}" for i in idx)
+                if best_scores.size > top_k:
+                    keep = np.argpartition(-best_scores, top_k - 1)[:top_k]
+                    best_scores, best_ids = best_scores[keep], best_ids[keep]
+                    best_ptrs = [best_ptrs[i] for i in keep]
+
+        order = np.argsort(-best_scores)
+        return [(int(best_ids[i]), best_ptrs[i], float(best_scores[i])) for i in order]
+
+    def compact(self, live_pointers: Callable[[], Iterable[str]],
+                relink: Callable[[Dict[str, str]], None],
+                min_dead: float = COMPACT_MIN_DEAD) -> Dict[str, int]:
+        """Drop orphaned records from sealed segments.
+
+        ``live_pointers()`` returns every pointer the database still holds.
+        A sealed segment (any but the newest of its dtype/dim) with at least
+        ``min_dead`` orphans has its live records appended to the active
+        segment; ``relink(old -> new)`` must repoint the database rows before
+        the old file is deleted. A row repointed elsewhere in the meantime
+        just leaves an orphan for the next pass.
+        """
+        # Decide what is sealed before reading the live set: appends only go to
+        # the newest segment, so nothing new can land in these afterwards
+        newest: Dict[Tuple[str, str], str] = {}
+        for name in self._segments():
+            newest[_SEGMENT_RE.match(name).group(1, 2)] = name
+        sealed = [n for n in self._segments() if newest[_SEGMENT_RE.match(n).group(1, 2)] != n]
+        if not sealed:
+            return {"segments": 0, "moved": 0, "bytes": 0}
+
+        live: Dict[str, List[int]] = {}
+        for pointer in live_pointers():
+            try:
+                _, _, name, row = parse_pointer(pointer)
+            except ValueError:
+                continue
+            live.setdefault(name, []).append(row)
+
+        result = {"segments": 0, "moved": 0, "bytes": 0}
+        for name in sealed:
+            dtype, dim = _SEGMENT_RE.match(name).group(1, 2)
+            mm = self._map(name)
+            total = len(mm) if mm is not None else 0
+            rows = sorted(r for r in set(live.get(name, ())) if r < total)
+            if total and (total - len(rows)) / total < min_dead:
+                continue
+            moves: Dict[str, str] = {}
+            if rows:
+                recs = np.array(mm[rows])
+                with self._lock:
+                    new = self._append_records(dtype, int(dim), recs)
+                moves = {f"{name}#{r}": p for r, p in zip(rows, new)}
+                relink(moves)
+            with self._lock:
+                path = self.root / name
+                size = path.stat().st_size
+                self._maps.pop(name, None)
+                path.unlink()
+            result["segments"] += 1
+            result["moved"] += len(moves)
+            result["bytes"] += size - len(moves) * record_dtype(dtype, int(dim)).itemsize
+        self.compactions += result["segments"]
+        self.records_moved += result["moved"]
+        self.bytes_reclaimed += result["bytes"]
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        segments = self._segments()
+        return {
+            "segments": len(segments),
+            "bytes": sum((self.root / n).stat().st_size for n in segments),
+            "compacted_segments": self.compactions,
+            "records_moved": self.records_moved,
+            "bytes_reclaimed": self.bytes_reclaimed,
+        }